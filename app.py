@@ -1,17 +1,23 @@
-from flask import Flask, abort, flash, render_template, request, redirect, url_for, session
+from flask import Flask, Response, abort, flash, render_template, request, redirect, url_for, session, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
 from flask_bcrypt import Bcrypt
 from flask_login import (
     LoginManager, UserMixin, login_user,
     logout_user, login_required, current_user
 )
 from datetime import datetime
-from summ_utills import resumir_texto
+from sqlalchemy.exc import IntegrityError
+from cola_resumenes import (
+    programar_resumen, estado_resumen, ejecutar_worker,
+    regenerar_resumenes, leer_checkpoint, guardar_checkpoint
+)
+from cache_resumenes import estadisticas as estadisticas_cache, clave_resumen
+import summ_utills
 
 from dotenv import load_dotenv
+import click
 import os
+import json
 
 load_dotenv()
 
@@ -23,31 +29,38 @@ import requests
 
 from models import (
     db, User, Equipo, Jugador, Articulo, Evento,
-    EventoAficionado, AficionadoJugador, DT
+    EventoAficionado, AficionadoJugador, DT, PartidoOficial
+)
+from consultas import (
+    presupuesto_consultas, activar_contador,
+    jugadores_con_equipo, dts_con_equipo, equipo_con_plantel,
+    jugador_con_equipo, quinteto_de, eventos_de, candidatos_quinteto
+)
+from paginacion import paginar
+from busqueda import iniciar_busqueda, reconstruir as reconstruir_busqueda, resultados
+from migraciones import migrar, verificar as verificar_migraciones
+from inscripciones import inscribir, prueba_de_carga, reconciliar
+from config import cargar_config
+from motor import configurar_motor, iniciar_motor, solo_lectura
+from prueba_carga import comparar as comparar_carga
+from paridad import comparar as comparar_paridad
+from importacion import ENTIDADES, importar, exportar, formato_de
+from cache_paginas import iniciar_cache, cache_pagina
+from estaticos import iniciar_estaticos, construir as construir_estaticos, compilar_css, medir_render, CSS_SALIDA
+from cache_usuarios import cargar_usuario, invalidar_usuario
+from imagenes import iniciar_imagenes, procesar_todo as procesar_imagenes
+from posiciones import POSICIONES
+from quintetos import guardar_puesto
+from simulacion import LOCALIA, perfil_de, perfiles_equipos, puntos_ganados, resumen as simular_partidos, liga as simular_liga, benchmark as benchmark_simulacion
+from ranking import (
+    iniciar_ranking, posicion as posicion_ranking, top as top_ranking, sumar_puntos, pendientes as puntos_pendientes,
+    benchmark as benchmark_ranking,
+)
+from similares import similares, percentiles, matriz as matriz_similares, benchmark as benchmark_similares
+from versiones import (
+    respuesta_condicional, version_equipo, version_jugador,
+    version_articulo, version_evento
 )
-
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
-
-def normalizar_posicion(pos):
-    pos = pos.lower()
-
-    if "base" in pos:
-        return "Base"
-    if "escolta" in pos:
-        return "Escolta"
-    if "alero" in pos:
-        return "Alero"
-    if "ala" in pos:
-        return "Ala-Pivot"
-    if "pivot" in pos:
-        return "Pivot"
-
-    return None
-
 
 app = Flask(__name__)
 
@@ -66,24 +79,30 @@ google = oauth.register(
 )
 
 
-app.config["SECRET_KEY"] = "clave_secreta_123"
-
-
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///lnb.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# todo sale del entorno (ver config.py); los engines se ajustan en motor.py
+app.config.update(cargar_config())
+configurar_motor(app)
 
 db.init_app(app)
+iniciar_motor(app, db)
 bcrypt = Bcrypt(app)
 
 
 
+activar_contador(app)
+iniciar_cache(app)
+iniciar_estaticos(app)
+iniciar_imagenes(app)
+iniciar_ranking(app)
+
+
 login_manager = LoginManager(app)
 login_manager.login_view = "login"
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return cargar_usuario(int(user_id))
 
 
 #------------ RUTAS ---------------
@@ -102,8 +121,9 @@ def auth_google_callback():
     user_info = google.get("https://openidconnect.googleapis.com/v1/userinfo").json()
 
     email = user_info["email"]
-    nombre = user_info.get("given_name", None)
-    apellido = user_info.get("family_name", None)
+    # recortados al largo de las columnas (PostgreSQL rechaza los que se pasan)
+    nombre = (user_info.get("given_name") or "")[:20] or None
+    apellido = (user_info.get("family_name") or "")[:30] or None
     foto = user_info.get("picture", None)
 
     # Buscar si ya existe el usuario
@@ -133,10 +153,13 @@ def auth_google_callback():
 #USER-----------------------------------
 
 @app.route("/")
+@presupuesto_consultas(4)
+@solo_lectura
+@cache_pagina("index")
 def index():
     articulos = Articulo.query.order_by(Articulo.fecha.desc()).limit(4).all()
     evento_dest = Evento.query.order_by(Evento.fecha_y_hora.asc()).first()
-    jugadores = Jugador.query.filter(Jugador.aficionado_id.is_(None)).order_by(Jugador.media.desc()).limit(3).all()
+    jugadores = jugadores_con_equipo().filter(Jugador.aficionado_id.is_(None)).order_by(Jugador.media.desc()).limit(3).all()
 
 
     return render_template(
@@ -153,36 +176,56 @@ def index():
 
 #EQUIPOS 
 @app.route("/equipos")
+@presupuesto_consultas(2)
+@solo_lectura
+@cache_pagina("equipos")
 def equipos():
-    all_equipos = Equipo.query.all()
+    all_equipos = paginar(Equipo.query, Equipo.id, Equipo.id)
     return render_template("equipos.html", equipos=all_equipos)
 
 
 @app.route("/equipo/<int:id>")
+@presupuesto_consultas(5)
+@solo_lectura
+@respuesta_condicional(version_equipo)
+@cache_pagina("equipo:{id}")
 def equipo_detalle(id):
-    equipo = Equipo.query.get_or_404(id)
-    jugadores = Jugador.query.filter_by(equipo_id=id).all()
-    dts = DT.query.filter_by(equipo_id=id).all()
-    return render_template("equipo_detalle.html", equipo=equipo, jugadores=jugadores, dts=dts)
+    equipo = equipo_con_plantel(id)
+    return render_template("equipo_detalle.html", equipo=equipo, jugadores=equipo.jugadores, dts=equipo.dts)
 
 #JUGADORES
 @app.route("/jugador/<int:id>")
+@presupuesto_consultas(4)   # +1 cuando vence el TTL de la matriz de similares y se reconstruye
+@solo_lectura
+@respuesta_condicional(version_jugador)
+@cache_pagina("jugador:{id}", "jugadores")
 def jugador_detalle(id):
-    jugador = Jugador.query.get_or_404(id)
-    return render_template("jugador_detalle.html", jugador=jugador)
+    jugador = jugador_con_equipo(id)
+    return render_template(
+        "jugador_detalle.html",
+        jugador=jugador,
+        similares=similares(jugador),
+        percentiles=percentiles(jugador),
+    )
 
 #NOVEDADES 
 
 #EVENTSO
 @app.route("/eventos")
+@presupuesto_consultas(3)   # +1 en la página que cruza al tramo de NULLs (ver paginar)
+@solo_lectura
+@cache_pagina("eventos")
 def eventos():
-    lista = Evento.query.order_by(Evento.fecha_y_hora.asc()).all()
+    lista = paginar(Evento.query, Evento.fecha_y_hora, Evento.id)
     return render_template("eventos.html", eventos=lista)
 
 @app.route("/eventos/<int:id>")
+@presupuesto_consultas(4)
+@solo_lectura
+@respuesta_condicional(version_evento)
 def evento_detalle(id):
     evento = Evento.query.get_or_404(id)
-    inscriptos = EventoAficionado.query.filter_by(evento_id=id).count()
+    inscriptos = evento.inscriptos_count
 
     ya_inscripto = False
     if current_user.is_authenticated:
@@ -199,41 +242,137 @@ def evento_detalle(id):
 @app.route("/eventos/<int:id>/inscribirse")
 @login_required
 def evento_inscribir(id):
-    evento = Evento.query.get_or_404(id)
+    Evento.query.get_or_404(id)
 
-    inscriptos = EventoAficionado.query.filter_by(evento_id=id).count()
-    if inscriptos >= evento.cap_max:
+    # el control de cupo y el insert son una sola sentencia (ver inscripciones.py)
+    if inscribir(id, current_user.id) == "sin_cupo":
         return "No quedan más cupos."
 
-    ya = EventoAficionado.query.filter_by(
-        evento_id=id,
-        aficionado_id=current_user.id
-    ).first()
-
-    if not ya:
-        ins = EventoAficionado(evento_id=id, aficionado_id=current_user.id)
-        db.session.add(ins)
-        db.session.commit()
-
     return redirect(url_for("evento_detalle", id=id))
 
 #NOTICIAS
 @app.route("/noticias")
+@presupuesto_consultas(3)   # +1 en la página que cruza al tramo de NULLs (ver paginar)
+@solo_lectura
+@cache_pagina("noticias")
 def noticias():
-    articulos = Articulo.query.order_by(Articulo.fecha.desc()).all()
+    articulos = paginar(Articulo.query, Articulo.fecha, Articulo.id, desc=True)
     return render_template("noticias.html", articulos=articulos)
 
 @app.route("/noticias/<int:id>")
+@presupuesto_consultas(3)
+@solo_lectura
+@respuesta_condicional(version_articulo)
+@cache_pagina("articulo:{id}")
 def noticia_detalle(id):
     articulo = Articulo.query.get_or_404(id)
     return render_template("noticia_detalle.html", articulo=articulo)
 
+#BUSCAR
+@app.route("/buscar")
+@presupuesto_consultas(10)
+@solo_lectura
+def buscar():
+    q = request.args.get("q", "").strip()
+
+    encontrados = {}
+    if q:
+        encontrados = {
+            "equipos": resultados(Equipo.query, "equipo", q, limite=12),
+            "jugadores": resultados(jugadores_con_equipo().filter(Jugador.aficionado_id.is_(None)), "jugador", q, limite=12),
+            "articulos": resultados(Articulo.query, "articulo", q, limite=12),
+            "eventos": resultados(Evento.query, "evento", q, limite=12),
+        }
+
+    return render_template("buscar.html", q=q, **encontrados)
+
 #JUEGOS
 
-@app.route("/juegos")
+@app.route("/juegos", methods=["GET", "POST"])
+@presupuesto_consultas(6)
 @login_required
 def juegos():
-    return render_template("juegos.html")
+    partidos = app.config["SIMULACION_PARTIDOS"]
+    fecha = datetime.utcnow().date()
+    oficial = (
+        db.session.query(PartidoOficial, Equipo.nombre)
+        .outerjoin(Equipo, Equipo.id == PartidoOficial.rival_id)
+        .filter(PartidoOficial.aficionado_id == current_user.id, PartidoOficial.fecha == fecha)
+        .first()
+    )
+
+    if request.method == "POST":
+        # el quinteto del aficionado contra un plantel, en cancha neutral;
+        # el partido de muestra es el oficial y suma puntos una vez por día
+        rival = request.form.get("rival", type=int)
+        if oficial is None and rival:
+            perfiles = perfiles_equipos([rival])
+            if rival not in perfiles:
+                abort(404)
+            quinteto = perfil_de("Tu quinteto", [rel.jugador for rel in quinteto_de(current_user.id)])
+            resultado = simular_partidos(quinteto, perfiles[rival], partidos)
+            ganados = puntos_ganados(resultado)
+            db.session.add(PartidoOficial(
+                aficionado_id=current_user.id,
+                fecha=fecha,
+                rival_id=rival,
+                puntos_quinteto=resultado["muestra"][0],
+                puntos_rival=resultado["muestra"][1],
+                prob_victoria=resultado["prob_local"],
+                puntos_ganados=ganados,
+            ))
+            try:
+                # el índice único (aficionado, fecha) frena dos envíos simultáneos
+                db.session.flush()
+                sumar_puntos(current_user.id, ganados)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+        return redirect(url_for("juegos"))
+
+    equipos = db.session.query(Equipo.id, Equipo.nombre).order_by(Equipo.nombre).all()
+    local = request.args.get("local", type=int)
+    visitante = request.args.get("visitante", type=int)
+
+    resultado = None
+    if local and visitante:
+        perfiles = perfiles_equipos([local, visitante])
+        if local not in perfiles or visitante not in perfiles:
+            abort(404)
+        resultado = simular_partidos(perfiles[local], perfiles[visitante], partidos, localia=LOCALIA)
+
+    return render_template(
+        "juegos.html",
+        equipos=equipos,
+        resultado=resultado,
+        oficial=oficial,
+        puntos=(current_user.puntos or 0) + puntos_pendientes(current_user.id),
+        local=local,
+        visitante=visitante,
+    )
+
+#RANKING
+
+@app.route("/ranking")
+@presupuesto_consultas(5)   # +1 cuando vence el TTL del ranking en memoria y se recarga
+def ranking():
+    equipos = db.session.query(Equipo.id, Equipo.nombre).order_by(Equipo.nombre).all()
+    equipo_id = request.args.get("equipo", type=int)
+
+    mis_puntos = mi_posicion = None
+    if current_user.is_authenticated and equipo_id in (None, current_user.equipo_favorito_id):
+        # con los puntos que todavía no se volcaron, igual que en /juegos
+        mis_puntos = (current_user.puntos or 0) + puntos_pendientes(current_user.id)
+        mi_posicion = posicion_ranking(mis_puntos, equipo_id)
+
+    return render_template(
+        "ranking.html",
+        equipos=equipos,
+        equipo_id=equipo_id,
+        aficionados=top_ranking(equipo_id),
+        mi_posicion=mi_posicion,
+        mis_puntos=mis_puntos,
+    )
 
 #MI JUGADOR
 
@@ -345,6 +484,7 @@ def mi_jugador():
 
 # PERFIL
 @app.route("/perfil")
+@presupuesto_consultas(3)
 @login_required
 def perfil():
     user = current_user
@@ -352,37 +492,15 @@ def perfil():
     jugador_fav = user.jugador_favorito
     equipo_fav = user.equipo_favorito
 
-    relaciones = (
-        AficionadoJugador.query
-        .filter_by(aficionado_id=user.id)
-        .join(Jugador, AficionadoJugador.jugador_id == Jugador.id)
-        .all()
-    )
+    relaciones = quinteto_de(user.id)
 
-    def posicion_principal(pos):
-        if not pos:
-            return None
-        return pos.split("/")[0].strip()  
-
-    quinteto = {
-        "Base": None,
-        "Escolta": None,
-        "Alero": None,
-        "Ala-Pivot": None,
-        "Pivot": None,
-    }
+    quinteto = {pos: None for pos in POSICIONES}
 
     for rel in relaciones:
-        pos = posicion_principal(rel.jugador.posicion)
-        if pos in quinteto:
-            quinteto[pos] = rel.jugador
-
-    eventos_inscripto = (
-        EventoAficionado.query
-        .filter_by(aficionado_id=user.id)
-        .join(Evento, EventoAficionado.evento_id == Evento.id)
-        .all()
-    )
+        if rel.slot in quinteto:
+            quinteto[rel.slot] = rel.jugador
+
+    eventos_inscripto = eventos_de(user.id)
 
     return render_template(
         "perfil.html",
@@ -407,15 +525,25 @@ def guardar_equipo(id):
     equipo = Equipo.query.get_or_404(id)
     current_user.equipo_favorito_id = equipo.id
     db.session.commit()
+    invalidar_usuario(current_user.id)
     flash("Equipo favorito actualizado.", "success")
     return redirect(url_for("perfil"))
 
 
 @app.route("/perfil/elegir-jugador")
+@presupuesto_consultas(3)   # +1 en la página que cruza al tramo de NULLs (ver paginar)
 @login_required
 def elegir_jugador():
-    jugadores = Jugador.query.filter_by(aficionado_id=None).all()
-    return render_template("elegir_jugador.html", jugadores=jugadores)
+    q = request.args.get("q", "").strip()
+    jugadores = jugadores_con_equipo().filter_by(aficionado_id=None)
+
+    # la búsqueda va al servidor: filtrar en el navegador solo vería la página actual
+    if q:
+        jugadores = resultados(jugadores, "jugador", q)
+    else:
+        jugadores = paginar(jugadores, Jugador.apellido, Jugador.id)
+
+    return render_template("elegir_jugador.html", jugadores=jugadores, q=q)
 
 
 @app.route("/perfil/guardar-jugador/<int:id>")
@@ -424,29 +552,20 @@ def guardar_jugador(id):
     jugador = Jugador.query.get_or_404(id)
     current_user.jugador_favorito_id = jugador.id
     db.session.commit()
+    invalidar_usuario(current_user.id)
     flash("Jugador favorito actualizado.", "success")
     return redirect(url_for("perfil"))
 
 
 @app.route("/quinteto/<posicion>")
+@presupuesto_consultas(2)
 @login_required
 def editar_quinteto(posicion):
 
-    posiciones_validas = ["Base", "Escolta", "Alero", "Ala-Pivot", "Pivot"]
-    if posicion not in posiciones_validas:
+    if posicion not in POSICIONES:
         abort(404)
 
-    
-    def posicion_principal(pos):
-        if not pos:
-            return None
-        return pos.split("/")[0].strip()
-
-    
-    jugadores = [
-        j for j in Jugador.query.filter_by(aficionado_id=None).all()
-        if posicion_principal(j.posicion) == posicion
-    ]
+    jugadores = candidatos_quinteto(posicion)
 
     return render_template("quinteto_elegir.html",
                            posicion=posicion,
@@ -457,33 +576,11 @@ def editar_quinteto(posicion):
 @login_required
 def guardar_quinteto(posicion, jugador_id):
 
-    posiciones_validas = ["Base", "Escolta", "Alero", "Ala-Pivot", "Pivot"]
-    if posicion not in posiciones_validas:
+    if posicion not in POSICIONES:
         abort(404)
 
-    
-    def posicion_principal(pos):
-        if not pos:
-            return None
-        return pos.split("/")[0].strip()
-
-    relaciones = (
-        AficionadoJugador.query
-        .filter_by(aficionado_id=current_user.id)
-        .join(Jugador)
-        .all()
-    )
-
-    for rel in relaciones:
-        if posicion_principal(rel.jugador.posicion) == posicion:
-            db.session.delete(rel)
-
-    nueva = AficionadoJugador(
-        aficionado_id=current_user.id,
-        jugador_id=jugador_id
-    )
-    db.session.add(nueva)
-    db.session.commit()
+    if not guardar_puesto(current_user.id, posicion, jugador_id):
+        abort(404)
 
     flash(f"{posicion} actualizado.", "success")
     return redirect(url_for("perfil"))
@@ -559,6 +656,7 @@ def admin_dashboard():
 
 #USUARIOS
 @app.route("/admin/usuarios")
+@presupuesto_consultas(3)
 @login_required
 def admin_usuarios():
     if current_user.role != "admin":
@@ -567,12 +665,9 @@ def admin_usuarios():
     q = request.args.get("q", "").strip()
 
     if q:
-        usuarios = User.query.filter(
-            (User.username.ilike(f"%{q}%")) |
-            (User.mail.ilike(f"%{q}%"))
-        ).all()
+        usuarios = resultados(User.query, "usuario", q)
     else:
-        usuarios = User.query.all()
+        usuarios = paginar(User.query, User.id, User.id)
 
     return render_template("admin/usuarios_list.html", usuarios=usuarios, q=q)
 
@@ -624,6 +719,7 @@ def admin_usuario_editar(id):
             usuario.password = bcrypt.generate_password_hash(nueva_pass).decode("utf-8")
 
         db.session.commit()
+        invalidar_usuario(usuario.id)
         return redirect(url_for("admin_usuarios"))
 
     return render_template("admin/usuario_form.html", modo="editar", usuario=usuario)
@@ -638,12 +734,14 @@ def admin_usuario_eliminar(id):
     usuario = User.query.get_or_404(id)
     db.session.delete(usuario)
     db.session.commit()
+    invalidar_usuario(id)
 
     return redirect(url_for("admin_usuarios"))
 
 
 #EQUIPOS
 @app.route("/admin/equipos")
+@presupuesto_consultas(3)
 @login_required
 def admin_equipos():
     if current_user.role != "admin":
@@ -652,12 +750,9 @@ def admin_equipos():
     q = request.args.get("q", "")
 
     if q:
-        equipos = Equipo.query.filter(
-            (Equipo.nombre.ilike(f"%{q}%")) |
-            (Equipo.ciudad.ilike(f"%{q}%"))
-        ).all()
+        equipos = resultados(Equipo.query, "equipo", q)
     else:
-        equipos = Equipo.query.all()
+        equipos = paginar(Equipo.query, Equipo.id, Equipo.id)
 
     return render_template("admin/equipos_list.html",
                            equipos=equipos, q=q)
@@ -747,6 +842,7 @@ def admin_equipo_eliminar(id):
 
 #JUGADORES---------------------------------
 @app.route("/admin/jugadores")
+@presupuesto_consultas(3)
 @login_required
 def admin_jugadores():
     if current_user.role != "admin":
@@ -754,10 +850,12 @@ def admin_jugadores():
 
     q = request.args.get("q", "")
 
-    jugadores = Jugador.query.filter(
-        Jugador.aficionado_id.is_(None),
-        (Jugador.nombre.ilike(f"%{q}%")) | (Jugador.apellido.ilike(f"%{q}%"))
-    ).order_by(Jugador.apellido.asc()).all()
+    jugadores = jugadores_con_equipo().filter(Jugador.aficionado_id.is_(None))
+
+    if q:
+        jugadores = resultados(jugadores, "jugador", q)
+    else:
+        jugadores = paginar(jugadores, Jugador.apellido, Jugador.id)
 
     return render_template("admin/jugadores_list.html",
                            jugadores=jugadores,
@@ -918,6 +1016,7 @@ def admin_jugador_eliminar(id):
 
 #ARTICULOS------------------------------
 @app.route("/admin/articulos")
+@presupuesto_consultas(3)
 @login_required
 def admin_articulos():
     if current_user.role != "admin":
@@ -926,12 +1025,9 @@ def admin_articulos():
     q = request.args.get("q", "").strip()
 
     if q:
-        articulos = Articulo.query.filter(
-            Articulo.titulo.ilike(f"%{q}%")|
-            Articulo.descripcion.ilike(f"%{q}%")
-        ).all()
+        articulos = resultados(Articulo.query, "articulo", q)
     else:
-        articulos = Articulo.query.all()
+        articulos = paginar(Articulo.query, Articulo.fecha, Articulo.id, desc=True)
 
     return render_template("admin/articulos_list.html", articulos=articulos, q=q)
 
@@ -950,13 +1046,9 @@ def admin_articulos_crear():
         foto_2 = request.form["foto_2"] or None
         foto_3 = request.form["foto_3"] or None
 
-        
-        resumen = resumir_texto(descripcion)
-
         articulo = Articulo(
             titulo=titulo,
             descripcion=descripcion,
-            resumen=resumen,
             fecha=datetime.utcnow().date(),
             portada=portada,
             foto_1=foto_1,
@@ -965,9 +1057,16 @@ def admin_articulos_crear():
         )
 
         db.session.add(articulo)
+        db.session.flush()
+
+        # sale del cache o lo genera el worker (flask resumenes-worker)
+        programar_resumen(articulo)
         db.session.commit()
 
-        flash("Artículo creado con resumen automático.", "success")
+        if articulo.resumen_estado == "pendiente":
+            flash("Artículo creado. El resumen automático se genera en segundo plano.", "success")
+        else:
+            flash("Artículo creado con resumen automático.", "success")
         return redirect(url_for("admin_articulos"))
 
     return render_template("admin/articulos_form.html", articulo=None)
@@ -983,6 +1082,8 @@ def admin_articulos_editar(id):
     articulo = Articulo.query.get_or_404(id)
 
     if request.method == "POST":
+        descripcion_anterior = articulo.descripcion
+
         articulo.titulo = request.form["titulo"]
         articulo.descripcion = request.form["descripcion"]
         articulo.portada = request.form["portada"] or None
@@ -990,17 +1091,38 @@ def admin_articulos_editar(id):
         articulo.foto_2 = request.form["foto_2"] or None
         articulo.foto_3 = request.form["foto_3"] or None
 
-        
-        articulo.resumen = resumir_texto(articulo.descripcion)
+        programar_resumen(articulo, descripcion_anterior)
 
         db.session.commit()
 
-        flash("Artículo actualizado con nuevo resumen automático.", "success")
+        if articulo.resumen_estado == "pendiente":
+            flash("Artículo actualizado. El nuevo resumen se genera en segundo plano.", "success")
+        else:
+            flash("Artículo actualizado correctamente.", "success")
         return redirect(url_for("admin_articulos"))
 
     return render_template("admin/articulos_form.html", articulo=articulo)
 
 
+#estado del resumen
+@app.route("/admin/articulos/<int:id>/resumen")
+@login_required
+def admin_articulo_resumen_estado(id):
+    if current_user.role != "admin":
+        return redirect(url_for("index"))
+
+    articulo = Articulo.query.get_or_404(id)
+
+    return {
+        "articulo_id": articulo.id,
+        "resumen_estado": articulo.resumen_estado,
+        "resumen_estrategia": articulo.resumen_estrategia,
+        "resumen": articulo.resumen,
+        "job": estado_resumen(articulo.id),
+        "cache": estadisticas_cache(),
+    }
+
+
 #eliminar
 @app.route("/admin/articulos/<int:id>/eliminar")
 @login_required
@@ -1019,6 +1141,7 @@ def admin_articulos_eliminar(id):
 
 #EVENTOS--------------------------------
 @app.route("/admin/eventos")
+@presupuesto_consultas(3)
 @login_required
 def admin_eventos():
     if current_user.role != "admin":
@@ -1027,9 +1150,9 @@ def admin_eventos():
     q = request.args.get("q", "")
 
     if q:
-        eventos = Evento.query.filter(Evento.titulo.ilike(f"%{q}%")).all()
+        eventos = resultados(Evento.query, "evento", q)
     else:
-        eventos = Evento.query.order_by(Evento.fecha_y_hora.desc()).all()
+        eventos = paginar(Evento.query, Evento.fecha_y_hora, Evento.id, desc=True)
 
     return render_template("admin/eventos_list.html", eventos=eventos, q=q)
 
@@ -1108,6 +1231,7 @@ def admin_eventos_eliminar(id):
 
 #DTS------------------------------
 @app.route("/admin/dts")
+@presupuesto_consultas(3)
 @login_required
 def admin_dts():
     if current_user.role != "admin":
@@ -1116,12 +1240,9 @@ def admin_dts():
     q = request.args.get("q", "").strip()
 
     if q:
-        dts = DT.query.filter(
-            (DT.nombre.ilike(f"%{q}%")) |
-            (DT.apellido.ilike(f"%{q}%")) 
-        ).all()
+        dts = resultados(dts_con_equipo(), "dt", q)
     else:
-        dts = DT.query.all()
+        dts = paginar(dts_con_equipo(), DT.id, DT.id)
 
     return render_template("admin/dts_list.html", dts=dts, q=q)
 
@@ -1199,11 +1320,444 @@ def admin_dts_eliminar(id):
     return redirect(url_for("admin_dts"))
 
 
+#IMPORTAR / EXPORTAR
+@app.route("/admin/importar", methods=["GET", "POST"])
+@login_required
+def admin_importar():
+    if current_user.role != "admin":
+        return redirect(url_for("index"))
+
+    entidad = request.form.get("entidad", "jugadores")
+    resultado = None
+
+    if request.method == "POST":
+        archivo = request.files.get("archivo")
+        formato = formato_de(archivo.filename) if archivo and archivo.filename else None
+
+        if entidad not in ENTIDADES:
+            abort(400)
+        if formato not in ("csv", "json"):
+            resultado = {"insertados": 0, "con_errores": 1, "errores": [("archivo", "tiene que ser .csv o .json")]}
+        else:
+            resultado = importar(entidad, archivo.stream, formato)
+
+    return render_template("admin/importar.html",
+                           entidades=list(ENTIDADES),
+                           entidad=entidad,
+                           resultado=resultado)
+
+@app.route("/admin/exportar/<entidad>.<formato>")
+@login_required
+def admin_exportar(entidad, formato):
+    if current_user.role != "admin":
+        return redirect(url_for("index"))
+    if entidad not in ENTIDADES or formato not in ("csv", "json"):
+        abort(404)
+
+    tipo = "text/csv" if formato == "csv" else "application/json"
+    return Response(
+        stream_with_context(exportar(entidad, formato)),
+        mimetype=tipo,
+        headers={"Content-Disposition": f"attachment; filename={entidad}.{formato}"},
+    )
+
+
+# --------- COMANDOS ---------
+
+@app.cli.command("resumenes-worker")
+@click.option("--una-vez", is_flag=True, help="Procesa la cola pendiente y termina.")
+@click.option("--sin-precalentar", is_flag=True, help="No cargar el modelo antes del primer job.")
+@click.option("--backend", type=click.Choice(sorted(summ_utills.BACKENDS)), default=None)
+def resumenes_worker(una_vez, sin_precalentar, backend):
+    """Worker que genera los resúmenes de artículos encolados."""
+    if backend:
+        summ_utills.usar_backend(backend)
+
+    procesados = ejecutar_worker(una_vez=una_vez, precalentar_modelo=not sin_precalentar)
+    click.echo(f"{procesados} resúmenes procesados.")
+
+
+@app.cli.command("resumenes-benchmark")
+@click.option("--backend", "backends", multiple=True, type=click.Choice(sorted(summ_utills.BACKENDS)),
+              default=["pytorch"], show_default=True)
+@click.option("--textos", default=10, show_default=True, help="Cantidad de textos a resumir.")
+def resumenes_benchmark(backends, textos):
+    """Compara arranque en frío y latencia por resumen entre backends."""
+    muestras = [
+        a.descripcion for a in
+        Articulo.query.filter(db.func.length(Articulo.descripcion) >= summ_utills.LARGO_MINIMO)
+        .limit(textos)
+    ]
+    while len(muestras) < textos:
+        muestras.append(
+            f"El equipo {len(muestras)} ganó el partido de anoche por la Liga Nacional. "
+            "El base fue la figura con 25 puntos y 8 asistencias, y el entrenador destacó la defensa."
+        )
+
+    for nombre in backends:
+        r = summ_utills.medir_backend_en_frio(nombre, muestras)
+
+        latencias = sorted(r["latencias_s"])
+        click.echo(f"[{nombre}]")
+        click.echo(f"  carga (import + modelo): {r['carga_s']:.2f} s")
+        if r["primera_s"] is not None:
+            click.echo(f"  primera inferencia:      {r['primera_s']:.2f} s")
+        if latencias:
+            p50 = latencias[len(latencias) // 2]
+            p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+            promedio = sum(latencias) / len(latencias)
+            click.echo(f"  por resumen: promedio {promedio:.3f} s | p50 {p50:.3f} s | p95 {p95:.3f} s")
+
+
+@app.cli.command("similares-benchmark")
+@click.option("--jugadores", default=10000, show_default=True, help="Jugadores sintéticos.")
+@click.option("--consultas", default=500, show_default=True)
+def similares_benchmark(jugadores, consultas):
+    """Jugadores similares y percentiles: matriz en memoria contra consultas SQL."""
+    r = benchmark_similares(jugadores, consultas)
+    click.echo(f"{r['jugadores']} jugadores, {r['consultas']} consultas")
+    click.echo(f"  construir matriz:     {r['construir_ms']:.1f} ms")
+    click.echo(f"  similares (coseno):   {r['coseno_ms']:.3f} ms | SQL {r['sql_similares_ms']:.3f} ms")
+    click.echo(f"  similares (euclídea): {r['euclidea_ms']:.3f} ms")
+    click.echo(f"  percentiles:          {r['percentiles_ms']:.3f} ms | SQL {r['sql_percentiles_ms']:.3f} ms")
+    click.echo(f"  actualizar una fila:  {r['actualizar_ms']:.3f} ms")
+
+
+@app.cli.command("juegos-liga")
+@click.option("--partidos", default=1000, show_default=True, help="Simulaciones por cruce.")
+@click.option("--procesos", default=os.cpu_count() or 1, show_default=True)
+@click.option("--semilla", default=None, type=int)
+def juegos_liga(partidos, procesos, semilla):
+    """Simula la liga todos contra todos (ida y vuelta) y muestra la tabla."""
+    perfiles = list(perfiles_equipos().values())
+    if len(perfiles) < 2:
+        click.echo("Hacen falta al menos dos equipos.")
+        return
+
+    tabla = simular_liga(perfiles, partidos, procesos=procesos, semilla=semilla)
+    click.echo(f"{'equipo':<30}{'victorias %':>13}{'dif. puntos':>13}")
+    for fila in tabla:
+        click.echo(f"{fila['perfil'].nombre[:29]:<30}{fila['porcentaje']:>13.1f}{fila['diferencia']:>13.1f}")
+
+
+@app.cli.command("juegos-benchmark")
+@click.option("--partidos", default=100000, show_default=True, help="Partidos del lote entre dos equipos.")
+@click.option("--equipos", default=20, show_default=True, help="Equipos sintéticos de la liga.")
+@click.option("--por-cruce", default=2000, show_default=True)
+@click.option("--procesos", default=os.cpu_count() or 1, show_default=True)
+def juegos_benchmark(partidos, equipos, por_cruce, procesos):
+    """Partidos simulados por segundo, en un lote y en una liga completa."""
+    r = benchmark_simulacion(partidos, equipos, por_cruce, procesos)
+    click.echo(f"lote de {r['lote_partidos']} partidos: {r['lote_por_segundo']:,.0f} partidos/s")
+    for nombre in ("liga_1", "liga_n"):
+        liga = r[nombre]
+        click.echo(f"liga, {liga['procesos']} proceso(s): {liga['partidos']} partidos en {liga['segundos']:.2f} s, "
+                   f"{liga['por_segundo']:,.0f} partidos/s")
+
+
+@app.cli.command("ranking-benchmark")
+@click.option("--aficionados", default=100000, show_default=True)
+@click.option("--premios", default=5000, show_default=True, help="Premios de puntos a escribir.")
+def ranking_benchmark(aficionados, premios):
+    """Ranking: índices y posición en memoria contra ORDER BY/COUNT, y premios uno a uno contra por lotes."""
+    r = benchmark_ranking(aficionados, premios)
+    click.echo(f"{r['aficionados']} aficionados")
+    click.echo(f"  top 20:             sin índice {r['sql_top_ms']:.3f} ms | con índice {r['indice_top_ms']:.3f} ms")
+    click.echo(f"  top 20 por equipo:  sin índice {r['sql_top_equipo_ms']:.3f} ms | con índice {r['indice_top_equipo_ms']:.3f} ms")
+    click.echo(f"  posición:           COUNT sin índice {r['sql_posicion_ms']:.3f} ms | con índice "
+               f"{r['indice_posicion_ms']:.3f} ms | en memoria {r['memoria_posicion_ms']:.4f} ms")
+    click.echo(f"  construir ranking en memoria: {r['construir_ms']:.1f} ms, "
+               f"actualizar un aficionado: {r['actualizar_ranking_ms']:.3f} ms")
+    click.echo(f"  {r['premios']} premios: uno a uno {r['premios_uno_a_uno_s']:.3f} s | "
+               f"por lote {r['premios_por_lote_s']:.3f} s ({r['premios_filas']} filas)")
+
+
+@app.cli.command("db-migrar")
+def db_migrar():
+    """Aplica las migraciones de esquema pendientes (crear_app ya lo hace al arrancar)."""
+    aplicadas = migrar()
+    for version, descripcion in aplicadas:
+        click.echo(f"v{version}: {descripcion}")
+    if not aplicadas:
+        click.echo("El esquema ya está al día.")
+
+
+@app.cli.command("db-verificar")
+def db_verificar():
+    """Comprueba con EXPLAIN QUERY PLAN que las consultas usan sus índices."""
+    fallas = 0
+    for version, consulta, indice, plan, ok in verificar_migraciones():
+        click.echo(f"[{'OK' if ok else 'FALLA'}] v{version} {indice}")
+        if not ok:
+            click.echo(f"    {consulta}\n    plan: {plan}")
+            fallas += 1
+
+    if fallas:
+        raise SystemExit(1)
+
+
+@app.cli.command("inscripciones-carga")
+@click.option("--cupo", default=50, show_default=True)
+@click.option("--aficionados", default=200, show_default=True)
+@click.option("--hilos", default=16, show_default=True)
+def inscripciones_carga(cupo, aficionados, hilos):
+    """Prueba de carga en un SQLite temporal: muchos aficionados inscribiéndose al mismo evento."""
+    r = prueba_de_carga(app, cupo=cupo, aficionados=aficionados, hilos=hilos)
+
+    click.echo(f"cupo {r['cupo']} | inscriptos {r['inscriptos']} (contador {r['contador']}) | duplicados {r['duplicados']}")
+    click.echo(f"resultados: {r['resultados']}")
+    click.echo(f"{r['segundos']:.2f} s, {r['intentos_por_segundo']:.0f} intentos/s")
+
+    if not r["ok"]:
+        click.echo("FALLA: se superó el cupo, hubo duplicados o errores.")
+        raise SystemExit(1)
+
+
+@app.cli.command("carga-sqlite")
+@click.option("--procesos", default=4, show_default=True, help="Procesos (workers) en paralelo.")
+@click.option("--segundos", default=10, show_default=True)
+@click.option("--escrituras", default=0.2, show_default=True, help="Proporción de pedidos que escriben.")
+def carga_sqlite(procesos, segundos, escrituras):
+    """Compara SQLite sin ajustes contra WAL/busy_timeout/mmap con varios workers."""
+    click.echo(f"{'escenario':<14}{'pedidos':>9}{'pedidos/s':>11}{'errores':>9}{'bloqueos':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for nombre, r in comparar_carga(app, procesos, segundos, escrituras):
+        click.echo(f"{nombre:<14}{r['pedidos']:>9}{r['por_segundo']:>11.1f}{r['errores']:>9}{r['bloqueos']:>10}"
+                   f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}")
+
+
+@app.cli.command("db-paridad")
+@click.option("--url", "urls", multiple=True, help="URL de una base vacía (repetible). Por defecto, un SQLite temporal.")
+def db_paridad(urls):
+    """Corre los mismos chequeos en cada motor (SQLite, PostgreSQL...) y compara los resultados."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        urls = list(urls) or [f"sqlite:///{os.path.join(carpeta, 'paridad.db')}"]
+        if not any(u.startswith("sqlite") for u in urls):
+            urls.insert(0, f"sqlite:///{os.path.join(carpeta, 'paridad.db')}")
+        por_url, distintos = comparar_paridad(urls, app.root_path)
+
+    for url, resultados in por_url.items():
+        if "error" in resultados:
+            click.echo(f"{url}: ERROR {resultados['error']}")
+    for nombre in next(iter(por_url.values())):
+        if nombre == "error":
+            continue
+        click.echo(f"{'DIFF' if nombre in distintos else 'OK':<6}{nombre}")
+        if nombre in distintos:
+            for url, resultados in por_url.items():
+                click.echo(f"        {url}: {json.dumps(resultados.get(nombre), ensure_ascii=False)}")
+
+    if distintos or any("error" in r for r in por_url.values()):
+        raise SystemExit(1)
+
+
+@app.cli.command("importar")
+@click.argument("entidad", type=click.Choice(list(ENTIDADES)))
+@click.argument("archivo", type=click.File("rb"))
+@click.option("--formato", type=click.Choice(["csv", "json"]), default=None, help="Por defecto, según la extensión.")
+@click.option("--lote", default=500, show_default=True, help="Filas por transacción.")
+def importar_cmd(entidad, archivo, formato, lote):
+    """Importa equipos, jugadores, DTs o eventos desde un CSV o JSON."""
+    formato = formato or formato_de(archivo.name)
+    if formato not in ("csv", "json"):
+        raise click.BadParameter("no se reconoce la extensión, usá --formato", param_hint="archivo")
+
+    r = importar(entidad, archivo, formato, tam_lote=lote)
+    for fila, mensaje in r["errores"]:
+        click.echo(f"fila {fila}: {mensaje}", err=True)
+    click.echo(f"{r['insertados']} insertados, {r['con_errores']} con errores.")
+
+
+@app.cli.command("exportar")
+@click.argument("entidad", type=click.Choice(list(ENTIDADES)))
+@click.argument("archivo", type=click.File("w", encoding="utf-8", lazy=True), default="-")
+@click.option("--formato", type=click.Choice(["csv", "json"]), default="csv", show_default=True)
+def exportar_cmd(entidad, archivo, formato):
+    """Exporta equipos, jugadores, DTs o eventos a CSV o JSON (por defecto a la salida estándar)."""
+    for trozo in exportar(entidad, formato):
+        archivo.write(trozo)
+
+
+@app.cli.command("eventos-reconciliar")
+def eventos_reconciliar():
+    """Corrige inscriptos_count de los eventos que se hayan desfasado."""
+    desfasados = reconciliar()
+    for evento_id, guardado, real in desfasados:
+        click.echo(f"evento {evento_id}: {guardado} -> {real}")
+    click.echo(f"{len(desfasados)} eventos corregidos.")
+
+
+@app.cli.command("buscar-reindexar")
+def buscar_reindexar():
+    """Reconstruye el índice de búsqueda de texto completo."""
+    total = reconstruir_busqueda()
+    click.echo(f"{total} registros indexados.")
+
+
+@app.cli.command("imagenes-procesar")
+@click.option("--procesos", type=int, default=None, help="Procesos del pool (por defecto, uno por núcleo).")
+def imagenes_procesar(procesos):
+    """Genera las variantes AVIF/WebP/JPEG por ancho de static/img. Correr antes de estaticos-construir."""
+    r = procesar_imagenes(app.static_folder, procesos)
+    click.echo(f"{r['imagenes']} imágenes, {r['procesadas']} procesadas ({r['variantes']} variantes), "
+               f"formatos: {', '.join(r['formatos'] + ['jpeg/png'])}.")
+    if r["procesadas"]:
+        click.echo(f"originales: {r['bytes_originales']} bytes, variantes: {r['bytes_variantes']} bytes")
+
+
+@app.cli.command("css-construir")
+def css_construir():
+    """Compila static/css/tailwind.css a static/css/lnb.min.css (solo las clases usadas en templates/)."""
+    tam = compilar_css(app.static_folder)
+    click.echo(f"{CSS_SALIDA}: {tam} bytes")
+
+
+@app.cli.command("css-medir")
+@click.option("--cdn", default="https://cdn.tailwindcss.com", show_default=True, help="Script del compilador en el navegador (antes).")
+@click.option("--veces", default=5, show_default=True, help="Cargas por página y variante para el render.")
+@click.option("--sin-render", is_flag=True, help="Solo los tamaños, sin abrir el navegador.")
+def css_medir(cdn, veces, sin_render):
+    """Compara los estilos por página: compilador del CDN (antes) contra la hoja compilada (después).
+
+    Tamaños transferidos y, en Chromium headless (playwright), first
+    contentful paint y load de cada variante con caché vacía y llena.
+    """
+    import gzip
+
+    paginas = ["/", "/equipos", "/noticias", "/eventos", "/login"]
+
+    with open(os.path.join(app.static_folder, CSS_SALIDA), "rb") as f:
+        hoja = f.read()
+    despues = (len(hoja), len(gzip.compress(hoja)))
+
+    try:
+        script = requests.get(cdn, timeout=15).content
+        antes = (len(script), len(gzip.compress(script)))
+    except requests.RequestException as e:
+        antes = None
+        click.echo(f"No se pudo descargar {cdn}: {e}")
+
+    c = app.test_client()
+    click.echo(f"{'página':<12}{'html':>9}{'antes (gz)':>14}{'después (gz)':>16}")
+    for url in paginas:
+        html = len(gzip.compress(c.get(url).data))
+        total_antes = f"{html + antes[1]}" if antes else "-"
+        click.echo(f"{url:<12}{html:>9}{total_antes:>14}{html + despues[1]:>16}")
+
+    click.echo(f"hoja compilada: {despues[0]} bytes ({despues[1]} gz), se cachea entre páginas")
+    if antes:
+        click.echo(f"compilador CDN: {antes[0]} bytes ({antes[1]} gz), además compila en el navegador en cada página")
+
+    if sin_render:
+        return
+    try:
+        tiempos = medir_render(app, paginas, cdn, veces)
+    except RuntimeError as e:
+        click.echo(str(e))
+        return
+
+    def ms(t, vuelta, metrica):
+        valor = t and t[vuelta][metrica]
+        return f"{valor:.0f}" if valor is not None else "-"
+
+    click.echo(f"\nrender, mediana de {veces} cargas (ms): fcp / load")
+    click.echo(f"{'página':<12}{'antes frío':>14}{'después frío':>16}{'antes caliente':>18}{'después caliente':>20}")
+    for url, t in tiempos.items():
+        columnas = [f"{ms(t[v], vuelta, 'fcp')} / {ms(t[v], vuelta, 'load')}"
+                    for vuelta in ("frio", "caliente") for v in ("cdn", "compilada")]
+        click.echo(f"{url:<12}{columnas[0]:>14}{columnas[1]:>16}{columnas[2]:>18}{columnas[3]:>20}")
+    if any(t["cdn"] is None for t in tiempos.values()):
+        click.echo(f"{cdn} no cargó en el navegador: sin tiempos de antes")
+
+
+@app.cli.command("estaticos-construir")
+def estaticos_construir():
+    """Genera static/dist/ (nombres con hash, .gz/.br y manifiesto). Reiniciar la app después."""
+    r = construir_estaticos(app.static_folder)
+    click.echo(f"{r['archivos']} archivos con hash, {r['comprimidos']} comprimidos.")
+    if r["comprimidos"]:
+        linea = f"texto: {r['bytes']} bytes -> gzip {r['bytes_gz']}"
+        if r["bytes_br"]:
+            linea += f", brotli {r['bytes_br']}"
+        click.echo(linea)
+
+
+@app.cli.command("resumir-todo")
+@click.option("--lote", default=8, show_default=True, help="Textos por lote del modelo.")
+@click.option("--pagina", default=64, show_default=True, help="Artículos leídos por commit/checkpoint.")
+@click.option("--hilos", type=int, default=None, help="Hilos de torch (modo un solo proceso).")
+@click.option("--procesos", type=int, default=0, help="Usar un pool de N procesos.")
+@click.option("--desde-cero", is_flag=True, help="Ignorar el checkpoint anterior.")
+def resumir_todo(lote, pagina, hilos, procesos, desde_cero):
+    """Regenera el resumen de todos los artículos en lotes, con checkpoint."""
+    os.makedirs(app.instance_path, exist_ok=True)
+    ruta = os.path.join(app.instance_path, "resumir_todo.json")
+
+    # si cambia el modelo o sus parámetros, el checkpoint anterior no sirve
+    firma = clave_resumen("")
+    desde_id = 0 if desde_cero else leer_checkpoint(ruta, firma)
+
+    total = Articulo.query.filter(Articulo.id > desde_id).count()
+    if desde_id:
+        click.echo(f"Retomando después del artículo {desde_id}.")
+
+    pool = None
+    if procesos > 1:
+        pool = summ_utills.crear_pool(procesos)
+    elif hilos:
+        summ_utills.configurar_hilos(hilos)
+
+    def resumir(textos):
+        if pool is not None:
+            return summ_utills.resumir_en_procesos(pool, procesos, textos, lote)
+        return summ_utills.resumir_lote(textos, lote)
+
+    try:
+        with click.progressbar(length=total, label="Resumiendo artículos") as barra:
+            for ultimo_id, cantidad in regenerar_resumenes(resumir, desde_id, pagina):
+                guardar_checkpoint(ruta, firma, ultimo_id)
+                barra.update(cantidad)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    click.echo(f"{total} artículos resumidos.")
+
+
 # --------- INICIALIZAR ---------
 
-with app.app_context():
-    db.create_all()
+_iniciada = False
+
+
+def crear_app():
+    """Deja la base lista (tablas, migraciones, índice de búsqueda) y devuelve la app.
+
+    Es el punto de entrada de wsgi.py, de `python app.py` y de `flask`
+    (FLASK_APP=app:crear_app en .flaskenv). Las rutas viven en este
+    módulo, así que hay una sola app por proceso y llamarla de nuevo no
+    repite la inicialización.
+    """
+    global _iniciada
+    if _iniciada:
+        return app
+
+    with app.app_context():
+        db.create_all()
+        for version, descripcion in migrar():
+            app.logger.info("migración v%s: %s", version, descripcion)
+        iniciar_busqueda()
+        matriz_similares()
+
+        # con `gunicorn --preload` esto corre antes del fork: cada worker abre sus conexiones
+        for engine in db.engines.values():
+            engine.dispose()
+
+    _iniciada = True
+    return app
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    crear_app().run(debug=True)
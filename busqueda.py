@@ -0,0 +1,419 @@
+import bisect
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import db, User, Equipo, Jugador, Articulo, Evento, DT
+from paginacion import Pagina, TAM_MAXIMO
+
+# Índice de búsqueda de texto completo.
+#
+# Con SQLite se usa una tabla virtual FTS5 (ranking bm25, sin acentos, por
+# prefijo). Con PostgreSQL, una tabla con un tsvector por fila e índice GIN
+# (el texto se guarda ya normalizado, así tampoco importan los acentos).
+# Con otros motores, o SQLite sin FTS5, se usa un índice invertido en
+# memoria del proceso con el mismo comportamiento; sirve para un solo
+# proceso, no para varios nodos.
+# El índice se mantiene al día con eventos de la sesión de SQLAlchemy: las
+# tablas de FTS5 y PostgreSQL en la misma transacción que el cambio; el
+# índice en memoria al hacer commit (un rollback descarta los cambios).
+
+PESO_TITULO = 10.0
+PESO_CUERPO = 1.0
+
+
+def _unir(*partes):
+    return " ".join(str(p) for p in partes if p)
+
+
+# tipo -> (modelo, titulo, cuerpo)
+CAMPOS = {
+    "usuario": (User, lambda u: u.username, lambda u: _unir(u.mail, u.nombre, u.apellido)),
+    "equipo": (Equipo, lambda e: e.nombre, lambda e: _unir(e.ciudad, e.estadio)),
+    "jugador": (Jugador, lambda j: _unir(j.nombre, j.apellido), lambda j: _unir(j.posicion, j.nacionalidad, j.ciudad)),
+    "dt": (DT, lambda d: _unir(d.nombre, d.apellido), lambda d: _unir(d.nacionalidad, d.ciudad)),
+    "articulo": (Articulo, lambda a: a.titulo, lambda a: a.descripcion),
+    "evento": (Evento, lambda e: e.titulo, lambda e: e.descripcion),
+}
+
+_TIPO_DE_MODELO = {modelo: tipo for tipo, (modelo, _, _) in CAMPOS.items()}
+
+# rowid de cada fila en busqueda_fts: ref_id * 8 + código del tipo. Así
+# reemplazar o borrar una fila es un acceso por rowid, no un recorrido de
+# la tabla (tipo y ref_id no están indexados en FTS5). Los códigos no se
+# pueden cambiar sin reconstruir el índice.
+_CODIGO_TIPO = {"usuario": 0, "equipo": 1, "jugador": 2, "dt": 3, "articulo": 4, "evento": 5}
+_TIPOS_POR_ROWID = 8
+
+
+def _rowid(tipo, id):
+    return id * _TIPOS_POR_ROWID + _CODIGO_TIPO[tipo]
+
+_modo = None   # None (sin iniciar) / "fts5" / "postgres" / "memoria"
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r"\w+", texto.lower())
+
+
+#--------FTS5------------
+
+def _crear_fts():
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5("
+        "tipo UNINDEXED, ref_id UNINDEXED, titulo, cuerpo, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ))
+
+
+def _expresion_fts(q):
+    # cada palabra como prefijo entre comillas: el usuario no puede inyectar sintaxis FTS
+    return " ".join(f'"{t}"*' for t in normalizar(q))
+
+
+def _buscar_fts(q, tipos, limite):
+    expresion = _expresion_fts(q)
+    if not expresion:
+        return []
+
+    marcadores = ", ".join(f":t{i}" for i in range(len(tipos)))
+    params = {f"t{i}": t for i, t in enumerate(tipos)}
+    params.update({"q": expresion, "limite": limite})
+
+    filas = db.session.execute(text(
+        "SELECT tipo, ref_id FROM busqueda_fts "
+        f"WHERE busqueda_fts MATCH :q AND tipo IN ({marcadores}) "
+        f"ORDER BY bm25(busqueda_fts, 0, 0, {PESO_TITULO}, {PESO_CUERPO}) "
+        "LIMIT :limite"
+    ), params)
+    return [(tipo, int(ref_id)) for tipo, ref_id in filas]
+
+
+#--------POSTGRES------------
+
+def _crear_postgres():
+    db.session.execute(text(
+        "CREATE TABLE IF NOT EXISTS busqueda_docs ("
+        "tipo VARCHAR(20) NOT NULL, ref_id INTEGER NOT NULL, documento TSVECTOR NOT NULL, "
+        "PRIMARY KEY (tipo, ref_id))"
+    ))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_busqueda_docs_documento ON busqueda_docs USING GIN (documento)"
+    ))
+
+
+def _consulta_postgres(q):
+    # solo letras y números: el usuario no puede inyectar sintaxis de tsquery
+    palabras = [p for p in normalizar(q) if p.isalnum()]
+    return " & ".join(f"{p}:*" for p in palabras)
+
+
+def _buscar_postgres(q, tipos, limite):
+    consulta = _consulta_postgres(q)
+    if not consulta:
+        return []
+
+    # pesos A (título) y D (cuerpo) de ts_rank: 1.0 y 0.1, la misma proporción que en FTS5
+    filas = db.session.execute(text(
+        "SELECT tipo, ref_id FROM busqueda_docs, to_tsquery('simple', :q) consulta "
+        "WHERE documento @@ consulta AND tipo IN :tipos "
+        "ORDER BY ts_rank(documento, consulta) DESC, ref_id "
+        "LIMIT :limite"
+    ).bindparams(bindparam("tipos", expanding=True)), {"q": consulta, "tipos": tipos, "limite": limite})
+    return [(tipo, ref_id) for tipo, ref_id in filas]
+
+
+#--------MEMORIA------------
+
+_terminos = defaultdict(dict)   # termino -> {(tipo, id): peso}
+_docs = {}                      # (tipo, id) -> términos del documento
+_vocabulario = []               # términos ordenados, para buscar por prefijo
+_vocabulario_sucio = True
+_memoria_cargada = False
+
+
+def _indexar_memoria(tipo, id, titulo, cuerpo):
+    global _vocabulario_sucio
+
+    _desindexar_memoria(tipo, id)
+
+    pesos = Counter()
+    for t in normalizar(titulo):
+        pesos[t] += PESO_TITULO
+    for t in normalizar(cuerpo):
+        pesos[t] += PESO_CUERPO
+
+    for t, peso in pesos.items():
+        _terminos[t][(tipo, id)] = peso
+    _docs[(tipo, id)] = set(pesos)
+    _vocabulario_sucio = True
+
+
+def _desindexar_memoria(tipo, id):
+    global _vocabulario_sucio
+
+    terminos = _docs.pop((tipo, id), ())
+    for t in terminos:
+        _terminos[t].pop((tipo, id), None)
+    if terminos:
+        _vocabulario_sucio = True   # un término sin documentos no puede quedar en el vocabulario
+
+
+def _buscar_memoria(q, tipos, limite):
+    global _vocabulario, _vocabulario_sucio
+
+    if not _memoria_cargada:
+        reconstruir()
+
+    if _vocabulario_sucio:
+        _vocabulario = sorted(t for t, docs in _terminos.items() if docs)
+        _vocabulario_sucio = False
+
+    palabras = normalizar(q)
+    if not palabras:
+        return []
+
+    total = max(len(_docs), 1)
+    puntajes = None
+
+    for palabra in palabras:
+        encontrados = Counter()
+        i = bisect.bisect_left(_vocabulario, palabra)
+        while i < len(_vocabulario) and _vocabulario[i].startswith(palabra):
+            docs = _terminos[_vocabulario[i]]
+            idf = math.log(1 + total / len(docs))
+            for doc, peso in docs.items():
+                if doc[0] in tipos:
+                    encontrados[doc] += peso * idf
+            i += 1
+
+        # todas las palabras tienen que aparecer (AND), igual que en FTS5
+        if puntajes is None:
+            puntajes = encontrados
+        else:
+            puntajes = Counter({d: p + encontrados[d] for d, p in puntajes.items() if d in encontrados})
+
+    return [doc for doc, _ in puntajes.most_common(limite)]
+
+
+#--------SINCRONIZACION------------
+
+# OR REPLACE: reindexar una fila reemplaza la anterior por rowid, y una fila
+# vieja que quedó de un borrado fuera de la sesión (ON DELETE CASCADE, un id
+# reusado) no choca con la nueva
+_INSERTAR_FTS = text(
+    "INSERT OR REPLACE INTO busqueda_fts (rowid, tipo, ref_id, titulo, cuerpo) "
+    "VALUES (:rowid, :tipo, :id, :titulo, :cuerpo)"
+)
+_BORRAR_FTS = text("DELETE FROM busqueda_fts WHERE rowid = :rowid")
+
+
+def _fila_fts(tipo, obj):
+    _, titulo, cuerpo = CAMPOS[tipo]
+    return {"rowid": _rowid(tipo, obj.id), "tipo": tipo, "id": obj.id,
+            "titulo": titulo(obj) or "", "cuerpo": cuerpo(obj) or ""}
+
+
+def _indexar(conexion, tipo, obj):
+    _, titulo, cuerpo = CAMPOS[tipo]
+
+    if _modo == "fts5":
+        conexion.execute(_INSERTAR_FTS, _fila_fts(tipo, obj))
+    elif _modo == "postgres":
+        conexion.execute(text(
+            "INSERT INTO busqueda_docs (tipo, ref_id, documento) VALUES (:tipo, :id, "
+            "setweight(to_tsvector('simple', :titulo), 'A') || setweight(to_tsvector('simple', :cuerpo), 'D')) "
+            "ON CONFLICT (tipo, ref_id) DO UPDATE SET documento = EXCLUDED.documento"
+        ), {"tipo": tipo, "id": obj.id,
+            "titulo": " ".join(normalizar(titulo(obj))), "cuerpo": " ".join(normalizar(cuerpo(obj)))})
+    elif _memoria_cargada:
+        _indexar_memoria(tipo, obj.id, titulo(obj), cuerpo(obj))
+
+
+def _desindexar(conexion, tipo, id):
+    if _modo == "fts5":
+        conexion.execute(_BORRAR_FTS, {"rowid": _rowid(tipo, id)})
+    elif _modo == "postgres":
+        conexion.execute(text("DELETE FROM busqueda_docs WHERE tipo = :tipo AND ref_id = :id"),
+                         {"tipo": tipo, "id": id})
+    elif _memoria_cargada:
+        _desindexar_memoria(tipo, id)
+
+
+def _encolar_memoria(session, tipo, obj, borrado=False):
+    # el índice en memoria no es parte de la transacción: los cambios se
+    # aplican en after_commit y se descartan si hay rollback
+    if not _memoria_cargada:
+        return   # la primera búsqueda lo arma desde la base
+    _, titulo, cuerpo = CAMPOS[tipo]
+    textos = None if borrado else (titulo(obj), cuerpo(obj))
+    session.info.setdefault("busqueda", []).append((tipo, obj.id, textos))
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar(session, flush_context):
+    if _modo is None:
+        return
+
+    nuevos = [o for o in session.new if type(o) in _TIPO_DE_MODELO]
+    cambios = [o for o in session.dirty if type(o) in _TIPO_DE_MODELO and session.is_modified(o)]
+    borrados = [o for o in session.deleted if type(o) in _TIPO_DE_MODELO]
+
+    if not (nuevos or cambios or borrados):
+        return
+
+    if _modo == "memoria":
+        for obj in nuevos + cambios:
+            _encolar_memoria(session, _TIPO_DE_MODELO[type(obj)], obj)
+        for obj in borrados:
+            _encolar_memoria(session, _TIPO_DE_MODELO[type(obj)], obj, borrado=True)
+        return
+
+    conexion = session.connection()
+    for obj in nuevos + cambios:
+        _indexar(conexion, _TIPO_DE_MODELO[type(obj)], obj)
+    for obj in borrados:
+        _desindexar(conexion, _TIPO_DE_MODELO[type(obj)], obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_al_commit(session):
+    for tipo, id, textos in session.info.pop("busqueda", ()):
+        if textos is None:
+            _desindexar_memoria(tipo, id)
+        else:
+            _indexar_memoria(tipo, id, *textos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session):
+    session.info.pop("busqueda", None)
+
+
+def indexar_filas(modelo, filas):
+    """Indexa filas nuevas insertadas sin pasar por el flush (bulk_insert_mappings).
+
+    `filas` son los mappings insertados, con el id ya asignado.
+    """
+    if _modo is None or not filas:
+        return
+    tipo = _TIPO_DE_MODELO[modelo]
+    objetos = [SimpleNamespace(**f) for f in filas]
+
+    if _modo == "memoria":
+        for obj in objetos:
+            _encolar_memoria(db.session, tipo, obj)
+        return
+
+    conexion = db.session.connection()
+    if _modo == "fts5":
+        conexion.execute(_INSERTAR_FTS, [_fila_fts(tipo, o) for o in objetos])   # executemany
+        return
+    for obj in objetos:
+        _indexar(conexion, tipo, obj)
+
+
+#--------API------------
+
+def iniciar_busqueda():
+    """Crea el índice FTS5 o el de PostgreSQL si se puede (si no, queda el índice en memoria).
+
+    Llamar dentro de un app context, después de db.create_all().
+    """
+    global _modo
+
+    if db.engine.dialect.name == "sqlite":
+        try:
+            _crear_fts()
+            db.session.commit()
+            _modo = "fts5"
+        except OperationalError:
+            db.session.rollback()
+            _modo = "memoria"
+    elif db.engine.dialect.name == "postgresql":
+        _crear_postgres()
+        db.session.commit()
+        _modo = "postgres"
+    else:
+        _modo = "memoria"
+
+    if _modo == "fts5":
+        # vacío, o armado antes de que los rowid salieran de (tipo, ref_id)
+        fila = db.session.execute(text("SELECT rowid, tipo, ref_id FROM busqueda_fts LIMIT 1")).first()
+        if fila is None or fila.rowid != _rowid(fila.tipo, int(fila.ref_id)):
+            reconstruir()
+    elif _modo == "postgres":
+        if db.session.execute(text("SELECT count(*) FROM busqueda_docs")).scalar() == 0:
+            reconstruir()
+
+    return _modo
+
+
+def reconstruir():
+    """Vuelve a indexar todas las filas de todos los modelos."""
+    global _memoria_cargada
+
+    if _modo == "fts5":
+        db.session.execute(text("DELETE FROM busqueda_fts"))
+    elif _modo == "postgres":
+        db.session.execute(text("DELETE FROM busqueda_docs"))
+    else:
+        _terminos.clear()
+        _docs.clear()
+        _memoria_cargada = True
+
+    conexion = db.session.connection()
+    total = 0
+    for tipo, (modelo, _, _) in CAMPOS.items():
+        for obj in modelo.query.yield_per(500):
+            _indexar(conexion, tipo, obj)
+            total += 1
+
+    db.session.commit()
+    return total
+
+
+def buscar(q, tipos=None, limite=50):
+    """Lista de (tipo, id) ordenada por relevancia."""
+    tipos = list(tipos or CAMPOS)
+
+    if _modo == "fts5":
+        return _buscar_fts(q, tipos, limite)
+    if _modo == "postgres":
+        return _buscar_postgres(q, tipos, limite)
+    return _buscar_memoria(q, tipos, limite)
+
+
+SOBREPEDIDO = 4        # cuánto más pedir al índice por vuelta si los filtros descartan resultados
+SOBREPEDIDO_MAXIMO = 64
+
+
+def resultados(query, tipo, q, limite=TAM_MAXIMO):
+    """Aplica la búsqueda a una query del modelo del tipo, respetando el ranking.
+
+    La query puede traer filtros propios (se aplican además de la
+    búsqueda) y opciones de carga. Como el índice no conoce esos filtros,
+    si descartan resultados se le piden más (hasta llenar el límite o
+    agotar las coincidencias). Devuelve una Pagina sin siguiente.
+    """
+    modelo = CAMPOS[tipo][0]
+    pedidos = limite
+    while True:
+        ids = [id for _, id in buscar(q, [tipo], pedidos)]
+        if not ids:
+            return Pagina([], None)
+
+        por_id = {obj.id: obj for obj in query.filter(modelo.id.in_(ids))}
+        if len(por_id) >= limite or len(ids) < pedidos or pedidos >= limite * SOBREPEDIDO_MAXIMO:
+            break
+        pedidos *= SOBREPEDIDO
+
+    return Pagina([por_id[id] for id in ids if id in por_id][:limite], None)
@@ -0,0 +1,287 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Equipo, Jugador, DT, Articulo, Evento, EventoAficionado
+
+# Cache de páginas públicas para visitantes anónimos.
+#
+# Cada página cacheada se guarda con etiquetas ("equipo:3", "noticias").
+# Cuando se hace commit de un cambio en un modelo, se invalidan solo las
+# etiquetas de las páginas que muestran ese dato (ver _etiquetas_de).
+#
+# Backends: "memoria" (LRU por proceso, default), una URL redis:// (o
+# cualquier servidor compatible, compartido entre procesos) u "off".
+# "memoria" sirve con un solo proceso: con varios, una invalidación solo
+# llega al que hizo el cambio (gunicorn.conf.py no arranca así).
+
+TTL_DEFAULT = 300
+MAX_ENTRADAS = 500
+
+
+class CacheMemoria:
+    compartido = False
+
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()   # clave -> (expira, valor, etiquetas)
+        self._etiquetas = {}          # etiqueta -> set(claves)
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] < time.monotonic():
+                self._borrar(clave)
+                return None
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def set(self, clave, valor, ttl, etiquetas):
+        with self._lock:
+            self._borrar(clave)
+            self._datos[clave] = (time.monotonic() + ttl, valor, etiquetas)
+            for e in etiquetas:
+                self._etiquetas.setdefault(e, set()).add(clave)
+
+            while len(self._datos) > self.max_entradas:
+                self._borrar(next(iter(self._datos)))
+
+    def invalidar(self, etiquetas):
+        with self._lock:
+            for e in etiquetas:
+                for clave in self._etiquetas.pop(e, ()):
+                    self._borrar(clave)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._etiquetas.clear()
+
+    def _borrar(self, clave):
+        entrada = self._datos.pop(clave, None)
+        if entrada is None:
+            return
+        for e in entrada[2]:
+            claves = self._etiquetas.get(e)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._etiquetas[e]
+
+
+def _a_json(valor):
+    cuerpo, content_type = valor
+    return json.dumps([base64.b64encode(cuerpo).decode("ascii"), content_type])
+
+
+def _de_json(crudo):
+    """(cuerpo, content_type) guardado por _a_json, o None si la entrada no tiene ese formato."""
+    try:
+        cuerpo, content_type = json.loads(crudo)
+        return base64.b64decode(cuerpo, validate=True), str(content_type)
+    except (ValueError, TypeError):
+        return None
+
+
+class CacheRedis:
+    """Backend sobre Redis (o compatible). El LRU lo hace el servidor (maxmemory-policy allkeys-lru).
+
+    Las páginas se guardan como JSON (cuerpo en base64 y content type):
+    nada de lo que se lee de Redis se ejecuta, aunque otro lo haya escrito.
+    """
+
+    PREFIJO = "lnb:pagina:"
+    compartido = True
+
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def get(self, clave):
+        crudo = self.redis.get(self.PREFIJO + clave)
+        return _de_json(crudo) if crudo is not None else None
+
+    def set(self, clave, valor, ttl, etiquetas):
+        pipe = self.redis.pipeline()
+        pipe.set(self.PREFIJO + clave, _a_json(valor), ex=ttl)
+        for e in etiquetas:
+            pipe.sadd(self.PREFIJO + "tag:" + e, clave)
+            pipe.expire(self.PREFIJO + "tag:" + e, ttl)
+        pipe.execute()
+
+    def invalidar(self, etiquetas):
+        for e in etiquetas:
+            clave_tag = self.PREFIJO + "tag:" + e
+            claves = [self.PREFIJO + c.decode() for c in self.redis.smembers(clave_tag)]
+            self.redis.delete(clave_tag, *claves)
+
+    def limpiar(self):
+        for clave in self.redis.scan_iter(self.PREFIJO + "*"):
+            self.redis.delete(clave)
+
+    def contador(self, nombre):
+        crudo = self.redis.get(self.PREFIJO + "contador:" + nombre)
+        return int(crudo) if crudo is not None else 0
+
+    def incrementar(self, nombres):
+        pipe = self.redis.pipeline()
+        for nombre in nombres:
+            pipe.incr(self.PREFIJO + "contador:" + nombre)
+        pipe.execute()
+
+
+def iniciar_cache(app):
+    config = app.config.get("CACHE_PAGINAS", "memoria")
+
+    if config == "off":
+        backend = None
+    elif config.startswith("redis://") or config.startswith("rediss://"):
+        backend = CacheRedis(config)
+    else:
+        backend = CacheMemoria(app.config.get("CACHE_PAGINAS_MAX", MAX_ENTRADAS))
+
+    app.extensions["cache_paginas"] = backend
+    return backend
+
+
+def _backend():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("cache_paginas")
+
+
+def invalidar(*etiquetas):
+    backend = _backend()
+    if backend is not None and etiquetas:
+        backend.invalidar(set(etiquetas))
+
+
+def contador(nombre):
+    """Contador compartido entre procesos, o None si el backend es por proceso (o no hay)."""
+    backend = _backend()
+    if backend is None or not backend.compartido:
+        return None
+    return backend.contador(nombre)
+
+
+def incrementar(*nombres):
+    backend = _backend()
+    if backend is not None and backend.compartido and nombres:
+        backend.incrementar(nombres)
+
+
+#--------DECORADOR------------
+
+def cache_pagina(*etiquetas, ttl=None):
+    """Cachea la respuesta de la vista para visitantes anónimos.
+
+    Las etiquetas pueden usar los parámetros de la ruta: "equipo:{id}".
+    La clave incluye endpoint, parámetros de la ruta y query string.
+    Con mensajes flash pendientes no se usa el cache: la página los
+    muestra una sola vez.
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            backend = _backend()
+            if (backend is None or request.method != "GET" or current_user.is_authenticated
+                    or session.get("_flashes")):
+                return f(*args, **kwargs)
+
+            clave = f"{request.endpoint}:{sorted(kwargs.items())}:{sorted(request.args.items(multi=True))}"
+
+            guardado = backend.get(clave)
+            if guardado is not None:
+                cuerpo, content_type = guardado
+                resp = make_response(cuerpo)
+                resp.content_type = content_type
+                resp.headers["X-Cache"] = "HIT"
+                return resp
+
+            resp = make_response(f(*args, **kwargs))
+            if resp.status_code == 200 and not resp.direct_passthrough:
+                backend.set(
+                    clave,
+                    (resp.get_data(), resp.content_type),
+                    ttl or current_app.config.get("CACHE_PAGINAS_TTL", TTL_DEFAULT),
+                    [e.format(**kwargs) for e in etiquetas],
+                )
+            resp.headers["X-Cache"] = "MISS"
+            return resp
+        return envoltura
+    return decorador
+
+
+#--------INVALIDACION------------
+
+def _valores(obj, atributo):
+    """Valor actual y anterior (si cambió en este flush) de un atributo."""
+    historia = inspect(obj).attrs[atributo].history
+    valores = set(historia.added) | set(historia.unchanged) | set(historia.deleted)
+    if not valores:
+        valores = {getattr(obj, atributo)}
+    return {v for v in valores if v is not None}
+
+
+def _etiquetas_de(obj):
+    if isinstance(obj, Equipo):
+        # el nombre del equipo aparece en las fichas de jugadores y en el inicio
+        return {"equipos", f"equipo:{obj.id}", "jugadores", "index"}
+    if isinstance(obj, Jugador):
+        etiquetas = {f"jugador:{obj.id}", "index"} | {f"equipo:{e}" for e in _valores(obj, "equipo_id")}
+        if obj.aficionado_id is None:
+            etiquetas.add("jugadores")   # las fichas muestran similares y percentiles de la liga
+        return etiquetas
+    if isinstance(obj, DT):
+        return {f"equipo:{e}" for e in _valores(obj, "equipo_id")}
+    if isinstance(obj, Articulo):
+        return {f"articulo:{obj.id}", "noticias", "index"}
+    if isinstance(obj, Evento):
+        return {f"evento:{obj.id}", "eventos", "index"}
+    if isinstance(obj, EventoAficionado):
+        return {f"evento:{e}" for e in _valores(obj, "evento_id")} | {"eventos"}
+    return set()
+
+
+def invalidar_filas(modelo, filas):
+    """Invalida las páginas que muestran filas nuevas insertadas sin pasar por el flush (bulk inserts).
+
+    Alcanza con una instancia por equipo: las filas nuevas todavía no
+    tienen páginas propias cacheadas.
+    """
+    con_equipo = "equipo_id" in modelo.__table__.c
+    etiquetas = set()
+    for equipo_id in {f.get("equipo_id") for f in filas}:
+        etiquetas |= _etiquetas_de(modelo(equipo_id=equipo_id) if con_equipo else modelo())
+    invalidar(*(e for e in etiquetas if not e.endswith(":None")))
+
+
+@event.listens_for(Session, "after_flush")
+def _juntar_etiquetas(session, flush_context):
+    etiquetas = session.info.setdefault("cache_etiquetas", set())
+    cambios = list(session.new) + [o for o in session.dirty if session.is_modified(o)]
+    for obj in cambios + list(session.deleted):
+        etiquetas |= _etiquetas_de(obj)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_al_commit(session):
+    etiquetas = session.info.pop("cache_etiquetas", None)
+    if etiquetas:
+        invalidar(*etiquetas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_etiquetas(session):
+    session.info.pop("cache_etiquetas", None)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import datetime
+
+from models import db, ResumenCache
+from summ_utills import PARAMS_GENERACION, firma_modelo, resumir_lote, resumir_texto
+
+MAX_ENTRADAS = 5000
+
+_contadores = {"hits": 0, "misses": 0}
+
+
+def normalizar_texto(texto):
+    texto = unicodedata.normalize("NFC", texto or "")
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+def clave_resumen(texto, modelo=None, params=None):
+    """Hash del texto normalizado junto con el modelo (y backend) y los parámetros de generación.
+
+    Si cambia el modelo o los parámetros, cambian todas las claves y el
+    cache viejo simplemente deja de usarse (y se termina desalojando).
+    """
+    base = json.dumps(
+        {
+            "texto": normalizar_texto(texto),
+            "modelo": modelo or firma_modelo(),
+            "params": params or PARAMS_GENERACION,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+def buscar_resumen(texto):
+    entrada = db.session.get(ResumenCache, clave_resumen(texto))
+
+    if entrada is None:
+        _contadores["misses"] += 1
+        return None
+
+    _contadores["hits"] += 1
+    entrada.hits = (entrada.hits or 0) + 1
+    entrada.ultimo_uso = datetime.utcnow()
+    return entrada.resumen
+
+
+def guardar_resumen(texto, resumen):
+    _guardar(clave_resumen(texto), resumen)
+    db.session.flush()
+    desalojar()
+
+
+def _guardar(clave, resumen):
+    entrada = db.session.get(ResumenCache, clave)
+
+    if entrada is None:
+        entrada = ResumenCache(clave=clave)
+        db.session.add(entrada)
+
+    entrada.resumen = resumen[:500] if resumen else resumen
+    entrada.ultimo_uso = datetime.utcnow()
+
+
+def desalojar(max_entradas=MAX_ENTRADAS):
+    """Borra las entradas usadas hace más tiempo hasta quedar en max_entradas."""
+    sobrantes = ResumenCache.query.count() - max_entradas
+    if sobrantes <= 0:
+        return 0
+
+    viejas = (
+        db.session.query(ResumenCache.clave)
+        .order_by(ResumenCache.ultimo_uso.asc())
+        .limit(sobrantes)
+    )
+    return (
+        ResumenCache.query
+        .filter(ResumenCache.clave.in_(viejas.scalar_subquery()))
+        .delete(synchronize_session=False)
+    )
+
+
+def resumir_con_cache(texto):
+    resumen = buscar_resumen(texto)
+    if resumen is not None:
+        return resumen
+
+    resumen = resumir_texto(texto)
+    guardar_resumen(texto, resumen)
+    return resumen
+
+
+def resumir_lote_con_cache(textos, resumir=resumir_lote):
+    """Versión por lotes de resumir_con_cache.
+
+    Busca todas las claves en una sola consulta y solo manda al modelo
+    los textos que faltan (una vez por texto distinto).
+    """
+    claves = [clave_resumen(t) for t in textos]
+    ahora = datetime.utcnow()
+
+    encontradas = {}
+    for entrada in ResumenCache.query.filter(ResumenCache.clave.in_(set(claves))):
+        entrada.hits = (entrada.hits or 0) + 1
+        entrada.ultimo_uso = ahora
+        encontradas[entrada.clave] = entrada.resumen
+
+    faltantes = {}
+    for clave, texto in zip(claves, textos):
+        if clave in encontradas:
+            _contadores["hits"] += 1
+        else:
+            _contadores["misses"] += 1
+            faltantes.setdefault(clave, texto)
+
+    if faltantes:
+        nuevos = resumir(list(faltantes.values()))
+        for clave, resumen in zip(faltantes, nuevos):
+            _guardar(clave, resumen)
+            encontradas[clave] = resumen
+
+        db.session.flush()
+        desalojar()
+
+    return [encontradas[clave] for clave in claves]
+
+
+def estadisticas():
+    return {
+        "hits": _contadores["hits"],
+        "misses": _contadores["misses"],
+        "entradas": ResumenCache.query.count(),
+        "hits_historicos": db.session.query(db.func.coalesce(db.func.sum(ResumenCache.hits), 0)).scalar(),
+        "max_entradas": MAX_ENTRADAS,
+    }
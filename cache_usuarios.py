@@ -0,0 +1,71 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.orm import Session, joinedload
+
+from cache_paginas import contador, incrementar
+from models import db, User
+
+# Cache del usuario logueado para login_manager.user_loader.
+#
+# Guarda por id una copia desconectada del usuario con equipo_favorito y
+# jugador_favorito ya cargados (una sola consulta con joins). En cada
+# request la copia se une a la sesión con merge(load=False), que no
+# consulta la base: el usuario queda en la sesión igual que si se hubiera
+# cargado con una consulta y se puede modificar y commitear.
+#
+# El cache es por proceso. Las rutas que modifican al usuario llaman a
+# invalidar_usuario(). Con el cache de páginas en Redis la invalidación
+# llega también a los otros procesos: cada usuario tiene un contador
+# compartido que invalidar_usuario() incrementa, y una copia guardada con
+# otro valor del contador se vuelve a cargar. Sin backend compartido, el
+# TTL corto acota cuánto puede quedar vieja la copia en otro proceso.
+
+TTL_DEFAULT = 30
+
+_usuarios = {}   # id -> (expira, contador, usuario desconectado)
+_lock = threading.Lock()
+
+
+def _cargar(user_id):
+    # sesión aparte: la copia no debe quedar atada a la sesión del request
+    with Session(db.engine) as sesion:
+        usuario = sesion.get(
+            User, user_id,
+            options=[joinedload(User.equipo_favorito), joinedload(User.jugador_favorito)],
+        )
+        sesion.expunge_all()
+    return usuario
+
+
+def cargar_usuario(user_id):
+    """Usuario unido a db.session, desde el cache si está vigente."""
+    ttl = current_app.config.get("CACHE_USUARIOS_TTL", TTL_DEFAULT)
+    ahora = time.monotonic()
+    version = contador(f"usuario:{user_id}")   # antes de leer la base
+
+    with _lock:
+        entrada = _usuarios.get(user_id)
+    if entrada is None or entrada[0] < ahora or entrada[1] != version:
+        usuario = _cargar(user_id)
+        if usuario is None:
+            invalidar_usuario(user_id)
+            return None
+        entrada = (ahora + ttl, version, usuario)
+        with _lock:
+            _usuarios[user_id] = entrada
+
+    return db.session.merge(entrada[2], load=False)
+
+
+def invalidar_usuario(*user_ids):
+    with _lock:
+        for user_id in user_ids:
+            _usuarios.pop(user_id, None)
+    incrementar(*(f"usuario:{user_id}" for user_id in user_ids))
+
+
+def limpiar():
+    with _lock:
+        _usuarios.clear()
@@ -0,0 +1,278 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from cache_resumenes import buscar_resumen, normalizar_texto, resumir_con_cache, resumir_lote_con_cache
+from models import db, Articulo, ResumenJob
+from summ_utills import elegir_estrategia, precalentar, resumir_extractivo
+
+ESPERA_BASE = 30          # segundos antes del primer reintento, se duplica en cada fallo
+INTERVALO_POLL = 2        # segundos que duerme el worker cuando no hay trabajos
+TIMEOUT_PROCESANDO = 600  # un job "procesando" más viejo que esto quedó colgado
+
+
+def encolar_resumen(articulo):
+    """Marca el artículo como pendiente y deja un job para el worker.
+
+    El artículo ya tiene que tener id (hacer flush antes si es nuevo).
+    No hace commit: queda en la misma transacción que el guardado.
+    """
+    articulo.resumen_estado = "pendiente"
+
+    job = ResumenJob.query.filter_by(articulo_id=articulo.id, estado="pendiente").first()
+    if job is None:
+        job = ResumenJob(articulo_id=articulo.id)
+        db.session.add(job)
+    else:
+        job.proximo_intento = datetime.utcnow()
+
+    return job
+
+
+def pendientes():
+    return ResumenJob.query.filter_by(estado="pendiente").count()
+
+
+def generar_resumen(texto, en_cola=0):
+    """Resume un texto con la estrategia que elija la política.
+
+    Devuelve (resumen, estrategia).
+    """
+    estrategia = elegir_estrategia(texto, en_cola)
+
+    if estrategia == "extractivo":
+        return resumir_extractivo(texto), estrategia
+
+    return resumir_con_cache(texto), estrategia
+
+
+def _aplicar_resumen(articulo, resumen, estrategia):
+    articulo.resumen = resumen[:500] if resumen else resumen
+    articulo.resumen_estrategia = estrategia
+
+
+def programar_resumen(articulo, descripcion_anterior=None):
+    """Resuelve el resumen sin pasar por el modelo cuando se puede.
+
+    - Si la descripción no cambió y el resumen está al día, no hace nada.
+    - Si a la política le alcanza con el extractivo (texto corto o cola
+      cargada), lo calcula en el momento: son milisegundos.
+    - Si el texto ya está en el cache, copia el resumen y lo marca listo.
+    - Si no, lo encola para el worker.
+    """
+    if (
+        descripcion_anterior is not None
+        and articulo.resumen_estado == "listo"
+        and normalizar_texto(descripcion_anterior) == normalizar_texto(articulo.descripcion)
+    ):
+        return None
+
+    if elegir_estrategia(articulo.descripcion, pendientes()) == "extractivo":
+        _aplicar_resumen(articulo, resumir_extractivo(articulo.descripcion), "extractivo")
+        articulo.resumen_estado = "listo"
+        return None
+
+    cacheado = buscar_resumen(articulo.descripcion)
+    if cacheado is not None:
+        _aplicar_resumen(articulo, cacheado, "abstractivo")
+        articulo.resumen_estado = "listo"
+        return None
+
+    return encolar_resumen(articulo)
+
+
+def estado_resumen(articulo_id):
+    job = (
+        ResumenJob.query
+        .filter_by(articulo_id=articulo_id)
+        .order_by(ResumenJob.id.desc())
+        .first()
+    )
+    if job is None:
+        return None
+
+    return {
+        "job_id": job.id,
+        "estado": job.estado,
+        "intentos": job.intentos,
+        "max_intentos": job.max_intentos,
+        "error": job.error,
+        "creado": job.creado.isoformat() if job.creado else None,
+        "actualizado": job.actualizado.isoformat() if job.actualizado else None,
+    }
+
+
+def liberar_colgados():
+    """Devuelve a la cola los jobs que quedaron 'procesando' por un worker caído."""
+    limite = datetime.utcnow() - timedelta(seconds=TIMEOUT_PROCESANDO)
+    filas = (
+        ResumenJob.query
+        .filter(ResumenJob.estado == "procesando", ResumenJob.actualizado < limite)
+        .update({"estado": "pendiente"}, synchronize_session=False)
+    )
+    db.session.commit()
+    return filas
+
+
+def tomar_siguiente():
+    """Reserva el próximo job pendiente.
+
+    La reserva es un UPDATE condicionado al estado, así dos workers
+    nunca procesan el mismo job.
+    """
+    while True:
+        ahora = datetime.utcnow()
+        candidato = (
+            ResumenJob.query
+            .filter(ResumenJob.estado == "pendiente", ResumenJob.proximo_intento <= ahora)
+            .order_by(ResumenJob.id.asc())
+            .first()
+        )
+        if candidato is None:
+            return None
+
+        filas = (
+            ResumenJob.query
+            .filter_by(id=candidato.id, estado="pendiente")
+            .update({
+                "estado": "procesando",
+                "intentos": ResumenJob.intentos + 1,
+                "actualizado": ahora,
+            }, synchronize_session=False)
+        )
+        db.session.commit()
+
+        if filas:
+            return db.session.get(ResumenJob, candidato.id, populate_existing=True)
+
+
+def procesar_job(job):
+    articulo = db.session.get(Articulo, job.articulo_id)
+
+    try:
+        resumen, estrategia = generar_resumen(articulo.descripcion, pendientes())
+    except Exception as e:
+        db.session.rollback()
+        _registrar_fallo(job.id, e)
+        return False
+
+    job.estado = "listo"
+    job.error = None
+    job.actualizado = datetime.utcnow()
+
+    _aplicar_resumen(articulo, resumen, estrategia)
+
+    # Si lo editaron mientras se resumía, queda otro job pendiente con el texto nuevo
+    otro = ResumenJob.query.filter_by(articulo_id=articulo.id, estado="pendiente").first()
+    if otro is None:
+        articulo.resumen_estado = "listo"
+
+    db.session.commit()
+    return True
+
+
+def _registrar_fallo(job_id, error):
+    job = db.session.get(ResumenJob, job_id)
+    ahora = datetime.utcnow()
+
+    job.error = str(error)[:500]
+    job.actualizado = ahora
+
+    if job.intentos >= job.max_intentos:
+        job.estado = "error"
+        job.articulo.resumen_estado = "error"
+    else:
+        job.estado = "pendiente"
+        job.proximo_intento = ahora + timedelta(seconds=ESPERA_BASE * 2 ** (job.intentos - 1))
+
+    db.session.commit()
+
+
+def ejecutar_worker(una_vez=False, precalentar_modelo=True):
+    """Loop del worker. Con una_vez=True vacía la cola y termina.
+
+    Por defecto carga el modelo antes de tomar el primer job, así la
+    carga en frío no cuenta para ningún artículo.
+    """
+    if precalentar_modelo:
+        precalentar()
+
+    liberar_colgados()
+    procesados = 0
+
+    while True:
+        job = tomar_siguiente()
+
+        if job is None:
+            if una_vez:
+                return procesados
+            time.sleep(INTERVALO_POLL)
+            continue
+
+        procesar_job(job)
+        procesados += 1
+
+
+# --------- REGENERACION MASIVA ---------
+
+def regenerar_resumenes(resumir, desde_id=0, tam_pagina=64):
+    """Recorre todos los artículos por id y les regenera el resumen.
+
+    Cada artículo pasa por elegir_estrategia como en el worker; los que
+    van al modelo se resumen juntos en lotes. Lee de a una página (keyset
+    sobre id, sin OFFSET) así la memoria no crece con el tamaño del archivo. Hace commit por página y devuelve
+    (ultimo_id, cantidad) después de cada una para poder guardar el
+    checkpoint.
+    """
+    while True:
+        pagina = (
+            Articulo.query
+            .filter(Articulo.id > desde_id)
+            .order_by(Articulo.id.asc())
+            .limit(tam_pagina)
+            .all()
+        )
+        if not pagina:
+            return
+
+        # la misma política que el worker: solo los abstractivos van al modelo, en lote
+        estrategias = [elegir_estrategia(a.descripcion) for a in pagina]
+        abstractivos = [a for a, e in zip(pagina, estrategias) if e == "abstractivo"]
+        resumenes = dict(zip(
+            (a.id for a in abstractivos),
+            resumir_lote_con_cache([a.descripcion for a in abstractivos], resumir=resumir) if abstractivos else [],
+        ))
+
+        for articulo, estrategia in zip(pagina, estrategias):
+            if estrategia == "extractivo":
+                resumen = resumir_extractivo(articulo.descripcion)
+            else:
+                resumen = resumenes[articulo.id]
+            _aplicar_resumen(articulo, resumen, estrategia)
+            articulo.resumen_estado = "listo"
+
+        db.session.commit()
+
+        desde_id = pagina[-1].id
+        yield desde_id, len(pagina)
+
+
+def leer_checkpoint(ruta, firma):
+    """Último id procesado, o 0 si no hay checkpoint o es de otro modelo/parámetros."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return 0
+
+    if datos.get("firma") != firma:
+        return 0
+    return datos.get("ultimo_id", 0)
+
+
+def guardar_checkpoint(ruta, firma, ultimo_id):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"firma": firma, "ultimo_id": ultimo_id}, f)
+    os.replace(tmp, ruta)
@@ -0,0 +1,50 @@
+import os
+
+# Configuración desde variables de entorno (o .env, que carga app.py).
+# Los valores por defecto son los de desarrollo local.
+
+
+def _entero(nombre, default):
+    return int(os.getenv(nombre, default))
+
+
+def cargar_config():
+    return {
+        "SECRET_KEY": os.getenv("SECRET_KEY", "clave_secreta_123"),
+
+        "SQLALCHEMY_DATABASE_URI": os.getenv("DATABASE_URL", "sqlite:///lnb.db"),
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+
+        # conexión de solo lectura para las rutas públicas (ver motor.py):
+        # "" desactivada, "auto" (el mismo archivo SQLite abierto en modo ro) o una URL
+        "DB_LECTURA_URL": os.getenv("DB_LECTURA_URL", ""),
+        "DB_POOL_SIZE": _entero("DB_POOL_SIZE", 5),
+        "DB_MAX_OVERFLOW": _entero("DB_MAX_OVERFLOW", 10),
+
+        # SQLITE_AJUSTES=0 deja SQLite como antes (solo foreign_keys), para comparar
+        "SQLITE_AJUSTES": os.getenv("SQLITE_AJUSTES", "1") != "0",
+        "SQLITE_JOURNAL_MODE": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+        "SQLITE_SYNCHRONOUS": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "SQLITE_BUSY_TIMEOUT": _entero("SQLITE_BUSY_TIMEOUT", 5000),   # ms
+        "SQLITE_MMAP_SIZE": _entero("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "SQLITE_CACHE_KB": _entero("SQLITE_CACHE_KB", 20000),
+
+        # "memoria" (por proceso), "redis://host:6379/0" (compartido) u "off"
+        "CACHE_PAGINAS": os.getenv("CACHE_PAGINAS", "memoria"),
+        "CACHE_PAGINAS_TTL": _entero("CACHE_PAGINAS_TTL", 300),
+        "CACHE_USUARIOS_TTL": _entero("CACHE_USUARIOS_TTL", 30),
+
+        # jugadores similares en las fichas (ver similares.py): "coseno" o "euclidea"
+        "SIMILARES_METRICA": os.getenv("SIMILARES_METRICA", "coseno"),
+        "SIMILARES_TTL": _entero("SIMILARES_TTL", 600),
+
+        # partidos simulados por consulta en /juegos (ver simulacion.py)
+        "SIMULACION_PARTIDOS": _entero("SIMULACION_PARTIDOS", 5000),
+
+        # ranking de aficionados (ver ranking.py): los puntos se escriben por lotes
+        "RANKING_TTL": _entero("RANKING_TTL", 60),
+        "PUNTOS_LOTE": _entero("PUNTOS_LOTE", 200),
+        "PUNTOS_INTERVALO": float(os.getenv("PUNTOS_INTERVALO", 5)),
+
+        "CONTAR_CONSULTAS": os.getenv("CONTAR_CONSULTAS", "0") == "1",
+    }
@@ -0,0 +1,123 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+
+from models import db, Equipo, Jugador, EventoAficionado, AficionadoJugador, DT
+
+
+#--------PRESETS POR VISTA------------
+# Cada vista carga en la misma consulta (o en una consulta extra por
+# relación, con selectinload) todo lo que usa su template, así la
+# cantidad de consultas no crece con la cantidad de filas.
+
+def jugadores_con_equipo():
+    return Jugador.query.options(joinedload(Jugador.equipo_rel))
+
+
+def dts_con_equipo():
+    return DT.query.options(joinedload(DT.equipo_rel))
+
+
+def equipo_con_plantel(id):
+    return (
+        Equipo.query
+        .options(selectinload(Equipo.jugadores), selectinload(Equipo.dts))
+        .filter_by(id=id)
+        .first_or_404()
+    )
+
+
+def jugador_con_equipo(id):
+    return jugadores_con_equipo().filter_by(id=id).first_or_404()
+
+
+def quinteto_de(user_id):
+    return (
+        AficionadoJugador.query
+        .filter_by(aficionado_id=user_id)
+        .join(AficionadoJugador.jugador)
+        .options(contains_eager(AficionadoJugador.jugador).joinedload(Jugador.equipo_rel))
+        .all()
+    )
+
+
+def candidatos_quinteto(posicion):
+    """Jugadores (no de aficionados) de esa posición principal, por media.
+
+    Solo las columnas que muestra el selector, con el equipo en la misma
+    consulta; usa ix_jugadores_aficionado_posicion_media.
+    """
+    return (
+        db.session.query(
+            Jugador.id, Jugador.nombre, Jugador.apellido, Jugador.posicion,
+            Jugador.media, Jugador.foto_carnet, Equipo.nombre.label("equipo"),
+        )
+        .outerjoin(Equipo, Jugador.equipo_id == Equipo.id)
+        .filter(Jugador.aficionado_id.is_(None), Jugador.posicion_principal == posicion)
+        .order_by(Jugador.media.desc(), Jugador.id)
+        .all()
+    )
+
+
+def eventos_de(user_id):
+    return (
+        EventoAficionado.query
+        .filter_by(aficionado_id=user_id)
+        .join(EventoAficionado.evento)
+        .options(contains_eager(EventoAficionado.evento))
+        .all()
+    )
+
+
+#--------PRESUPUESTO DE CONSULTAS------------
+
+class PresupuestoExcedido(Exception):
+    pass
+
+
+def presupuesto_consultas(maximo):
+    """Máximo de consultas SQL que puede hacer la vista en un request.
+
+    Incluye la carga del usuario logueado (load_user).
+
+    Solo se controla con app.testing o CONTAR_CONSULTAS activado; va entre
+    @app.route y el resto de los decoradores.
+    """
+    def decorador(f):
+        f.presupuesto_consultas = maximo
+        return f
+    return decorador
+
+
+def _controlando():
+    return current_app.testing or current_app.config.get("CONTAR_CONSULTAS")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "consultas" in g:
+        g.consultas += 1
+
+
+def activar_contador(app):
+    @app.before_request
+    def _iniciar_contador():
+        if _controlando():
+            g.consultas = 0
+
+    @app.after_request
+    def _verificar_presupuesto(response):
+        if "consultas" not in g:
+            return response
+
+        response.headers["X-Consultas"] = str(g.consultas)
+
+        vista = current_app.view_functions.get(request.endpoint)
+        maximo = getattr(vista, "presupuesto_consultas", None)
+        if maximo is not None and g.consultas > maximo:
+            raise PresupuestoExcedido(
+                f"{request.endpoint} hizo {g.consultas} consultas (presupuesto: {maximo})"
+            )
+
+        return response
@@ -0,0 +1,273 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import threading
+
+from flask import request, send_from_directory
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:   # opcional: sin brotli solo se generan .gz
+    brotli = None
+
+# Archivos estáticos con huella de contenido.
+#
+# `flask estaticos-construir` copia cada archivo de static/ a static/dist/
+# con el hash del contenido en el nombre (css/style.3f2a9c1d.css), genera
+# .gz y .br de los archivos de texto y escribe static/dist/manifest.json.
+# Con el manifiesto cargado, url_for("static", filename="css/style.css")
+# devuelve el nombre con hash, que se sirve con caché de un año (immutable):
+# si el archivo cambia, cambia el nombre. Sin manifiesto todo sigue
+# funcionando con los nombres originales.
+
+CARPETA_DIST = "dist"
+MANIFIESTO = "manifest.json"
+UN_ANIO = 365 * 24 * 3600
+
+COMPRIMIBLES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+TAM_MINIMO_COMPRESION = 512
+
+# extensión del archivo precomprimido -> Content-Encoding
+CODIFICACIONES = [(".br", "br"), (".gz", "gzip")]
+
+
+def _hash(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()[:8]
+
+
+def _comprimir(ruta):
+    """Escribe ruta.gz y ruta.br (si hay brotli) cuando achican el archivo."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+
+    generados = []
+    variantes = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variantes.append((".br", lambda d: brotli.compress(d, quality=11)))
+
+    for extension, comprimir in variantes:
+        comprimido = comprimir(datos)
+        if len(comprimido) < len(datos):
+            with open(ruta + extension, "wb") as f:
+                f.write(comprimido)
+            generados.append((extension, len(comprimido)))
+    return len(datos), generados
+
+
+def construir(static_folder):
+    """Genera static/dist/ con los archivos con hash y el manifiesto.
+
+    Devuelve un dict con totales para mostrar en el comando.
+    """
+    dist = os.path.join(static_folder, CARPETA_DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifiesto = {}
+    resumen = {"archivos": 0, "comprimidos": 0, "bytes": 0, "bytes_gz": 0, "bytes_br": 0}
+
+    for raiz, carpetas, archivos in os.walk(static_folder):
+        if os.path.abspath(raiz) == os.path.abspath(static_folder):
+            carpetas[:] = [c for c in carpetas if c != CARPETA_DIST]
+
+        for nombre in archivos:
+            origen = os.path.join(raiz, nombre)
+            relativo = os.path.relpath(origen, static_folder).replace(os.sep, "/")
+            base, extension = os.path.splitext(relativo)
+
+            con_hash = f"{base}.{_hash(origen)}{extension}"
+            destino = os.path.join(dist, *con_hash.split("/"))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copy2(origen, destino)
+
+            manifiesto[relativo] = f"{CARPETA_DIST}/{con_hash}"
+            resumen["archivos"] += 1
+
+            if extension.lower() in COMPRIMIBLES and os.path.getsize(destino) >= TAM_MINIMO_COMPRESION:
+                tam, generados = _comprimir(destino)
+                resumen["comprimidos"] += 1
+                resumen["bytes"] += tam
+                for ext, tam_comprimido in generados:
+                    resumen["bytes" + ext.replace(".", "_")] += tam_comprimido
+
+    with open(os.path.join(dist, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True, ensure_ascii=False)
+
+    return resumen
+
+
+def cargar_manifiesto(static_folder):
+    try:
+        with open(os.path.join(static_folder, CARPETA_DIST, MANIFIESTO), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+#--------TAILWIND------------
+# La hoja de estilos se compila de antemano con el binario standalone de
+# Tailwind (pip install tailwindcss-bin, o TAILWIND_BIN con la ruta) en vez
+# de compilarse en el navegador con cdn.tailwindcss.com. La salida se
+# versiona en el repo: para servir la app no hace falta el binario.
+
+CSS_ENTRADA = "css/tailwind.css"
+CSS_SALIDA = "css/lnb.min.css"
+
+
+def compilar_css(static_folder):
+    """Compila y minifica la hoja de Tailwind. Devuelve su tamaño en bytes."""
+    binario = os.getenv("TAILWIND_BIN") or shutil.which("tailwindcss")
+    if binario is None:
+        raise RuntimeError("No se encontró tailwindcss: pip install tailwindcss-bin o definir TAILWIND_BIN")
+
+    salida = os.path.join(static_folder, CSS_SALIDA)
+    subprocess.run(
+        [binario, "-i", os.path.join(static_folder, CSS_ENTRADA), "-o", salida, "--minify"],
+        check=True, capture_output=True,
+    )
+    return os.path.getsize(salida)
+
+
+#--------MEDICION------------
+# Antes de la hoja compilada, los templates cargaban el compilador de
+# Tailwind del CDN (un script bloqueante en el <head>) con esta
+# configuración en línea. medir_render() sirve la app dos veces, una tal
+# cual y otra con el <link> de la hoja reemplazado por ese script, y abre
+# las páginas en Chromium headless para comparar los tiempos de pintado.
+
+CONFIG_CDN = (
+    "<script>tailwind.config = {theme: {extend: {colors: {"
+    'primario: "#0a0a0a", secundario: "#1a1a1a", acento: "#dc2626", texto: "#e5e5e5"'
+    "}}}};</script>"
+)
+_LINK_HOJA = re.compile(r'<link rel="stylesheet" href="[^"]*lnb\.min[^"]*\.css"\s*/?>')
+
+_TIEMPOS = """() => {
+  const nav = performance.getEntriesByType("navigation")[0];
+  const fcp = performance.getEntriesByName("first-contentful-paint")[0];
+  return {fcp: fcp ? fcp.startTime : null, load: nav.loadEventEnd, tailwind: typeof tailwind !== "undefined"};
+}"""
+
+
+def con_compilador_cdn(wsgi_app, cdn):
+    """La app como antes: cada página HTML carga el compilador del CDN en vez de la hoja compilada."""
+    antes = f'<script src="{cdn}"></script>{CONFIG_CDN}'
+
+    def envoltura(environ, start_response):
+        resp = Response.from_app(wsgi_app, environ, buffered=True)
+        if resp.mimetype == "text/html":
+            resp.set_data(_LINK_HOJA.sub(lambda m: antes, resp.get_data(as_text=True)))
+        return resp(environ, start_response)
+    return envoltura
+
+
+def _servir(wsgi_app):
+    servidor = make_server("127.0.0.1", 0, wsgi_app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _mediana(valores):
+    valores = sorted(v for v in valores if v is not None)
+    return valores[len(valores) // 2] if valores else None
+
+
+def medir_render(app, paginas, cdn, veces=5):
+    """Mediana de first contentful paint y load (ms) de cada página, con la hoja compilada y con el CDN.
+
+    Cada vuelta abre la página con la caché vacía ("frío") y la vuelve a
+    abrir en la misma pestaña ("caliente"). Necesita Playwright con
+    Chromium (pip install playwright, playwright install chromium).
+    Devuelve {pagina: {"cdn" | "compilada": {"frio" | "caliente": {"fcp", "load"}}}};
+    la variante del CDN es None si el script no cargó.
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        raise RuntimeError("Hace falta Playwright: pip install playwright y playwright install chromium")
+
+    servidores = {"compilada": _servir(app.wsgi_app), "cdn": _servir(con_compilador_cdn(app.wsgi_app, cdn))}
+    resultado = {}
+    try:
+        with sync_playwright() as p:
+            try:
+                navegador = p.chromium.launch()
+            except Exception as e:   # sin el navegador descargado, por ejemplo
+                raise RuntimeError(f"No se pudo abrir Chromium: {str(e).splitlines()[0]}")
+            try:
+                for pagina in paginas:
+                    resultado[pagina] = {}
+                    for variante, servidor in servidores.items():
+                        url = f"http://127.0.0.1:{servidor.server_port}{pagina}"
+                        vueltas = {"frio": [], "caliente": []}
+                        for _ in range(veces):
+                            contexto = navegador.new_context()
+                            pestania = contexto.new_page()
+                            for tiempos in vueltas.values():
+                                pestania.goto(url, wait_until="load")
+                                tiempos.append(pestania.evaluate(_TIEMPOS))
+                            contexto.close()
+
+                        if variante == "cdn" and not all(t["tailwind"] for t in vueltas["frio"]):
+                            resultado[pagina][variante] = None
+                            continue
+                        resultado[pagina][variante] = {
+                            vuelta: {m: _mediana(t[m] for t in tiempos) for m in ("fcp", "load")}
+                            for vuelta, tiempos in vueltas.items()
+                        }
+            finally:
+                navegador.close()
+    finally:
+        for servidor in servidores.values():
+            servidor.shutdown()
+    return resultado
+
+
+#--------FLASK------------
+
+def iniciar_estaticos(app):
+    """Resuelve los nombres con hash en url_for y reemplaza la vista static."""
+    manifiesto = cargar_manifiesto(app.static_folder)
+    con_hash = set(manifiesto.values())
+    app.extensions["estaticos"] = manifiesto
+
+    @app.url_defaults
+    def _nombre_con_hash(endpoint, values):
+        if endpoint == "static" and "filename" in values:
+            values["filename"] = manifiesto.get(values["filename"], values["filename"])
+
+    def servir_estatico(filename):
+        if filename not in con_hash:
+            return send_from_directory(app.static_folder, filename)
+
+        resp = None
+        aceptadas = request.accept_encodings
+        for extension, codificacion in CODIFICACIONES:
+            if aceptadas[codificacion] and os.path.isfile(os.path.join(app.static_folder, filename + extension)):
+                tipo, _ = mimetypes.guess_type(filename)
+                resp = send_from_directory(app.static_folder, filename + extension, max_age=UN_ANIO,
+                                           mimetype=tipo or "application/octet-stream")
+                resp.content_encoding = codificacion
+                break
+
+        if resp is None:
+            resp = send_from_directory(app.static_folder, filename, max_age=UN_ANIO)
+
+        resp.vary.add("Accept-Encoding")
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+        return resp
+
+    app.view_functions["static"] = servir_estatico
+    return manifiesto
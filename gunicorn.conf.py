@@ -0,0 +1,18 @@
+# Configuración de gunicorn; la lee sola si se arranca desde este directorio:
+#   CACHE_PAGINAS=redis://localhost:6379/0 gunicorn -w 4 --preload wsgi:app
+from dotenv import load_dotenv
+
+from config import cargar_config
+
+
+def on_starting(server):
+    # el cache de páginas "memoria" es por proceso: con varios workers una
+    # invalidación solo llega al que hizo el cambio y los demás siguen
+    # sirviendo la página vieja hasta el TTL
+    load_dotenv()
+    cache = cargar_config()["CACHE_PAGINAS"]
+    if server.cfg.workers > 1 and cache != "off" and not cache.startswith(("redis://", "rediss://")):
+        raise RuntimeError(
+            f"CACHE_PAGINAS={cache!r} no se comparte entre los {server.cfg.workers} workers: "
+            "usá CACHE_PAGINAS=redis://... (o off), o un solo worker"
+        )
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import url_for
+
+# Versiones reducidas de las imágenes de static/img.
+#
+# `flask imagenes-procesar` genera, para cada imagen, anchos fijos en AVIF,
+# WebP y JPEG (PNG si la imagen tiene transparencia, como los escudos) en
+# static/img/derivadas/<hash del original>/<ancho>.<formato>. Como la
+# carpeta depende del contenido del original, una imagen ya procesada no
+# se vuelve a procesar y un original modificado genera carpeta nueva.
+# El índice (ruta original -> hash, anchos, formatos) queda en
+# static/img/derivadas/indice.json y lo usan los helpers de los templates.
+#
+# Pillow se importa solo al procesar: la app sirve las imágenes originales
+# si nunca se corrió el comando.
+
+CARPETA = "img/derivadas"
+INDICE = "indice.json"
+ANCHOS = (160, 320, 640, 1280)
+EXTENSIONES = {".jpg", ".jpeg", ".png", ".webp"}
+CALIDAD = {"avif": 55, "webp": 75, "jpeg": 80}
+TIPOS = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+ORIENTACION = 0x0112   # tag EXIF
+EXTENSION_DE = {"avif": "avif", "webp": "webp", "jpeg": "jpg", "png": "png"}
+
+
+def _hash(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()[:16]
+
+
+def formatos_disponibles():
+    from PIL import features
+    return [f for f in ("avif", "webp") if features.check(f)]
+
+
+def _nombre(ancho, formato):
+    return f"{ancho}.{EXTENSION_DE[formato]}"
+
+
+def procesar_imagen(static_folder, relativo, formatos):
+    """Genera las variantes de una imagen. Se corre en un proceso del pool.
+
+    Devuelve (relativo, entrada del índice, generadas, bytes original,
+    bytes de las variantes).
+    """
+    from PIL import Image, ImageOps
+
+    origen = os.path.join(static_folder, relativo)
+    huella = _hash(origen)
+    carpeta = os.path.join(static_folder, CARPETA, huella)
+
+    with Image.open(origen) as img:
+        # Image.open solo lee la cabecera: si ya están todas las variantes no se decodifica nada
+        con_alfa = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        rotada = img.getexif().get(ORIENTACION) in (5, 6, 7, 8)
+        ancho_original = img.height if rotada else img.width
+
+        anchos = [a for a in ANCHOS if a < ancho_original] or [ancho_original]
+        todos = list(formatos) + ["png" if con_alfa else "jpeg"]
+
+        entrada = {"hash": huella, "anchos": anchos, "formatos": todos}
+        faltantes = [(a, f) for a in anchos for f in todos
+                     if not os.path.isfile(os.path.join(carpeta, _nombre(a, f)))]
+        if not faltantes:
+            return relativo, entrada, 0, os.path.getsize(origen), None
+
+        img = ImageOps.exif_transpose(img).convert("RGBA" if con_alfa else "RGB")
+        os.makedirs(carpeta, exist_ok=True)
+        for ancho in anchos:
+            alto = round(img.height * ancho / ancho_original)
+            reducida = img.resize((ancho, alto), Image.LANCZOS) if ancho != ancho_original else img
+
+            for formato in todos:
+                if (ancho, formato) not in faltantes:
+                    continue
+                destino = os.path.join(carpeta, _nombre(ancho, formato))
+                if formato == "png":
+                    reducida.save(destino, "PNG", optimize=True)
+                else:
+                    reducida.save(destino, formato.upper(), quality=CALIDAD[formato])
+
+    generadas = sum(os.path.getsize(os.path.join(carpeta, _nombre(a, f))) for a in anchos for f in todos)
+    return relativo, entrada, len(faltantes), os.path.getsize(origen), generadas
+
+
+def originales(static_folder):
+    raiz = os.path.join(static_folder, "img")
+    for carpeta, subcarpetas, archivos in os.walk(raiz):
+        if os.path.abspath(carpeta) == os.path.abspath(raiz):
+            subcarpetas[:] = [c for c in subcarpetas if c != os.path.basename(CARPETA)]
+        for nombre in archivos:
+            if os.path.splitext(nombre)[1].lower() in EXTENSIONES:
+                ruta = os.path.join(carpeta, nombre)
+                yield os.path.relpath(ruta, static_folder).replace(os.sep, "/")
+
+
+def procesar_todo(static_folder, procesos=None):
+    """Procesa todas las imágenes en un pool de procesos y reescribe el índice.
+
+    Borra las carpetas de originales que ya no existen o cambiaron.
+    Devuelve un dict con totales.
+    """
+    formatos = formatos_disponibles()
+    rutas = sorted(originales(static_folder))
+
+    indice = {}
+    resumen = {"imagenes": len(rutas), "procesadas": 0, "variantes": 0,
+               "bytes_originales": 0, "bytes_variantes": 0, "formatos": formatos}
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        trabajos = [pool.submit(procesar_imagen, static_folder, r, formatos) for r in rutas]
+        for trabajo in trabajos:
+            relativo, entrada, generadas, tam_original, tam_variantes = trabajo.result()
+            indice[relativo] = entrada
+            if generadas:
+                resumen["procesadas"] += 1
+                resumen["variantes"] += generadas
+                resumen["bytes_originales"] += tam_original
+                resumen["bytes_variantes"] += tam_variantes
+
+    base = os.path.join(static_folder, CARPETA)
+    vigentes = {e["hash"] for e in indice.values()}
+    for nombre in os.listdir(base) if os.path.isdir(base) else []:
+        if os.path.isdir(os.path.join(base, nombre)) and nombre not in vigentes:
+            shutil.rmtree(os.path.join(base, nombre))
+
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, INDICE), "w", encoding="utf-8") as f:
+        json.dump(indice, f, indent=1, sort_keys=True, ensure_ascii=False)
+
+    return resumen
+
+
+def cargar_indice(static_folder):
+    try:
+        with open(os.path.join(static_folder, CARPETA, INDICE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+#--------TEMPLATES------------
+
+def iniciar_imagenes(app):
+    """Registra srcset() y variantes_imagen() para los templates."""
+    indice = cargar_indice(app.static_folder)
+    app.extensions["imagenes"] = indice
+
+    def srcset(ruta, formato):
+        entrada = indice.get(ruta)
+        if entrada is None or formato not in entrada["formatos"]:
+            return ""
+        carpeta = f"{CARPETA}/{entrada['hash']}"
+        return ", ".join(
+            f"{url_for('static', filename=carpeta + '/' + _nombre(a, formato))} {a}w"
+            for a in entrada["anchos"]
+        )
+
+    def variantes_imagen(ruta):
+        """[(tipo mime, srcset)] de la más liviana a la de respaldo; [] si no está procesada."""
+        entrada = indice.get(ruta)
+        if entrada is None:
+            return []
+        return [(TIPOS[f], srcset(ruta, f)) for f in entrada["formatos"]]
+
+    app.jinja_env.globals.update(srcset=srcset, variantes_imagen=variantes_imagen)
+    return indice
@@ -0,0 +1,384 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Float, Integer, String, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from models import db, Equipo, Jugador, DT, Evento
+from posiciones import dividir_posicion
+from busqueda import indexar_filas
+from cache_paginas import invalidar_filas
+from versiones import subir_version_equipos
+from similares import marcar_desactualizada
+
+# Importación y exportación masiva (CSV o JSON) de equipos, jugadores, DTs
+# y eventos.
+#
+# Importar lee el archivo fila por fila, valida cada una (los errores se
+# informan por número de fila y no frenan al resto) e inserta las válidas
+# en lotes con bulk_insert_mappings, un commit por lote. Un lote que la
+# base rechaza se reintenta de a una fila (ver _insertar_lote): lo que ya
+# entró queda y las filas rechazadas se informan como errores.
+# Las inserciones masivas no pasan por el flush de la sesión, así que el
+# índice de búsqueda, el cache de páginas, las versiones de los equipos y
+# la matriz de similares se actualizan a mano después de cada lote.
+#
+# Exportar es un generador: recorre la tabla con yield_per y va emitiendo
+# texto, la memoria no crece con la cantidad de filas.
+#
+# El equipo de jugadores y DTs va por nombre (columna "equipo"), no por
+# id, para poder pasar planillas de una base a otra.
+
+TAM_LOTE = 500
+MAX_ERRORES = 200   # errores que se guardan para mostrar; se cuentan todos
+
+
+class Entidad:
+    def __init__(self, modelo, obligatorios, unico=None, rangos=None, excluir=(), derivadas=None):
+        self.modelo = modelo
+        self.obligatorios = obligatorios
+        self.unico = unico          # columna que no se puede repetir (el import no pisa filas)
+        self.rangos = rangos or {}  # columna -> (mínimo, máximo)
+        self.derivadas = derivadas  # mapping -> columnas calculadas que no vienen en el archivo
+
+        excluir = {"id", "version", "actualizado", "equipo_id", *excluir, *(derivadas or {})}
+        self.columnas = [c for c in modelo.__table__.columns if c.key not in excluir]
+        self.con_equipo = "equipo_id" in modelo.__table__.columns
+
+    @property
+    def campos(self):
+        """Encabezados del archivo, en orden."""
+        return [c.key for c in self.columnas] + (["equipo"] if self.con_equipo else [])
+
+
+_STATS = (1, 99)
+
+ENTIDADES = {
+    "equipos": Entidad(Equipo, ["nombre"], unico="nombre",
+                       rangos={"temporadas": (0, None), "campeonatos": (0, None)}),
+    "jugadores": Entidad(Jugador, ["nombre", "apellido"], excluir=("aficionado_id",),
+                         derivadas={"posicion_principal": lambda m: dividir_posicion(m["posicion"])[0],
+                                    "posiciones_secundarias": lambda m: dividir_posicion(m["posicion"])[1]},
+                         rangos={"camiseta": (0, 99), "media": _STATS, "tiro": _STATS, "dribling": _STATS,
+                                 "velocidad": _STATS, "pase": _STATS, "defensa": _STATS, "salto": _STATS,
+                                 "altura": (1.0, 2.5)}),
+    "dts": Entidad(DT, ["nombre", "apellido"], rangos={"temporadas": (0, None)}),
+    "eventos": Entidad(Evento, ["titulo", "fecha_y_hora", "cap_max"], unico="titulo",
+                       excluir=("inscriptos_count",), rangos={"cap_max": (1, None)}),
+}
+
+
+#--------VALIDACION------------
+
+class ErrorFila(ValueError):
+    pass
+
+
+def _convertir(columna, valor):
+    if isinstance(valor, str):
+        valor = valor.strip()
+    if valor is None or valor == "":
+        return None
+
+    tipo = columna.type
+    try:
+        if isinstance(tipo, Integer):
+            if isinstance(valor, float) and not valor.is_integer():
+                raise ValueError
+            return int(valor)
+        if isinstance(tipo, Float):
+            return float(valor)
+        if isinstance(tipo, DateTime):
+            return valor if isinstance(valor, datetime) else datetime.fromisoformat(valor)
+        if isinstance(tipo, Date):
+            return valor if isinstance(valor, date) else date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ErrorFila(f"{columna.key}: valor inválido {valor!r}")
+
+    valor = str(valor)
+    if isinstance(tipo, String) and tipo.length and len(valor) > tipo.length:
+        raise ErrorFila(f"{columna.key}: más de {tipo.length} caracteres")
+    return valor
+
+
+def validar_fila(entidad, fila, equipos, vistos):
+    """Convierte una fila del archivo (dict de textos) en un mapping para insertar.
+
+    `equipos` es {nombre en minúsculas: id}; `vistos`, los valores de la
+    columna única que ya existen o ya aparecieron en el archivo.
+    Levanta ErrorFila con todos los problemas de la fila.
+    """
+    errores = []
+    mapping = {}
+
+    for columna in entidad.columnas:
+        try:
+            valor = _convertir(columna, fila.get(columna.key))
+        except ErrorFila as e:
+            errores.append(str(e))
+            continue
+
+        if valor is None and columna.key in entidad.obligatorios:
+            errores.append(f"{columna.key}: obligatorio")
+        minimo, maximo = entidad.rangos.get(columna.key, (None, None))
+        if valor is not None and ((minimo is not None and valor < minimo) or (maximo is not None and valor > maximo)):
+            errores.append(f"{columna.key}: fuera de rango ({minimo}-{maximo if maximo is not None else ''})")
+        mapping[columna.key] = valor
+
+    if entidad.con_equipo:
+        nombre = (fila.get("equipo") or "").strip()
+        mapping["equipo_id"] = equipos.get(nombre.lower()) if nombre else None
+        if nombre and mapping["equipo_id"] is None:
+            errores.append(f"equipo: no existe {nombre!r}")
+
+    if entidad.unico and mapping.get(entidad.unico) is not None:
+        clave = mapping[entidad.unico].lower()
+        if clave in vistos:
+            errores.append(f"{entidad.unico}: ya existe {mapping[entidad.unico]!r}")
+        vistos.add(clave)
+
+    if errores:
+        raise ErrorFila("; ".join(errores))
+
+    # las que en el ORM calculan los eventos de la sesión (ver posiciones.py)
+    for columna, derivar in (entidad.derivadas or {}).items():
+        mapping[columna] = derivar(mapping)
+    return mapping
+
+
+#--------LECTURA------------
+
+def _filas_csv(texto):
+    # el apóstrofo que agrega exportar() delante de las fórmulas no es parte del dato
+    for fila in csv.DictReader(texto):
+        yield {k: _sin_escape(v) for k, v in fila.items()}
+
+
+def _filas_json(texto, tam_bloque=64 * 1024):
+    """Objetos de un array JSON o de JSON Lines, leyendo el archivo de a bloques.
+
+    Solo el nivel de afuera se recorre a mano (el "[", las comas y el "]"
+    del array); cada fila la decodifica entera raw_decode, así que sus
+    valores pueden tener listas o textos con cualquier carácter.
+    """
+    decodificador = json.JSONDecoder()
+    buffer = ""
+    fin = False
+
+    def leer():
+        nonlocal buffer, fin
+        bloque = texto.read(tam_bloque)
+        fin = not bloque
+        buffer += bloque
+
+    def siguiente():
+        """Primer carácter que no es espacio (queda en el buffer), o "" al final del archivo."""
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip(" \t\r\n")
+            if buffer or fin:
+                return buffer[:1]
+            leer()
+
+    def fila():
+        nonlocal buffer
+        siguiente()   # raw_decode no saltea espacios al principio
+        while True:
+            try:
+                obj, largo = decodificador.raw_decode(buffer)
+                break
+            except json.JSONDecodeError:
+                # objeto cortado al final del bloque: leer más
+                if fin:
+                    raise
+                leer()
+        buffer = buffer[largo:]
+        if not isinstance(obj, dict):
+            raise ValueError("se esperaba un objeto por fila")
+        return obj
+
+    if siguiente() != "[":
+        # JSON Lines: objetos separados por espacios o saltos de línea
+        while siguiente():
+            yield fila()
+        return
+
+    buffer = buffer[1:]
+    if siguiente() == "]":
+        buffer = buffer[1:]
+    else:
+        while True:
+            yield fila()
+            separador = siguiente()
+            buffer = buffer[1:]
+            if separador == "]":
+                break
+            if separador != ",":
+                raise ValueError("se esperaba ',' o ']' entre las filas del array")
+    if siguiente():
+        raise ValueError("hay texto después del array")
+
+
+LECTORES = {"csv": _filas_csv, "json": _filas_json}
+
+
+def formato_de(nombre_archivo):
+    extension = nombre_archivo.rsplit(".", 1)[-1].lower()
+    return {"jsonl": "json", "ndjson": "json"}.get(extension, extension)
+
+
+#--------IMPORTAR------------
+
+def _insertar_lote(entidad, lote, error):
+    """Inserta [(número de fila, mapping)] en una transacción. Devuelve cuántas filas entraron.
+
+    Si la base rechaza el lote (una fila repetida que la validación no vio,
+    por ejemplo otra importación a la vez, o un valor que el motor no
+    acepta), se descarta y se reintenta de a una fila, así las demás entran
+    y las rechazadas van a la lista de errores.
+    """
+    mappings = [m for _, m in lote]
+    try:
+        # return_defaults deja el id asignado en cada mapping
+        db.session.bulk_insert_mappings(entidad.modelo, mappings, return_defaults=True)
+
+        # lo que normalmente hacen los eventos del flush
+        indexar_filas(entidad.modelo, mappings)
+        equipos = {m["equipo_id"] for m in mappings if m.get("equipo_id")}
+        if equipos:
+            subir_version_equipos(db.session.connection(), equipos)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        if len(lote) == 1:
+            motivo = "choca con un registro existente" if isinstance(e, IntegrityError) else \
+                f"la base la rechazó ({type(getattr(e, 'orig', None) or e).__name__})"
+            error(lote[0][0], motivo)
+            return 0
+        for m in mappings:
+            m.pop("id", None)
+        return sum(_insertar_lote(entidad, [fila], error) for fila in lote)
+
+    invalidar_filas(entidad.modelo, mappings)
+    if entidad.modelo is Jugador:
+        marcar_desactualizada()
+    return len(mappings)
+
+
+def importar(nombre, archivo, formato, tam_lote=TAM_LOTE):
+    """Importa las filas de `archivo` (binario o texto) como nuevos registros.
+
+    Devuelve {"insertados", "con_errores", "errores": [(fila, mensaje)]}.
+    Las filas válidas se insertan aunque otras tengan errores.
+    """
+    entidad = ENTIDADES[nombre]
+    if formato not in LECTORES:
+        raise ValueError(f"formato no soportado: {formato}")
+
+    texto = archivo if isinstance(archivo, io.TextIOBase) else io.TextIOWrapper(archivo, encoding="utf-8-sig", newline="")
+
+    equipos = {n.lower(): i for i, n in db.session.execute(select(Equipo.id, Equipo.nombre)) if n}
+    vistos = set()
+    if entidad.unico:
+        columna = getattr(entidad.modelo, entidad.unico)
+        vistos = {v.lower() for v in db.session.scalars(select(columna)) if v}
+
+    resultado = {"insertados": 0, "con_errores": 0, "errores": []}
+    lote = []
+
+    def error(numero, mensaje):
+        resultado["con_errores"] += 1
+        if len(resultado["errores"]) < MAX_ERRORES:
+            resultado["errores"].append((numero, mensaje))
+
+    try:
+        for numero, fila in enumerate(LECTORES[formato](texto), start=1):
+            try:
+                lote.append((numero, validar_fila(entidad, fila, equipos, vistos)))
+            except ErrorFila as e:
+                error(numero, str(e))
+                continue
+
+            if len(lote) >= tam_lote:
+                resultado["insertados"] += _insertar_lote(entidad, lote, error)
+                lote = []
+    except (ValueError, csv.Error) as e:
+        # archivo mal formado: se conserva lo insertado hasta acá
+        error("archivo", f"mal formado ({e})")
+
+    if lote:
+        resultado["insertados"] += _insertar_lote(entidad, lote, error)
+
+    return resultado
+
+
+#--------EXPORTAR------------
+# En CSV, un texto que empieza con = + - @ (o tab / retorno) es una fórmula
+# para Excel o LibreOffice: los textos cargados por usuarios (títulos,
+# descripciones) salen con un apóstrofo adelante, que la planilla muestra
+# como texto y que _filas_csv saca al importar.
+
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _escapar_formula(valor):
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def _sin_escape(valor):
+    if isinstance(valor, str) and valor.startswith("'") and valor[1:].startswith(INICIO_FORMULA):
+        return valor[1:]
+    return valor
+
+
+def _a_texto(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _filas_exportar(entidad, tam_lote):
+    modelo = entidad.modelo
+    columnas = [getattr(modelo, c.key) for c in entidad.columnas]
+    consulta = select(*columnas)
+
+    if entidad.con_equipo:
+        consulta = consulta.add_columns(Equipo.nombre).outerjoin(Equipo, modelo.equipo_id == Equipo.id)
+    if modelo is Jugador:
+        consulta = consulta.where(Jugador.aficionado_id.is_(None))
+
+    consulta = consulta.order_by(modelo.id).execution_options(yield_per=tam_lote)
+    campos = entidad.campos
+    for fila in db.session.execute(consulta):
+        yield dict(zip(campos, map(_a_texto, fila)))
+
+
+def exportar(nombre, formato, tam_lote=TAM_LOTE):
+    """Generador de trozos de texto con todos los registros en CSV o JSON (array)."""
+    entidad = ENTIDADES[nombre]
+    filas = _filas_exportar(entidad, tam_lote)
+
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=entidad.campos)
+        escritor.writeheader()
+        for i, fila in enumerate(filas, start=1):
+            escritor.writerow({k: _escapar_formula(v) for k, v in fila.items()})
+            if i % tam_lote == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    elif formato == "json":
+        yield "["
+        for i, fila in enumerate(filas):
+            yield ("," if i else "") + "\n" + json.dumps(fila, ensure_ascii=False)
+        yield "\n]\n"
+
+    else:
+        raise ValueError(f"formato no soportado: {formato}")
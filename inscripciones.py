@@ -0,0 +1,187 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from models import db, User, Evento, EventoAficionado
+from cache_paginas import invalidar
+
+# La inscripción reserva el cupo con un UPDATE condicionado sobre el
+# contador del evento: la fila del evento queda bloqueada hasta el commit,
+# así dos inscripciones nunca leen el mismo valor. Después inserta la
+# inscripción; si ya existía (índice único evento_id, aficionado_id) se
+# hace rollback y el contador vuelve a su valor.
+# También sube la versión del evento (ver versiones.py): cambia la página.
+_RESERVAR_CUPO = text(
+    "UPDATE eventos SET inscriptos_count = inscriptos_count + 1, "
+    "version = version + 1, actualizado = :ahora "
+    "WHERE id = :evento_id AND inscriptos_count < cap_max"
+)
+
+_INSERTAR = text(
+    "INSERT INTO evento_aficionado (evento_id, aficionado_id) "
+    "VALUES (:evento_id, :aficionado_id) "
+    "ON CONFLICT (evento_id, aficionado_id) DO NOTHING"
+)
+
+
+def inscribir(evento_id, aficionado_id):
+    """Inscribe al aficionado si hay cupo.
+
+    Devuelve "inscripto", "ya_inscripto" o "sin_cupo".
+    """
+    params = {"evento_id": evento_id, "aficionado_id": aficionado_id}
+
+    if db.session.execute(_RESERVAR_CUPO, dict(params, ahora=datetime.utcnow())).rowcount == 0:
+        db.session.rollback()
+        ya = EventoAficionado.query.filter_by(**params).first()
+        return "ya_inscripto" if ya else "sin_cupo"
+
+    if db.session.execute(_INSERTAR, params).rowcount == 0:
+        db.session.rollback()
+        return "ya_inscripto"
+
+    db.session.commit()
+    # las sentencias de arriba no pasan por el flush de la sesión
+    invalidar(f"evento:{evento_id}", "eventos")
+    return "inscripto"
+
+
+def reconciliar():
+    """Recalcula inscriptos_count desde evento_aficionado.
+
+    Devuelve [(evento_id, contador_guardado, real)] de los que estaban mal.
+    """
+    reales = dict(
+        db.session.query(EventoAficionado.evento_id, db.func.count())
+        .group_by(EventoAficionado.evento_id)
+    )
+
+    desfasados = []
+    for evento in Evento.query.with_for_update():
+        real = reales.get(evento.id, 0)
+        if evento.inscriptos_count != real:
+            desfasados.append((evento.id, evento.inscriptos_count, real))
+            evento.inscriptos_count = real
+
+    db.session.commit()
+    return desfasados
+
+
+def _app_de_prueba(config, url):
+    """App aparte, con los mismos ajustes de motor, apuntando a la base de la prueba."""
+    from flask import Flask
+    from motor import configurar_motor, iniciar_motor
+
+    prueba = Flask(__name__)
+    prueba.config.update(config, SQLALCHEMY_DATABASE_URI=url, DB_LECTURA_URL="")
+    prueba.config.pop("SQLALCHEMY_BINDS", None)
+    configurar_motor(prueba)
+    db.init_app(prueba)
+    iniciar_motor(prueba, db)
+    return prueba
+
+
+def prueba_de_carga(app, cupo=50, aficionados=200, hilos=16, url=None):
+    """Muchos aficionados inscribiéndose a la vez al mismo evento.
+
+    Corre en un SQLite temporal (con los ajustes de motor.py), o en la base
+    de `url` si se pasa (los chequeos de paridad usan la base de cada
+    motor, que es descartable). Crea un evento y usuarios descartables, los
+    inscribe desde `hilos` threads y borra todo al terminar. Devuelve un
+    dict con el resultado; "ok" exige que no se supere el cupo, que no haya
+    duplicados ni errores.
+    """
+    carpeta = None
+    if url is None:
+        carpeta = tempfile.TemporaryDirectory()
+        url = "sqlite:///" + os.path.join(carpeta.name, "inscripciones.db")
+    prueba = _app_de_prueba(app.config, url)
+
+    try:
+        with prueba.app_context():
+            db.create_all()
+            r = _inscribir_en_paralelo(prueba, cupo, aficionados, hilos)
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+    finally:
+        if carpeta is not None:
+            carpeta.cleanup()
+    return r
+
+
+def _inscribir_en_paralelo(app, cupo, aficionados, hilos):
+    marca = uuid.uuid4().hex[:8]
+
+    # INSERT directos: sin flush no se disparan los eventos de sesión
+    # (índice de búsqueda, ranking), que apuntan a la base de la app
+    db.session.execute(insert(Evento), [{
+        "titulo": f"carga-{marca}", "descripcion": "prueba de carga",
+        "fecha_y_hora": datetime.utcnow(), "cap_max": cupo,
+    }])
+    db.session.execute(insert(User), [
+        {"username": f"carga-{marca}-{i}", "mail": f"carga-{marca}-{i}@test", "password": "-"}
+        for i in range(aficionados)
+    ])
+    db.session.commit()
+
+    evento_id = db.session.query(Evento.id).filter_by(titulo=f"carga-{marca}").scalar()
+    ids = [id for id, in db.session.query(User.id).filter(User.username.like(f"carga-{marca}-%"))]
+    resultados = {"inscripto": 0, "ya_inscripto": 0, "sin_cupo": 0, "error": 0}
+    lock = threading.Lock()
+
+    def trabajar(parte):
+        with app.app_context():
+            for aficionado_id in parte:
+                # cada aficionado intenta dos veces: la segunda tiene que dar ya_inscripto o sin_cupo
+                for _ in range(2):
+                    try:
+                        r = inscribir(evento_id, aficionado_id)
+                    except Exception:
+                        db.session.rollback()
+                        r = "error"
+                    with lock:
+                        resultados[r] += 1
+
+    partes = [ids[k::hilos] for k in range(hilos)]
+    threads = [threading.Thread(target=trabajar, args=(p,)) for p in partes]
+
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracion = time.perf_counter() - inicio
+
+    total = EventoAficionado.query.filter_by(evento_id=evento_id).count()
+    contador = db.session.query(Evento.inscriptos_count).filter_by(id=evento_id).scalar()
+    duplicados = (
+        db.session.query(EventoAficionado.aficionado_id)
+        .filter_by(evento_id=evento_id)
+        .group_by(EventoAficionado.aficionado_id)
+        .having(db.func.count() > 1)
+        .count()
+    )
+
+    EventoAficionado.query.filter_by(evento_id=evento_id).delete()
+    Evento.query.filter_by(id=evento_id).delete()
+    User.query.filter(User.id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+
+    intentos = sum(resultados.values())
+    return {
+        "cupo": cupo,
+        "inscriptos": total,
+        "contador": contador,
+        "duplicados": duplicados,
+        "resultados": resultados,
+        "segundos": duracion,
+        "intentos_por_segundo": intentos / duracion if duracion else None,
+        "ok": (total <= cupo and duplicados == 0 and resultados["error"] == 0
+               and resultados["inscripto"] == total == contador),
+    }
@@ -0,0 +1,258 @@
+import re
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import db
+from posiciones import dividir_posicion
+
+# Migraciones versionadas del esquema.
+#
+# db.create_all() crea las tablas que faltan pero no toca las existentes,
+# así que todo cambio sobre una tabla existente (columnas, índices) va
+# acá. Cada migración es idempotente: sobre una base nueva, creada por
+# create_all() con el esquema actual, no hace nada y solo registra la
+# versión.
+#
+# Cada migración trae sus verificaciones: consultas de las rutas junto con
+# el índice que tienen que usar, comprobado con EXPLAIN QUERY PLAN al
+# aplicarla (migrar) y a pedido (`flask db-verificar`).
+
+
+class MigracionFallida(Exception):
+    pass
+
+
+def _columnas(conn, tabla):
+    return {c["name"] for c in inspect(conn).get_columns(tabla)}
+
+
+def _agregar_columna(conn, tabla, columna, tipo):
+    if columna not in _columnas(conn, tabla):
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}"))
+
+
+def _tipo_fecha_hora(conn):
+    return "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+
+
+def _crear_indice(conn, nombre, tabla, columnas, unico=False):
+    unique = "UNIQUE " if unico else ""
+    conn.execute(text(f"CREATE {unique}INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas)})"))
+
+
+#--------MIGRACIONES------------
+
+def _m1_columnas_resumen(conn):
+    _agregar_columna(conn, "articulos", "resumen_estado", "VARCHAR(20) DEFAULT 'listo'")
+    _agregar_columna(conn, "articulos", "resumen_estrategia", "VARCHAR(20)")
+
+
+def _m2_indices(conn):
+    _crear_indice(conn, "ix_jugadores_equipo_id", "jugadores", ["equipo_id"])
+    _crear_indice(conn, "ix_jugadores_aficionado_media", "jugadores", ["aficionado_id", "media"])
+    _crear_indice(conn, "ix_jugadores_aficionado_apellido", "jugadores", ["aficionado_id", "apellido", "id"])
+    _crear_indice(conn, "ix_dts_equipo_id", "dts", ["equipo_id"])
+    _crear_indice(conn, "ix_aficionado_jugador_aficionado_id", "aficionado_jugador", ["aficionado_id"])
+    _crear_indice(conn, "ix_evento_aficionado_aficionado_id", "evento_aficionado", ["aficionado_id"])
+    _crear_indice(conn, "ix_articulos_fecha", "articulos", ["fecha", "id"])
+    _crear_indice(conn, "ix_eventos_fecha_y_hora", "eventos", ["fecha_y_hora", "id"])
+    _crear_indice(conn, "ix_resumen_jobs_estado", "resumen_jobs", ["estado", "proximo_intento"])
+    _crear_indice(conn, "ix_resumen_jobs_articulo_id", "resumen_jobs", ["articulo_id", "estado"])
+
+
+def _m3_inscripcion_unica(conn):
+    # primero se eliminan las inscripciones duplicadas que ya existan
+    conn.execute(text(
+        "DELETE FROM evento_aficionado WHERE id NOT IN ("
+        "SELECT MIN(id) FROM evento_aficionado GROUP BY evento_id, aficionado_id)"
+    ))
+    _crear_indice(conn, "uq_evento_aficionado", "evento_aficionado", ["evento_id", "aficionado_id"], unico=True)
+
+
+def _m4_contador_inscriptos(conn):
+    if "inscriptos_count" not in _columnas(conn, "eventos"):
+        conn.execute(text("ALTER TABLE eventos ADD COLUMN inscriptos_count INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(text(
+        "UPDATE eventos SET inscriptos_count = "
+        "(SELECT count(*) FROM evento_aficionado WHERE evento_aficionado.evento_id = eventos.id)"
+    ))
+
+
+def _m5_versiones(conn):
+    for tabla in ("equipos", "jugadores", "articulos", "eventos"):
+        _agregar_columna(conn, tabla, "version", "INTEGER NOT NULL DEFAULT 1")
+        _agregar_columna(conn, tabla, "actualizado", _tipo_fecha_hora(conn))
+        # SQLite no acepta un default no constante en ADD COLUMN
+        conn.execute(text(f"UPDATE {tabla} SET actualizado = :ahora WHERE actualizado IS NULL"),
+                     {"ahora": datetime.utcnow()})
+
+
+def _m6_posicion_principal(conn):
+    _agregar_columna(conn, "jugadores", "posicion_principal", "VARCHAR(10)")
+    _agregar_columna(conn, "jugadores", "posiciones_secundarias", "VARCHAR(40)")
+
+    filas = conn.execute(text("SELECT id, posicion FROM jugadores")).all()
+    valores = [dict(zip(("principal", "secundarias"), dividir_posicion(posicion)), id=id) for id, posicion in filas]
+    if valores:
+        conn.execute(text(
+            "UPDATE jugadores SET posicion_principal = :principal, posiciones_secundarias = :secundarias "
+            "WHERE id = :id"
+        ), valores)
+
+    _crear_indice(conn, "ix_jugadores_aficionado_posicion_media", "jugadores",
+                  ["aficionado_id", "posicion_principal", "media"])
+
+
+def _m7_puesto_quinteto(conn):
+    _agregar_columna(conn, "aficionado_jugador", "slot", "VARCHAR(10)")
+    conn.execute(text(
+        "UPDATE aficionado_jugador SET slot = "
+        "(SELECT posicion_principal FROM jugadores WHERE jugadores.id = aficionado_jugador.jugador_id) "
+        "WHERE slot IS NULL"
+    ))
+    # un jugador por puesto: se queda el último elegido
+    conn.execute(text(
+        "DELETE FROM aficionado_jugador WHERE slot IS NOT NULL AND aficionado_id IS NOT NULL AND id NOT IN ("
+        "SELECT MAX(id) FROM aficionado_jugador WHERE slot IS NOT NULL GROUP BY aficionado_id, slot)"
+    ))
+    _crear_indice(conn, "uq_aficionado_jugador_slot", "aficionado_jugador", ["aficionado_id", "slot"], unico=True)
+
+
+def _m8_ranking(conn):
+    # NULL ordenaría distinto en SQLite y PostgreSQL; sin puntos es 0
+    conn.execute(text("UPDATE users SET puntos = 0 WHERE puntos IS NULL"))
+    _crear_indice(conn, "ix_users_puntos", "users", ["puntos DESC", "id"])
+    _crear_indice(conn, "ix_users_equipo_puntos", "users", ["equipo_favorito_id", "puntos DESC", "id"])
+
+
+# (version, descripcion, funcion, verificaciones)
+# verificación = (consulta, parámetros, índice que tiene que aparecer en el plan)
+MIGRACIONES = [
+    (1, "columnas de estado y estrategia del resumen", _m1_columnas_resumen, []),
+    (2, "índices de las consultas de las rutas", _m2_indices, [
+        ("SELECT * FROM jugadores WHERE aficionado_id IS NULL ORDER BY media DESC LIMIT 3",
+         {}, "ix_jugadores_aficionado_media"),
+        ("SELECT * FROM jugadores WHERE aficionado_id = :id LIMIT 1",
+         {"id": 1}, "ix_jugadores_aficionado_media"),
+        ("SELECT * FROM jugadores WHERE aficionado_id IS NULL AND (apellido, id) > (:a, :id) "
+         "ORDER BY apellido, id LIMIT 25",
+         {"a": "", "id": 0}, "ix_jugadores_aficionado_apellido"),
+        ("SELECT * FROM jugadores WHERE equipo_id IN (:id)",
+         {"id": 1}, "ix_jugadores_equipo_id"),
+        ("SELECT * FROM dts WHERE equipo_id IN (:id)",
+         {"id": 1}, "ix_dts_equipo_id"),
+        ("SELECT * FROM aficionado_jugador JOIN jugadores ON jugadores.id = aficionado_jugador.jugador_id "
+         "WHERE aficionado_jugador.aficionado_id = :id",
+         {"id": 1}, "ix_aficionado_jugador_aficionado_id"),
+        ("SELECT * FROM evento_aficionado JOIN eventos ON eventos.id = evento_aficionado.evento_id "
+         "WHERE evento_aficionado.aficionado_id = :id",
+         {"id": 1}, "ix_evento_aficionado_aficionado_id"),
+        ("SELECT * FROM articulos ORDER BY fecha DESC, id DESC LIMIT 4",
+         {}, "ix_articulos_fecha"),
+        ("SELECT * FROM eventos ORDER BY fecha_y_hora, id LIMIT 25",
+         {}, "ix_eventos_fecha_y_hora"),
+        ("SELECT * FROM resumen_jobs WHERE estado = 'pendiente' AND proximo_intento <= :ahora "
+         "ORDER BY id LIMIT 1",
+         {"ahora": "9999-12-31"}, "ix_resumen_jobs_estado"),
+        ("SELECT * FROM resumen_jobs WHERE articulo_id = :id AND estado = 'pendiente' LIMIT 1",
+         {"id": 1}, "ix_resumen_jobs_articulo_id"),
+    ]),
+    (3, "inscripción única por evento y aficionado", _m3_inscripcion_unica, [
+        ("SELECT count(*) FROM evento_aficionado WHERE evento_id = :e",
+         {"e": 1}, "uq_evento_aficionado"),
+        ("SELECT * FROM evento_aficionado WHERE evento_id = :e AND aficionado_id = :a LIMIT 1",
+         {"e": 1, "a": 1}, "uq_evento_aficionado"),
+    ]),
+    (4, "contador de inscriptos en eventos", _m4_contador_inscriptos, []),
+    (5, "versión y fecha de actualización de equipos, jugadores, artículos y eventos", _m5_versiones, []),
+    (6, "posición principal y secundarias de los jugadores", _m6_posicion_principal, [
+        ("SELECT id, nombre, apellido FROM jugadores WHERE aficionado_id IS NULL AND posicion_principal = :p "
+         "ORDER BY media DESC",
+         {"p": "Base"}, "ix_jugadores_aficionado_posicion_media"),
+    ]),
+    (7, "puesto único por aficionado en el quinteto", _m7_puesto_quinteto, [
+        ("SELECT * FROM aficionado_jugador WHERE aficionado_id = :a AND slot = :s",
+         {"a": 1, "s": "Base"}, "uq_aficionado_jugador_slot"),
+    ]),
+    (8, "índices del ranking de aficionados", _m8_ranking, [
+        ("SELECT id, puntos FROM users ORDER BY puntos DESC, id LIMIT 20",
+         {}, "ix_users_puntos"),
+        ("SELECT id, puntos FROM users WHERE equipo_favorito_id = :e ORDER BY puntos DESC, id LIMIT 20",
+         {"e": 1}, "ix_users_equipo_puntos"),
+    ]),
+]
+
+
+#--------API------------
+
+def version_actual(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def migrar():
+    """Aplica las migraciones pendientes, cada una en su transacción.
+
+    Antes de commitear cada una corre sus verificaciones: si una consulta
+    no usa su índice, deshace esa migración y levanta MigracionFallida.
+    """
+    aplicadas = []
+
+    with db.engine.connect() as conn:
+        actual = version_actual(conn)
+        conn.commit()
+
+        for version, descripcion, funcion, verificaciones in MIGRACIONES:
+            if version <= actual:
+                continue
+
+            funcion(conn)
+            fallidas = [r for r in _verificar(conn, verificaciones) if not r[3]]
+            if fallidas:
+                conn.rollback()
+                lineas = [f"{c}\n  esperaba {i}, plan: {p}" for c, i, p, _ in fallidas]
+                raise MigracionFallida(f"v{version}: consultas que no usan su índice:\n" + "\n".join(lineas))
+
+            conn.execute(text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version})
+            conn.commit()
+            aplicadas.append((version, descripcion))
+
+    return aplicadas
+
+
+def plan(conn, consulta, params):
+    filas = conn.execute(text("EXPLAIN QUERY PLAN " + consulta), params)
+    return " | ".join(str(f[-1]) for f in filas)
+
+
+def usa_indice(detalle, indice):
+    """Si el plan usa ese índice, por nombre exacto (no uno que empiece igual)."""
+    return re.search(rf"\bINDEX {re.escape(indice)}\b", detalle) is not None
+
+
+def _verificar(conn, verificaciones):
+    """[(consulta, índice, plan, ok)]. Solo SQLite (EXPLAIN QUERY PLAN); en otros motores []."""
+    if conn.dialect.name != "sqlite":
+        return []
+    resultado = []
+    for consulta, params, indice in verificaciones:
+        detalle = plan(conn, consulta, params)
+        resultado.append((consulta, indice, detalle, usa_indice(detalle, indice)))
+    return resultado
+
+
+def verificar():
+    """Corre las verificaciones EXPLAIN de todas las migraciones aplicadas.
+
+    Devuelve una lista de (version, consulta, índice, plan, ok). Solo
+    aplica a SQLite (EXPLAIN QUERY PLAN); en otros motores devuelve [].
+    """
+    resultado = []
+    with db.engine.connect() as conn:
+        actual = version_actual(conn)
+        for version, _, _, verificaciones in MIGRACIONES:
+            if version <= actual:
+                resultado += [(version, *r) for r in _verificar(conn, verificaciones)]
+    return resultado
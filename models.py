@@ -2,7 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 
-db = SQLAlchemy()
+from motor import Sesion
+
+db = SQLAlchemy(session_options={"class_": Sesion})
 
 #--------USUARIOS------------
 class User(UserMixin, db.Model):
@@ -18,7 +20,7 @@ class User(UserMixin, db.Model):
     nombre = db.Column(db.String(20))
     apellido = db.Column(db.String(30))
     fecha_nacimiento = db.Column(db.Date)
-    puntos = db.Column(db.Integer, default=0)
+    puntos = db.Column(db.Integer, default=0, server_default="0")
 
     foto_perfil = db.Column(db.String(300))
 
@@ -31,6 +33,42 @@ class User(UserMixin, db.Model):
     quinteto = db.relationship("AficionadoJugador", back_populates="aficionado")
 
 
+# ranking de aficionados, ver ranking.py (puntos de mayor a menor, desempate por id)
+db.Index("ix_users_puntos", User.puntos.desc(), User.id)
+db.Index("ix_users_equipo_puntos", User.equipo_favorito_id, User.puntos.desc(), User.id)
+
+
+class PuntoPendiente(db.Model):
+    """Puntos ganados que todavía no se sumaron a users.puntos (ver ranking.py)."""
+    __tablename__ = "puntos_pendientes"
+    __table_args__ = (
+        db.Index("ix_puntos_pendientes_aficionado_id", "aficionado_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    aficionado_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    puntos = db.Column(db.Integer, nullable=False)
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class PartidoOficial(db.Model):
+    """El partido del quinteto que suma puntos: uno por aficionado por día (ver /juegos)."""
+    __tablename__ = "partidos_oficiales"
+    __table_args__ = (
+        db.Index("uq_partidos_oficiales_aficionado_fecha", "aficionado_id", "fecha", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    aficionado_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    rival_id = db.Column(db.Integer, db.ForeignKey("equipos.id", ondelete="SET NULL"), nullable=True)
+    puntos_quinteto = db.Column(db.Integer, nullable=False)
+    puntos_rival = db.Column(db.Integer, nullable=False)
+    prob_victoria = db.Column(db.Float, nullable=False)
+    puntos_ganados = db.Column(db.Integer, nullable=False, default=0)
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 #--------EQUIPOS------------
 class Equipo(db.Model):
     __tablename__ = "equipos"
@@ -46,6 +84,9 @@ class Equipo(db.Model):
     escudo = db.Column(db.String(300))
     foto_estadio = db.Column(db.String(300))
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")   # ver versiones.py
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+
     jugadores = db.relationship("Jugador", back_populates="equipo_rel")
     dts = db.relationship("DT", back_populates="equipo_rel")
 
@@ -53,6 +94,9 @@ class Equipo(db.Model):
 #--------DDTS------------
 class DT(db.Model):
     __tablename__ = "dts"
+    __table_args__ = (
+        db.Index("ix_dts_equipo_id", "equipo_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(20))
@@ -72,6 +116,12 @@ class DT(db.Model):
 #--------JUGADORES------------
 class Jugador(db.Model):
     __tablename__ = "jugadores"
+    __table_args__ = (
+        db.Index("ix_jugadores_equipo_id", "equipo_id"),
+        db.Index("ix_jugadores_aficionado_media", "aficionado_id", "media"),       # inicio (top por media)
+        db.Index("ix_jugadores_aficionado_apellido", "aficionado_id", "apellido", "id"),   # listados por apellido
+        db.Index("ix_jugadores_aficionado_posicion_media", "aficionado_id", "posicion_principal", "media"),   # quinteto
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(20))
@@ -79,6 +129,8 @@ class Jugador(db.Model):
     camiseta = db.Column(db.Integer)
     media = db.Column(db.Integer)
     posicion = db.Column(db.String(15))
+    posicion_principal = db.Column(db.String(10))       # derivadas de posicion, ver posiciones.py
+    posiciones_secundarias = db.Column(db.String(40))
     nacionalidad = db.Column(db.String(30))
 
     equipo_id = db.Column(db.Integer, db.ForeignKey("equipos.id", ondelete="SET NULL"), nullable=True)
@@ -107,15 +159,23 @@ class Jugador(db.Model):
     media_day = db.Column(db.String(300))
     foto_juego = db.Column(db.String(300))
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")   # ver versiones.py
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+
 
 #--------QUINTETOS------------
 class AficionadoJugador(db.Model):
     __tablename__ = "aficionado_jugador"
+    __table_args__ = (
+        db.Index("ix_aficionado_jugador_aficionado_id", "aficionado_id"),
+        db.Index("uq_aficionado_jugador_slot", "aficionado_id", "slot", unique=True),   # ver quintetos.py
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     aficionado_id = db.Column(db.Integer, db.ForeignKey("users.id",ondelete="SET NULL"), nullable=True)
     jugador_id = db.Column(db.Integer, db.ForeignKey("jugadores.id", ondelete="SET NULL"), nullable=True)
+    slot = db.Column(db.String(10))   # puesto en el quinteto: uno de posiciones.POSICIONES
 
     aficionado = db.relationship("User", back_populates="quinteto")
     jugador = db.relationship("Jugador")
@@ -124,11 +184,16 @@ class AficionadoJugador(db.Model):
 #--------ARTICULOS------------
 class Articulo(db.Model):
     __tablename__ = "articulos"
+    __table_args__ = (
+        db.Index("ix_articulos_fecha", "fecha", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(150), unique=True)
     descripcion = db.Column(db.String(5000))
     resumen = db.Column(db.String(500))
+    resumen_estado = db.Column(db.String(20), default="listo")   # pendiente / listo / error
+    resumen_estrategia = db.Column(db.String(20))   # abstractivo / extractivo
     fecha = db.Column(db.Date)
 
     portada = db.Column(db.String(300))
@@ -136,26 +201,74 @@ class Articulo(db.Model):
     foto_2 = db.Column(db.String(300))
     foto_3 = db.Column(db.String(300))
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")   # ver versiones.py
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+#--------COLA DE RESUMENES------------
+class ResumenJob(db.Model):
+    __tablename__ = "resumen_jobs"
+    __table_args__ = (
+        db.Index("ix_resumen_jobs_estado", "estado", "proximo_intento"),
+        db.Index("ix_resumen_jobs_articulo_id", "articulo_id", "estado"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    articulo_id = db.Column(db.Integer, db.ForeignKey("articulos.id", ondelete="CASCADE"), nullable=False)
+
+    estado = db.Column(db.String(20), default="pendiente")   # pendiente / procesando / listo / error
+    intentos = db.Column(db.Integer, default=0)
+    max_intentos = db.Column(db.Integer, default=3)
+    error = db.Column(db.String(500))
+
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+    proximo_intento = db.Column(db.DateTime, default=datetime.utcnow)
+
+    articulo = db.relationship("Articulo")
+
+
+class ResumenCache(db.Model):
+    __tablename__ = "resumen_cache"
+
+    clave = db.Column(db.String(64), primary_key=True)   # sha256 de texto normalizado + modelo + parámetros
+    resumen = db.Column(db.String(500))
+    hits = db.Column(db.Integer, default=0)
+
+    creado = db.Column(db.DateTime, default=datetime.utcnow)
+    ultimo_uso = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 
 #--------EVENTOS------------
 class Evento(db.Model):
     __tablename__ = "eventos"
+    __table_args__ = (
+        db.Index("ix_eventos_fecha_y_hora", "fecha_y_hora", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(150), unique=True)
     descripcion = db.Column(db.String(3000))
     fecha_y_hora = db.Column(db.DateTime)
     cap_max = db.Column(db.Integer)
+    inscriptos_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")   # mantenido por inscripciones.inscribir
 
     portada = db.Column(db.String(300))
     foto_1 = db.Column(db.String(300))
 
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")   # ver versiones.py
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow)
+
     inscriptos = db.relationship("EventoAficionado", back_populates="evento")
 
 
 
 class EventoAficionado(db.Model):
     __tablename__ = "evento_aficionado"
+    __table_args__ = (
+        db.Index("uq_evento_aficionado", "evento_id", "aficionado_id", unique=True),
+        db.Index("ix_evento_aficionado_aficionado_id", "aficionado_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
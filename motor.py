@@ -0,0 +1,114 @@
+from functools import wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy.session import Session as SesionFlask
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Ajustes del motor de base de datos.
+#
+# SQLite: WAL (los lectores no bloquean al que escribe ni al revés),
+# synchronous=NORMAL (seguro con WAL), busy_timeout para esperar el lock de
+# escritura en vez de fallar con "database is locked", mmap y caché de
+# páginas. Se aplican en cada conexión nueva del pool.
+#
+# Opcionalmente, las vistas marcadas con @solo_lectura usan una segunda
+# conexión de solo lectura (bind "lectura"): el mismo archivo SQLite abierto
+# con mode=ro, o una réplica si DB_LECTURA_URL es una URL.
+
+
+def opciones_motor(config):
+    """SQLALCHEMY_ENGINE_OPTIONS según el motor de la URL principal."""
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    opciones = {}
+
+    if url.get_backend_name() == "sqlite":
+        if url.database not in (None, "", ":memory:"):
+            opciones["pool_size"] = config["DB_POOL_SIZE"]
+            opciones["max_overflow"] = config["DB_MAX_OVERFLOW"]
+            # el pool comparte conexiones entre threads; cada una la usa un request a la vez
+            opciones["connect_args"] = {"check_same_thread": False}
+            if config["SQLITE_AJUSTES"]:
+                opciones["connect_args"]["timeout"] = config["SQLITE_BUSY_TIMEOUT"] / 1000
+    else:
+        opciones["pool_size"] = config["DB_POOL_SIZE"]
+        opciones["max_overflow"] = config["DB_MAX_OVERFLOW"]
+        opciones["pool_pre_ping"] = True
+        opciones["pool_recycle"] = 1800
+
+    return opciones
+
+
+def url_lectura(config):
+    """URL del bind de solo lectura, o None si está desactivado."""
+    lectura = config["DB_LECTURA_URL"]
+    if not lectura:
+        return None
+    if lectura != "auto":
+        return lectura
+
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    # Flask-SQLAlchemy resuelve "file:<ruta relativa>" contra la carpeta instance, igual que la principal
+    return url.set(database=f"file:{url.database}", query={"mode": "ro", "uri": "true"}).render_as_string(False)
+
+
+def configurar_motor(app):
+    """Completa la config de engines. Llamar antes de db.init_app(app)."""
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opciones_motor(app.config)
+
+    lectura = url_lectura(app.config)
+    if lectura:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds["lectura"] = {"url": lectura, **opciones_motor(dict(app.config, SQLALCHEMY_DATABASE_URI=lectura))}
+
+
+def _pragmas_sqlite(config, solo_lectura):
+    def aplicar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+
+        if config["SQLITE_AJUSTES"]:
+            if not solo_lectura:
+                cursor.execute(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+            cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+            cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}")
+            cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+            cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_KB'])}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+
+        if solo_lectura:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return aplicar
+
+
+def iniciar_motor(app, db):
+    """Registra los PRAGMA en los engines SQLite. Llamar después de db.init_app(app)."""
+    with app.app_context():
+        for clave, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                event.listen(engine, "connect", _pragmas_sqlite(app.config, clave == "lectura"))
+
+
+#--------SOLO LECTURA------------
+
+class Sesion(SesionFlask):
+    """Sesión que manda las consultas de las vistas @solo_lectura al bind "lectura"."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get("solo_lectura"):
+            lectura = self._db.engines.get("lectura")
+            if lectura is not None:
+                return lectura
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def solo_lectura(f):
+    """Marca una vista que no escribe en la base: puede usar la conexión de lectura."""
+    @wraps(f)
+    def envoltura(*args, **kwargs):
+        g.solo_lectura = True
+        return f(*args, **kwargs)
+    return envoltura
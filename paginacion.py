@@ -0,0 +1,131 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import abort, request, url_for
+from sqlalchemy import tuple_
+
+TAM_PAGINA = 24
+TAM_MAXIMO = 100
+
+
+class Pagina:
+    def __init__(self, items, siguiente):
+        self.items = items
+        self.siguiente = siguiente   # cursor de la próxima página o None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def url_siguiente(self):
+        if self.siguiente is None:
+            return None
+
+        args = request.args.to_dict()
+        args["cursor"] = self.siguiente
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def _a_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def _desde_json(valor, columna):
+    if valor is None:
+        return None
+    tipo = columna.type.python_type
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    return valor
+
+
+def codificar_cursor(valor, id):
+    crudo = json.dumps([_a_json(valor), id]).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor, columna):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valor, id = json.loads(crudo)
+        return _desde_json(valor, columna), int(id)
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def tam_pagina():
+    n = request.args.get("n", TAM_PAGINA, type=int)
+    return max(1, min(n, TAM_MAXIMO))
+
+
+def _ordenar(query, columna, id_columna, desc):
+    # NULL cuenta como el valor más chico, igual que en los índices de SQLite:
+    # primero en orden ascendente, último en descendente
+    if desc:
+        return query.order_by(None).order_by(columna.desc().nulls_last(), id_columna.desc())
+    return query.order_by(None).order_by(columna.asc().nulls_first(), id_columna.asc())
+
+
+def _tramos(query, columna, id_columna, desc, ultimo):
+    """Consultas que siguen al cursor, en orden; cada una es un rango del índice.
+
+    Las filas con la columna en NULL forman un tramo aparte: (NULL, id)
+    no se puede comparar como tupla, así que pasar de un tramo al otro es
+    una segunda consulta en vez de un OR que obligaría a recorrer el índice.
+    """
+    valor, id = ultimo
+    nulos = query.filter(columna.is_(None))
+    if valor is None:
+        resto_nulos = nulos.filter(id_columna < id if desc else id_columna > id)
+        return [resto_nulos] if desc else [resto_nulos, query.filter(columna.is_not(None))]
+
+    clave = tuple_(columna, id_columna)
+    if desc:
+        return [query.filter(clave < tuple_(valor, id)), nulos]
+    # las filas en NULL ya pasaron; la comparación con NULL no las trae
+    return [query.filter(clave > tuple_(valor, id))]
+
+
+def paginar(query, columna, id_columna, desc=False):
+    """Paginación por cursor (keyset) sobre (columna, id).
+
+    En vez de OFFSET filtra por "después de la última fila vista", así
+    cada página cuesta lo mismo sin importar cuán adentro de la lista
+    esté. El id desempata filas con el mismo valor en la columna. Trae
+    una fila de más para saber si hay página siguiente sin contar.
+
+    Las filas con la columna en NULL van al principio en orden ascendente
+    y al final en descendente; la página que cruza al tramo de NULLs (o
+    sale de él) hace una consulta más.
+    """
+    n = tam_pagina()
+    cursor = request.args.get("cursor")
+
+    if cursor:
+        tramos = _tramos(query, columna, id_columna, desc, decodificar_cursor(cursor, columna))
+    else:
+        tramos = [query]
+
+    filas = []
+    for tramo in tramos:
+        filas += _ordenar(tramo, columna, id_columna, desc).limit(n + 1 - len(filas)).all()
+        if len(filas) > n:
+            break
+
+    siguiente = None
+    if len(filas) > n:
+        filas = filas[:n]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(getattr(ultima, columna.key), getattr(ultima, id_columna.key))
+
+    return Pagina(filas, siguiente)
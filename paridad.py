@@ -0,0 +1,354 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, inspect, text
+
+from models import (
+    db, User, Equipo, Jugador, DT, Articulo, Evento, EventoAficionado,
+    AficionadoJugador, ResumenJob
+)
+
+# Paridad entre motores de base de datos.
+#
+# `flask db-paridad --url sqlite:///... --url postgresql+psycopg://...`
+# corre los mismos chequeos contra cada base (cada uno en un proceso con
+# DATABASE_URL apuntando a esa base) y compara los resultados. Las bases
+# tienen que estar vacías: se crea el esquema, se cargan datos de prueba y
+# al final se borra todo.
+#
+# Cada chequeo devuelve un valor JSON; dos motores están a la par si todos
+# los chequeos devuelven lo mismo.
+
+CHEQUEOS = []
+
+
+def chequeo(f):
+    CHEQUEOS.append(f)
+    return f
+
+
+#--------DATOS------------
+
+def _cargar_datos():
+    equipos = [
+        Equipo(nombre="Boca Juniors", ciudad="Buenos Aires", estadio="Luis Conde"),
+        Equipo(nombre="Peñarol", ciudad="Mar del Plata", estadio="Islas Malvinas"),
+        Equipo(nombre="Atenas", ciudad="Córdoba", estadio="Carlos Cerutti"),
+    ]
+    db.session.add_all(equipos)
+    db.session.flush()
+
+    apellidos = ["Álvarez", "alvarez", "Zapata", "de la Cruz", "Delfino", "Ñancul", "Nocioni", "Ginóbili"]
+    for i, apellido in enumerate(apellidos):
+        db.session.add(Jugador(nombre=f"J{i}", apellido=apellido, media=60 + i % 3,
+                               posicion="Base", equipo_id=equipos[i % 3].id))
+    db.session.add(DT(nombre="Sergio", apellido="Hernández", equipo_id=equipos[0].id))
+
+    base = datetime(2026, 1, 1, 20, 0)
+    for i in range(12):
+        db.session.add(Articulo(titulo=f"Nota {i}", descripcion=f"Crónica del partido {i} en el estadio",
+                                fecha=None if i in (2, 7) else date(2026, 1, 1) + timedelta(days=i // 3),
+                                resumen_estado="listo"))
+        db.session.add(Evento(titulo=f"Evento {i}", descripcion="Encuentro con aficionados",
+                              fecha_y_hora=None if i in (5, 9) else base + timedelta(days=i // 4), cap_max=3))
+
+    for i in range(6):
+        db.session.add(User(username=f"hincha{i}", mail=f"hincha{i}@test", password="-"))
+    db.session.commit()
+
+
+#--------CHEQUEOS------------
+
+@chequeo
+def migraciones():
+    from migraciones import MIGRACIONES, version_actual
+    with db.engine.connect() as conn:
+        return version_actual(conn) == MIGRACIONES[-1][0]
+
+
+def _recorrer(cliente, url, patron):
+    """Sigue los links "Ver más" y devuelve los textos que matchean el patrón, en orden."""
+    import re
+    vistos = []
+    while url:
+        html = cliente.get(url).get_data(as_text=True)
+        vistos += re.findall(patron, html)
+        siguiente = re.search(r'href="([^"]+)"[^>]*rel="next"', html)
+        url = siguiente.group(1).replace("&amp;", "&") if siguiente else None
+    return vistos
+
+
+@chequeo
+def paginacion_noticias(cliente):
+    # con n=1 el cursor cae también en filas sin fecha
+    return [_recorrer(cliente, f"/noticias?n={n}", r"Nota \d+") for n in (5, 1)]
+
+
+@chequeo
+def paginacion_eventos(cliente):
+    return [_recorrer(cliente, f"/eventos?n={n}", r"Evento \d+") for n in (5, 1)]
+
+
+@chequeo
+def orden_apellidos():
+    # el orden de texto depende de la collation del motor
+    return [j.apellido for j in Jugador.query.order_by(Jugador.apellido, Jugador.id)]
+
+
+@chequeo
+def busqueda():
+    from busqueda import buscar
+    consultas = ["penarol", "PEÑAROL", "boca", "bo", "alvarez", "cronica estadio", "hernandez", "zzz"]
+    resultado = {}
+    for q in consultas:
+        encontrados = buscar(q)
+        resultado[q] = sorted(f"{tipo}:{_titulo(tipo, id)}" for tipo, id in encontrados)
+    return resultado
+
+
+def _titulo(tipo, id):
+    from busqueda import CAMPOS
+    modelo, titulo, _ = CAMPOS[tipo]
+    return titulo(db.session.get(modelo, id))
+
+
+@chequeo
+def inscripciones():
+    from inscripciones import inscribir
+    evento = Evento.query.filter_by(titulo="Evento 0").one()
+    usuarios = [u.id for u in User.query.filter(User.username.like("hincha%")).order_by(User.id)]
+
+    resultados = [inscribir(evento.id, u) for u in usuarios[:5]] + [inscribir(evento.id, usuarios[0])]
+    db.session.expire_all()
+    evento = db.session.get(Evento, evento.id)
+    return {
+        "resultados": resultados,
+        "contador": evento.inscriptos_count,
+        "filas": EventoAficionado.query.filter_by(evento_id=evento.id).count(),
+        "version": evento.version,
+    }
+
+
+@chequeo
+def inscripciones_concurrentes(app):
+    from inscripciones import prueba_de_carga
+    # en la base de este motor, no en el SQLite temporal
+    r = prueba_de_carga(app, cupo=10, aficionados=40, hilos=8,
+                        url=db.engine.url.render_as_string(hide_password=False))
+    return {"ok": r["ok"], "inscriptos": r["inscriptos"], "duplicados": r["duplicados"]}
+
+
+@chequeo
+def versiones():
+    jugador = Jugador.query.filter_by(apellido="Zapata").one()
+    equipo_anterior, equipo_nuevo = jugador.equipo_id, Equipo.query.filter_by(nombre="Peñarol").one().id
+    antes = {e.id: e.version for e in Equipo.query}
+
+    jugador.equipo_id = equipo_nuevo
+    db.session.commit()
+    db.session.expire_all()
+
+    despues = {e.id: e.version for e in Equipo.query}
+    return {
+        "jugador": db.session.get(Jugador, jugador.id).version,
+        "equipos_subidos": sorted(
+            nombre for nombre, id in [("anterior", equipo_anterior), ("nuevo", equipo_nuevo)]
+            if despues[id] > antes[id]
+        ),
+    }
+
+
+@chequeo
+def cola_resumenes():
+    from cola_resumenes import encolar_resumen, tomar_siguiente
+    articulo = Articulo.query.filter_by(titulo="Nota 0").one()
+    encolar_resumen(articulo)
+    encolar_resumen(articulo)   # el segundo reutiliza el job pendiente
+    db.session.commit()
+
+    primero = tomar_siguiente()
+    segundo = tomar_siguiente()
+    return {
+        "jobs": ResumenJob.query.filter_by(articulo_id=articulo.id).count(),
+        "tomado": primero is not None and primero.estado == "procesando" and primero.intentos == 1,
+        "segundo": segundo is None,
+    }
+
+
+@chequeo
+def quinteto():
+    from quintetos import guardar_puesto
+    hincha = User.query.filter_by(username="hincha0").one().id
+    j0, j1 = [j.id for j in Jugador.query.filter(Jugador.apellido.in_(["Delfino", "Nocioni"])).order_by(Jugador.apellido)]
+    resultados = [guardar_puesto(hincha, "Base", j0), guardar_puesto(hincha, "Base", j1), guardar_puesto(hincha, "Escolta", j0)]
+    filas = AficionadoJugador.query.filter_by(aficionado_id=hincha).all()
+    return {"resultados": resultados, "filas": [(f.slot, f.jugador.apellido) for f in filas]}
+
+
+@chequeo
+def ranking():
+    from ranking import sumar_puntos, volcar, top, posicion
+    hinchas = User.query.filter(User.username.like("hincha%")).order_by(User.id).all()
+    boca = Equipo.query.filter_by(nombre="Boca Juniors").one().id
+    for i, hincha in enumerate(hinchas[:4]):
+        hincha.equipo_favorito_id = boca if i % 2 else None
+    db.session.commit()
+
+    # varios premios por aficionado, con empates
+    for i, hincha in enumerate(hinchas[:6]):
+        for _ in range(3):
+            sumar_puntos(hincha.id, i // 2 + 1)
+    db.session.commit()
+    escritos = volcar()
+    db.session.expire_all()
+
+    return {
+        "escritos": escritos,
+        "top": [(a.username, a.puntos) for a in top(cantidad=5)],
+        "top_boca": [(a.username, a.puntos, a.equipo) for a in top(boca)],
+        "posiciones": [posicion(h.puntos) for h in hinchas[:6]],
+        "posiciones_boca": [posicion(h.puntos, boca) for h in hinchas[:4] if h.equipo_favorito_id == boca],
+    }
+
+
+@chequeo
+def cascadas():
+    """Los ondelete de las claves foráneas, igual en los dos motores."""
+    resultado = {}
+
+    # equipo borrado: jugadores y DTs quedan sin equipo
+    equipo = Equipo.query.filter_by(nombre="Boca Juniors").one()
+    jugadores = [j.id for j in equipo.jugadores]
+    db.session.delete(equipo)
+    db.session.commit()
+    resultado["equipo"] = {
+        "jugadores_sin_equipo": all(db.session.get(Jugador, j).equipo_id is None for j in jugadores),
+        "dts_sin_equipo": DT.query.filter_by(equipo_id=None).count(),
+    }
+
+    # aficionado borrado: su jugador se borra (CASCADE), sus inscripciones y quinteto quedan en NULL
+    hincha = User.query.filter_by(username="hincha5").one()
+    propio = Jugador(nombre="Mi", apellido="Jugador", aficionado_id=hincha.id)
+    evento = Evento.query.filter_by(titulo="Evento 11").one()
+    db.session.add_all([propio, EventoAficionado(evento_id=evento.id, aficionado_id=hincha.id)])
+    db.session.flush()
+    db.session.add(AficionadoJugador(aficionado_id=hincha.id, jugador_id=jugadores[0]))
+    db.session.commit()
+    propio_id = propio.id
+
+    db.session.delete(hincha)
+    db.session.commit()
+    db.session.expire_all()
+    resultado["aficionado"] = {
+        "jugador_propio_borrado": db.session.get(Jugador, propio_id) is None,
+        "inscripcion_sin_aficionado": EventoAficionado.query.filter_by(evento_id=evento.id, aficionado_id=None).count(),
+        "quinteto_sin_aficionado": AficionadoJugador.query.filter_by(aficionado_id=None).count(),
+    }
+
+    # evento borrado con SQL directo: las inscripciones se borran en la base (CASCADE)
+    evento_id = evento.id
+    db.session.execute(text("DELETE FROM eventos WHERE id = :id"), {"id": evento_id})
+    db.session.commit()
+    resultado["evento"] = EventoAficionado.query.filter_by(evento_id=evento_id).count()
+
+    # artículo borrado con SQL directo: sus jobs de resumen también
+    articulo_id = Articulo.query.filter_by(titulo="Nota 0").one().id
+    db.session.execute(text("DELETE FROM articulos WHERE id = :id"), {"id": articulo_id})
+    db.session.commit()
+    resultado["articulo"] = ResumenJob.query.filter_by(articulo_id=articulo_id).count()
+
+    return resultado
+
+
+@chequeo
+def importacion():
+    from busqueda import buscar
+    from importacion import importar, exportar
+    archivo = io.BytesIO(
+        "nombre,apellido,media,equipo\n"
+        "Luca,Vildoza,90,atenas\n"
+        ",Sin nombre,50,\n"
+        "Juan,Fernández,120,Nadie\n".encode("utf-8")
+    )
+    resultado = importar("jugadores", archivo, "csv")
+    exportado = json.loads("".join(exportar("jugadores", "json")))
+    return {
+        "resultado": resultado,
+        "busqueda": [_titulo(tipo, id) for tipo, id in buscar("vildoza")],
+        "exportado": [(j["apellido"], j["equipo"]) for j in exportado if j["apellido"] == "Vildoza"],
+    }
+
+
+#--------EJECUCION------------
+
+def _borrar_todo():
+    db.session.remove()
+    with db.engine.connect() as conn:
+        for tabla in ("schema_version", "busqueda_fts", "busqueda_docs"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {tabla}"))
+        # users y jugadores se referencian entre sí: no hay orden de borrado posible,
+        # se apagan las claves foráneas (SQLite) o se borra con CASCADE
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        for tabla in inspect(conn).get_table_names():
+            conn.execute(text(f'DROP TABLE IF EXISTS "{tabla}"' + ("" if sqlite else " CASCADE")))
+        conn.commit()
+
+
+def correr():
+    """Corre dentro del proceso de cada motor. Imprime los resultados como una línea JSON."""
+    import inspect as inspect_py
+
+    url = os.environ["DATABASE_URL"]
+    engine = create_engine(url)
+    tablas = inspect(engine).get_table_names()
+    engine.dispose()
+    if tablas:
+        print(json.dumps({"error": f"la base no está vacía ({len(tablas)} tablas)"}))
+        return
+
+    from app import crear_app
+    app = crear_app()
+    resultados = {}
+
+    with app.app_context():
+        try:
+            _cargar_datos()
+            cliente = app.test_client()
+            for f in CHEQUEOS:
+                disponibles = {"app": app, "cliente": cliente}
+                args = {p: disponibles[p] for p in inspect_py.signature(f).parameters}
+                try:
+                    resultados[f.__name__] = f(**args)
+                except Exception as e:
+                    db.session.rollback()
+                    resultados[f.__name__] = {"excepcion": f"{type(e).__name__}: {e}"[:300]}
+        finally:
+            _borrar_todo()
+
+    print(json.dumps({"resultados": resultados}))
+
+
+def comparar(urls, raiz):
+    """Corre los chequeos en cada URL. Devuelve ({url: resultados}, [chequeos distintos])."""
+    por_url = {}
+    for url in urls:
+        env = dict(os.environ, DATABASE_URL=url, CACHE_PAGINAS="off", DB_LECTURA_URL="")
+        proceso = subprocess.run([sys.executable, "-c", "import paridad; paridad.correr()"],
+                                 cwd=raiz, env=env, capture_output=True, text=True)
+        lineas = proceso.stdout.strip().splitlines()
+        if not lineas:
+            por_url[url] = {"error": proceso.stderr.strip().splitlines()[-1:] or ["sin salida"]}
+            continue
+        salida = json.loads(lineas[-1])
+        por_url[url] = salida.get("resultados") or {"error": salida.get("error")}
+
+    nombres = [f.__name__ for f in CHEQUEOS]
+    valores = list(por_url.values())
+    distintos = [n for n in nombres if any(v.get(n) != valores[0].get(n) for v in valores[1:])]
+    return por_url, distintos
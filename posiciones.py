@@ -0,0 +1,56 @@
+import re
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Jugador
+
+# Posiciones de los jugadores.
+#
+# `posicion` es texto libre ("Alero / Escolta", "ala pivot"...). Al
+# guardar un jugador se deriva la posición principal canónica (la primera
+# del texto) y las secundarias, en columnas propias: el selector del
+# quinteto filtra por la principal con un índice en vez de recorrer todos
+# los jugadores.
+
+POSICIONES = ["Base", "Escolta", "Alero", "Ala-Pivot", "Pivot"]
+
+
+def normalizar_posicion(pos):
+    pos = pos.lower()
+
+    if "base" in pos:
+        return "Base"
+    if "escolta" in pos:
+        return "Escolta"
+    if "alero" in pos:
+        return "Alero"
+    if "ala" in pos:
+        return "Ala-Pivot"
+    if "pivot" in pos:
+        return "Pivot"
+
+    return None
+
+
+def dividir_posicion(texto):
+    """(principal, secundarias) del texto libre: "Alero / Escolta" -> ("Alero", "Escolta").
+
+    Las secundarias van separadas por coma, sin repetir la principal.
+    """
+    posiciones = []
+    for parte in re.split(r"[/,;]", texto or ""):
+        pos = normalizar_posicion(parte.strip())
+        if pos and pos not in posiciones:
+            posiciones.append(pos)
+
+    if not posiciones:
+        return None, None
+    return posiciones[0], ",".join(posiciones[1:]) or None
+
+
+@event.listens_for(Session, "before_flush")
+def _derivar_posiciones(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Jugador) and (obj in session.new or inspect(obj).attrs["posicion"].history.has_changes()):
+            obj.posicion_principal, obj.posiciones_secundarias = dividir_posicion(obj.posicion)
@@ -0,0 +1,139 @@
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+
+from models import db, User, Equipo
+
+# Prueba de carga con varios procesos contra la misma base SQLite, como
+# varios workers de gunicorn. Compara SQLite sin ajustes (journal DELETE,
+# solo foreign_keys) contra los ajustes de motor.py (WAL, busy_timeout...).
+#
+# Cada worker es un proceso nuevo que importa la app con su propio entorno
+# y hace pedidos con el test client: lecturas anónimas de páginas públicas
+# y escrituras (guardar equipo favorito) de usuarios descartables.
+
+ESCENARIOS = [
+    ("sin ajustes", {"SQLITE_AJUSTES": "0"}),
+    ("con ajustes", {"SQLITE_AJUSTES": "1"}),
+]
+
+
+def trabajador(segundos, usuarios, equipos, escrituras, semilla):
+    """Corre dentro de cada proceso. Imprime el resultado como una línea JSON."""
+    from flask import got_request_exception
+    from app import app
+
+    app.testing = False   # un error es un 500, como en producción
+    bloqueos = []
+
+    def _contar(sender, exception, **extra):
+        if "database is locked" in str(exception):
+            bloqueos.append(1)
+
+    got_request_exception.connect(_contar, app)
+
+    clientes = []
+    for user_id in usuarios:
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion["_user_id"] = str(user_id)
+        clientes.append(cliente)
+
+    anonimo = app.test_client()
+    lecturas = ["/", "/equipos", "/eventos", "/noticias"] + [f"/equipo/{e}" for e in equipos]
+
+    rnd = random.Random(semilla)
+    latencias = []
+    errores = 0
+
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        if rnd.random() < escrituras:
+            cliente, url = rnd.choice(clientes), f"/perfil/guardar-equipo/{rnd.choice(equipos)}"
+        else:
+            cliente, url = anonimo, rnd.choice(lecturas)
+
+        inicio = time.perf_counter()
+        resp = cliente.get(url)
+        latencias.append(time.perf_counter() - inicio)
+        if resp.status_code >= 500:
+            errores += 1
+
+    print(json.dumps({"latencias": latencias, "errores": errores, "bloqueos": len(bloqueos)}))
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def _correr(procesos, segundos, usuarios, equipos, escrituras, entorno, raiz):
+    env = dict(os.environ, CACHE_PAGINAS="off", CACHE_USUARIOS_TTL="0", **entorno)
+
+    lanzados = []
+    for i in range(procesos):
+        args = json.dumps([segundos, usuarios[i::procesos], equipos, escrituras, i])
+        codigo = f"import json, prueba_carga; prueba_carga.trabajador(*json.loads({args!r}))"
+        lanzados.append(subprocess.Popen([sys.executable, "-c", codigo], cwd=raiz, env=env,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True))
+
+    latencias, errores, bloqueos = [], 0, 0
+    for proceso in lanzados:
+        salida, _ = proceso.communicate()
+        resultado = json.loads(salida.strip().splitlines()[-1])
+        latencias += resultado["latencias"]
+        errores += resultado["errores"]
+        bloqueos += resultado["bloqueos"]
+
+    return {
+        "pedidos": len(latencias),
+        "por_segundo": len(latencias) / segundos,
+        "errores": errores,
+        "bloqueos": bloqueos,
+        "p50_ms": _percentil(latencias, 0.50) * 1000 if latencias else None,
+        "p95_ms": _percentil(latencias, 0.95) * 1000 if latencias else None,
+    }
+
+
+def comparar(app, procesos=4, segundos=10, escrituras=0.2):
+    """Corre los dos escenarios y devuelve [(nombre, resultado)].
+
+    Solo para SQLite. Crea usuarios descartables y los borra al terminar.
+    """
+    if db.engine.dialect.name != "sqlite":
+        raise RuntimeError("La prueba de carga compara ajustes de SQLite")
+
+    marca = uuid.uuid4().hex[:8]
+    nuevos = [User(username=f"carga-{marca}-{i}", mail=f"carga-{marca}-{i}@test", password="-")
+              for i in range(procesos * 2)]
+    db.session.add_all(nuevos)
+    db.session.commit()
+    usuarios = [u.id for u in nuevos]
+    equipos = [e.id for e in Equipo.query.order_by(Equipo.id).limit(5)]
+
+    ruta = db.engine.url.database
+    resultados = []
+    try:
+        for nombre, entorno in ESCENARIOS:
+            # WAL queda grabado en el archivo: para el escenario sin ajustes se vuelve a DELETE
+            db.session.remove()
+            db.engine.dispose()
+            conexion = sqlite3.connect(ruta)
+            conexion.execute("PRAGMA journal_mode=DELETE")
+            conexion.close()
+
+            resultados.append((nombre, _correr(procesos, segundos, usuarios, equipos,
+                                               escrituras, entorno, app.root_path)))
+    finally:
+        for u in User.query.filter(User.id.in_(usuarios)):
+            db.session.delete(u)
+        db.session.commit()
+
+    return resultados
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+
+from models import db
+
+# Quinteto ideal de cada aficionado: una fila de aficionado_jugador por
+# puesto (slot), con índice único (aficionado_id, slot).
+#
+# Guardar un puesto es una sola sentencia: inserta o, si el puesto ya
+# estaba ocupado, reemplaza el jugador (ON CONFLICT DO UPDATE, igual en
+# SQLite y PostgreSQL). El SELECT valida en la misma sentencia que el
+# jugador exista, no sea de un aficionado y juegue en ese puesto.
+
+_GUARDAR = text(
+    "INSERT INTO aficionado_jugador (aficionado_id, jugador_id, slot) "
+    "SELECT :aficionado_id, id, posicion_principal FROM jugadores "
+    "WHERE id = :jugador_id AND aficionado_id IS NULL AND posicion_principal = :slot "
+    "ON CONFLICT (aficionado_id, slot) DO UPDATE SET jugador_id = excluded.jugador_id"
+)
+
+
+def guardar_puesto(aficionado_id, slot, jugador_id):
+    """Pone al jugador en ese puesto del quinteto. Devuelve False si el jugador no vale para el puesto."""
+    filas = db.session.execute(_GUARDAR, {"aficionado_id": aficionado_id, "jugador_id": jugador_id, "slot": slot}).rowcount
+    db.session.commit()
+    return filas > 0
@@ -0,0 +1,323 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import db, User, Equipo, PuntoPendiente
+from cache_usuarios import invalidar_usuario
+
+# Ranking de aficionados por puntos, general y por equipo favorito.
+#
+# El top N sale de la base con los índices ix_users_puntos y
+# ix_users_equipo_puntos (puntos de mayor a menor, desempate por id): la
+# consulta lee las primeras N entradas del índice, no ordena la tabla.
+#
+# "Tu posición" sale de una copia en memoria de los puntos de todos los
+# aficionados, en listas ordenadas (una general y una por equipo): la
+# posición es 1 + cuántos tienen más puntos, con una búsqueda binaria.
+# La copia es por proceso; los cambios por el ORM y los puntos que vuelca
+# este proceso se aplican al momento, los de otros procesos con el TTL.
+#
+# Los puntos ganados no se suman a users uno por uno: sumar_puntos()
+# agrega una fila a puntos_pendientes dentro de la transacción del que
+# los otorga (si se commitea, quedan guardados aunque el proceso se caiga)
+# y volcar() los pasa todos juntos: un DELETE ... RETURNING de la tabla
+# pendiente, sumados por aficionado, y una sola sentencia UPDATE ... SET
+# puntos = puntos + :delta con executemany. Cada proceso vuelca al
+# terminar un request cuando anotó LOTE premios o pasaron INTERVALO
+# segundos desde su último volcado. Como el DELETE se lleva las filas que
+# suma, dos procesos que vuelcan a la vez no cuentan dos veces el mismo
+# premio, y como el UPDATE suma sobre el valor de la base no se pisan.
+
+TOP = 20
+TTL_DEFAULT = 60
+LOTE = 200           # premios anotados por este proceso antes de volcar
+INTERVALO = 5.0      # segundos entre volcados de cada proceso
+
+
+class Ranking:
+    """Puntos de todos los aficionados, ordenados, para calcular posiciones.
+
+    `filas`: (id, equipo_favorito_id, puntos).
+    """
+
+    def __init__(self, filas):
+        self.de = {id: (equipo, puntos or 0) for id, equipo, puntos in filas}   # id -> (equipo, puntos)
+        self.por_equipo = {}
+        self.general = sorted(p for _, p in self.de.values())
+        for equipo, puntos in self.de.values():
+            if equipo is not None:
+                self.por_equipo.setdefault(equipo, []).append(puntos)
+        for lista in self.por_equipo.values():
+            lista.sort()
+
+    def _listas(self, equipo):
+        yield self.general
+        if equipo is not None:
+            yield self.por_equipo.setdefault(equipo, [])
+
+    def quitar(self, id):
+        anterior = self.de.pop(id, None)
+        if anterior is None:
+            return
+        equipo, puntos = anterior
+        for lista in self._listas(equipo):
+            del lista[bisect_left(lista, puntos)]
+
+    def poner(self, id, equipo, puntos):
+        self.quitar(id)
+        puntos = puntos or 0
+        self.de[id] = (equipo, puntos)
+        for lista in self._listas(equipo):
+            insort(lista, puntos)
+
+    def posicion(self, puntos, equipo=None):
+        """(posición, total) de alguien con esos puntos, general o entre los hinchas de `equipo`."""
+        lista = self.general if equipo is None else self.por_equipo.get(equipo, [])
+        return len(lista) - bisect_right(lista, puntos or 0) + 1, len(lista)
+
+
+#--------RANKING DEL PROCESO------------
+
+_ranking = None
+_expira = 0.0
+_lock = threading.Lock()
+
+
+def _cargar():
+    with Session(db.engine) as sesion:
+        return Ranking(sesion.execute(select(User.id, User.equipo_favorito_id, User.puntos)))
+
+
+def ranking():
+    global _ranking, _expira
+    ttl = current_app.config.get("RANKING_TTL", TTL_DEFAULT)
+    with _lock:
+        if _ranking is None or _expira < time.monotonic():
+            _ranking = _cargar()
+            _expira = time.monotonic() + ttl
+        return _ranking
+
+
+def posicion(puntos, equipo=None):
+    """(posición, total) con esos puntos; para un aficionado, sumarle sus pendientes()."""
+    r = ranking()
+    with _lock:
+        return r.posicion(puntos, equipo)
+
+
+def top(equipo_id=None, cantidad=TOP):
+    """Los `cantidad` aficionados con más puntos (columnas que muestra la tabla)."""
+    consulta = (
+        db.session.query(User.id, User.username, User.nombre, User.apellido, User.puntos,
+                         Equipo.nombre.label("equipo"))
+        .outerjoin(Equipo, User.equipo_favorito_id == Equipo.id)
+        .order_by(User.puntos.desc(), User.id)
+    )
+    if equipo_id is not None:
+        consulta = consulta.filter(User.equipo_favorito_id == equipo_id)
+    return consulta.limit(cantidad).all()
+
+
+def _aplicar(cambios):
+    """`cambios`: {id: (equipo_favorito_id, puntos)}, o None si el aficionado se borró."""
+    if _ranking is None:
+        return
+    with _lock:
+        for id, datos in cambios.items():
+            if datos is None:
+                _ranking.quitar(id)
+            else:
+                _ranking.poner(id, *datos)
+
+
+#--------PUNTOS------------
+
+_anotados = 0                    # premios anotados por este proceso desde el último volcado
+_ultimo_volcado = time.monotonic()
+_lock_volcado = threading.Lock()
+
+_pendientes = PuntoPendiente.__table__
+_usuarios = User.__table__
+
+_SUMAR = (
+    update(_usuarios)
+    .where(_usuarios.c.id == bindparam("b_id"))
+    .values(puntos=db.func.coalesce(_usuarios.c.puntos, 0) + bindparam("delta"))
+)
+
+
+def sumar_puntos(user_id, puntos):
+    """Anota puntos para un aficionado en la sesión actual; quedan guardados con su commit."""
+    global _anotados
+    if not puntos:
+        return
+    db.session.execute(insert(_pendientes).values(aficionado_id=user_id, puntos=puntos, creado=datetime.utcnow()))
+    with _lock_volcado:
+        _anotados += 1
+
+
+def pendientes(user_id):
+    """Puntos del aficionado que todavía no se volcaron."""
+    return db.session.execute(
+        select(db.func.coalesce(db.func.sum(_pendientes.c.puntos), 0)).where(_pendientes.c.aficionado_id == user_id)
+    ).scalar()
+
+
+def volcar():
+    """Suma a users todos los puntos pendientes (de cualquier proceso). Devuelve cuántos aficionados."""
+    global _anotados, _ultimo_volcado
+    with _lock_volcado:
+        _anotados, _ultimo_volcado = 0, time.monotonic()
+
+    # sin nada pendiente no se abre una transacción de escritura
+    with db.engine.connect() as conexion:
+        if conexion.execute(select(_pendientes.c.id).limit(1)).first() is None:
+            return 0
+
+    with db.engine.begin() as conexion:
+        lote = {}
+        for id, puntos in conexion.execute(delete(_pendientes).returning(_pendientes.c.aficionado_id, _pendientes.c.puntos)):
+            lote[id] = lote.get(id, 0) + puntos
+        if not lote:
+            return 0
+
+        conexion.execute(_SUMAR, [{"b_id": id, "delta": delta} for id, delta in lote.items()])
+        filas = conexion.execute(
+            select(_usuarios.c.id, _usuarios.c.equipo_favorito_id, _usuarios.c.puntos).where(_usuarios.c.id.in_(lote))
+        ).all()
+
+    _aplicar({id: (equipo, puntos) for id, equipo, puntos in filas})
+    invalidar_usuario(*lote)
+    return len(lote)
+
+
+def hay_que_volcar():
+    lote = current_app.config.get("PUNTOS_LOTE", LOTE)
+    intervalo = current_app.config.get("PUNTOS_INTERVALO", INTERVALO)
+    with _lock_volcado:
+        return _anotados >= lote or time.monotonic() - _ultimo_volcado >= intervalo
+
+
+def iniciar_ranking(app):
+    @app.teardown_request
+    def _volcar_puntos(exc):
+        if hay_que_volcar():
+            try:
+                volcar()
+            except Exception:
+                # siguen en puntos_pendientes: los vuelca el próximo intento
+                app.logger.exception("no se pudieron volcar los puntos pendientes")
+
+
+#--------ACTUALIZACION------------
+
+@event.listens_for(Session, "after_flush")
+def _juntar_cambios(session, flush_context):
+    cambios = session.info.setdefault("ranking", {})
+    for obj in session.new:
+        if isinstance(obj, User):
+            cambios[obj.id] = (obj.equipo_favorito_id, obj.puntos)
+    for obj in session.dirty:
+        if isinstance(obj, User) and (inspect(obj).attrs["puntos"].history.has_changes()
+                                      or inspect(obj).attrs["equipo_favorito_id"].history.has_changes()):
+            cambios[obj.id] = (obj.equipo_favorito_id, obj.puntos)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            cambios[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_al_commit(session):
+    cambios = session.info.pop("ranking", None)
+    if cambios:
+        _aplicar(cambios)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session):
+    session.info.pop("ranking", None)
+
+
+#--------BENCHMARK------------
+
+def _medir(funcion, veces):
+    inicio = time.perf_counter()
+    for i in range(veces):
+        funcion(i)
+    return (time.perf_counter() - inicio) / veces * 1000
+
+
+def benchmark(aficionados=100000, premios=5000, equipos=20, semilla=0):
+    """Tiempos (ms) del ranking contra las consultas directas, sobre `aficionados` sintéticos.
+
+    Corre en un SQLite temporal (WAL, synchronous=NORMAL, como motor.py)
+    con solo las columnas que usa el ranking.
+    """
+    azar = random.Random(semilla)
+    filas = [(i, azar.randint(1, equipos), azar.randint(0, 5000)) for i in range(1, aficionados + 1)]
+
+    carpeta = tempfile.TemporaryDirectory()
+    base = sqlite3.connect(os.path.join(carpeta.name, "ranking.db"))
+    base.execute("PRAGMA journal_mode=WAL")
+    base.execute("PRAGMA synchronous=NORMAL")
+    base.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, equipo_favorito_id INTEGER, puntos INTEGER)")
+    base.executemany("INSERT INTO users VALUES (?, ?, ?)", filas)
+    base.commit()
+
+    veces = 200
+    elegidos = [azar.choice(filas) for _ in range(veces)]
+    resultado = {"aficionados": aficionados, "premios": premios}
+
+    top_sql = "SELECT id, puntos FROM users ORDER BY puntos DESC, id LIMIT 20"
+    top_equipo_sql = "SELECT id, puntos FROM users WHERE equipo_favorito_id = ? ORDER BY puntos DESC, id LIMIT 20"
+    posicion_sql = "SELECT COUNT(*) + 1 FROM users WHERE puntos > ?"
+
+    resultado["sql_top_ms"] = _medir(lambda n: base.execute(top_sql).fetchall(), veces)
+    resultado["sql_top_equipo_ms"] = _medir(lambda n: base.execute(top_equipo_sql, (elegidos[n][1],)).fetchall(), veces)
+    resultado["sql_posicion_ms"] = _medir(lambda n: base.execute(posicion_sql, (elegidos[n][2],)).fetchone(), veces)
+
+    base.execute("CREATE INDEX ix_users_puntos ON users (puntos DESC, id)")
+    base.execute("CREATE INDEX ix_users_equipo_puntos ON users (equipo_favorito_id, puntos DESC, id)")
+    resultado["indice_top_ms"] = _medir(lambda n: base.execute(top_sql).fetchall(), veces)
+    resultado["indice_top_equipo_ms"] = _medir(lambda n: base.execute(top_equipo_sql, (elegidos[n][1],)).fetchall(), veces)
+    resultado["indice_posicion_ms"] = _medir(lambda n: base.execute(posicion_sql, (elegidos[n][2],)).fetchone(), veces)
+
+    inicio = time.perf_counter()
+    r = Ranking(filas)
+    resultado["construir_ms"] = (time.perf_counter() - inicio) * 1000
+    resultado["memoria_posicion_ms"] = _medir(lambda n: r.posicion(elegidos[n][2], elegidos[n][1]), veces)
+
+    # premios: un UPDATE + commit por premio contra acumular y volcar de una vez
+    ganadores = [azar.randint(1, aficionados) for _ in range(premios)]
+    inicio = time.perf_counter()
+    for id in ganadores:
+        base.execute("UPDATE users SET puntos = puntos + 1 WHERE id = ?", (id,))
+        base.commit()
+    resultado["premios_uno_a_uno_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    acumulados = {}
+    for id in ganadores:
+        acumulados[id] = acumulados.get(id, 0) + 1
+    base.executemany("UPDATE users SET puntos = puntos + ? WHERE id = ?", [(d, id) for id, d in acumulados.items()])
+    base.commit()
+    resultado["premios_por_lote_s"] = time.perf_counter() - inicio
+    resultado["premios_filas"] = len(acumulados)
+
+    inicio = time.perf_counter()
+    for id, delta in acumulados.items():
+        r.poner(id, r.de[id][0], r.de[id][1] + delta)
+    resultado["actualizar_ranking_ms"] = (time.perf_counter() - inicio) * 1000 / len(acumulados)
+
+    base.close()
+    carpeta.cleanup()
+    return resultado
@@ -0,0 +1,359 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import warnings
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from models import db, Jugador
+
+# Jugadores similares y percentiles por posición.
+#
+# Los atributos de todos los jugadores de la liga (no los de aficionados)
+# se cargan una vez en una matriz NumPy. Buscar los más parecidos a un
+# jugador o su percentil dentro de su posición es una operación sobre esa
+# matriz en memoria, sin recorrer la tabla en cada ficha.
+#
+# La similitud compara los seis atributos normalizados (z-score con la
+# media y el desvío de la liga al construir la matriz): por coseno importa
+# el perfil del jugador ("tira mucho y defiende poco"), por distancia
+# euclídea también el nivel.
+#
+# La matriz es por proceso. Las altas, cambios y bajas por el ORM se
+# aplican fila a fila al commitear; las cargas masivas (importacion.py)
+# la marcan para reconstruir. En los otros procesos el TTL acota cuánto
+# puede quedar vieja.
+
+STATS = ("tiro", "dribling", "velocidad", "pase", "defensa", "salto")
+CON_MEDIA = STATS + ("media",)   # columnas de la matriz; los percentiles incluyen la media
+METRICAS = ("coseno", "euclidea")
+
+TTL_DEFAULT = 600
+CANTIDAD = 6
+
+
+class Matriz:
+    """Atributos de los jugadores de la liga, una fila por jugador.
+
+    `filas`: (id, nombre, apellido, posicion_principal, version, *CON_MEDIA).
+    Los atributos vacíos cuentan como el promedio de la liga.
+    """
+
+    def __init__(self, filas):
+        filas = list(filas)
+        self.ids = np.array([f[0] for f in filas], dtype=np.int64)
+        self.datos = [tuple(f[1:4]) for f in filas]   # nombre, apellido, posicion_principal
+        self.versiones = np.array([f[4] or 1 for f in filas], dtype=np.int64)
+        self.valores = np.array([f[5:] for f in filas], dtype=np.float64).reshape(len(filas), len(CON_MEDIA))
+        self.fila_de = {int(id): i for i, id in enumerate(self.ids)}
+
+        # normalización fija hasta la próxima reconstrucción
+        stats = self.valores[:, :len(STATS)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # columnas sin ningún valor
+            self.centro = np.nan_to_num(np.nanmean(stats, axis=0))
+            self.escala = np.nan_to_num(np.nanstd(stats, axis=0))
+        self.escala[self.escala == 0] = 1
+
+        self.z = self._normalizar(stats)
+        self.normas = np.linalg.norm(self.z, axis=1)
+        self._ordenados = {}   # posicion -> columnas ordenadas, se calculan al pedir percentiles
+        self._firma = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def firma(self):
+        """Cambia con cualquier alta, baja o edición (va en el ETag de las fichas).
+
+        Hash de las filas (id, versión, nombre, posición y atributos)
+        ordenadas por id: no depende del orden de las filas, así que da lo
+        mismo en todos los procesos. Incluye los datos y no solo la
+        versión porque SQLite reusa el id más alto al borrarlo, y el
+        jugador nuevo empieza con la misma versión que tenía el borrado.
+        """
+        if self._firma is None:
+            orden = np.argsort(self.ids, kind="stable")
+            h = hashlib.sha1()
+            for arreglo in (self.ids, self.versiones, self.valores):
+                h.update(np.ascontiguousarray(arreglo[orden]).tobytes())
+            h.update(repr([self.datos[i] for i in orden]).encode("utf-8"))
+            self._firma = h.hexdigest()[:16]
+        return self._firma
+
+    def _normalizar(self, stats):
+        z = (np.asarray(stats, dtype=np.float64) - self.centro) / self.escala
+        return np.nan_to_num(z).astype(np.float32)
+
+    #--------CONSULTAS------------
+
+    def similares(self, valores, cantidad=CANTIDAD, metrica="coseno", excluir=None):
+        """Índices de las `cantidad` filas más parecidas a `valores`, de más a menos, y sus distancias."""
+        if metrica not in METRICAS:
+            raise ValueError(f"métrica desconocida: {metrica}")
+
+        z = self._normalizar(valores[:len(STATS)])
+        if metrica == "coseno":
+            norma = np.linalg.norm(z)
+            denominador = self.normas * norma
+            with np.errstate(divide="ignore", invalid="ignore"):
+                distancias = 1 - np.where(denominador > 0, (self.z @ z) / denominador, 0)
+        else:
+            diferencia = self.z - z
+            distancias = np.einsum("ij,ij->i", diferencia, diferencia)
+
+        fila = self.fila_de.get(excluir)
+        if fila is not None:
+            distancias[fila] = np.inf
+
+        cantidad = min(cantidad, len(self.ids) - (fila is not None))
+        if cantidad <= 0:
+            return []
+        # argpartition elige los k menores en O(n); solo esos se ordenan
+        indices = np.argpartition(distancias, cantidad - 1)[:cantidad]
+        indices = indices[np.argsort(distancias[indices], kind="stable")]
+        return [(int(i), float(distancias[i])) for i in indices]
+
+    def _ordenados_de(self, posicion):
+        ordenados = self._ordenados.get(posicion)
+        if ordenados is None:
+            mascara = [d[2] == posicion for d in self.datos] if posicion else slice(None)
+            columnas = np.sort(self.valores[mascara], axis=0)   # los vacíos (NaN) quedan al final
+            ordenados = (columnas, (~np.isnan(columnas)).sum(axis=0))
+            self._ordenados[posicion] = ordenados
+        return ordenados
+
+    def percentiles(self, valores, posicion=None):
+        """Porcentaje de jugadores de la posición con cada atributo menor o igual al dado.
+
+        Sin posición, contra toda la liga. None donde el valor está vacío.
+        """
+        columnas, cantidades = self._ordenados_de(posicion)
+        resultado = {}
+        for j, (nombre, valor) in enumerate(zip(CON_MEDIA, valores)):
+            if valor is None or not cantidades[j]:
+                resultado[nombre] = None
+                continue
+            debajo = np.searchsorted(columnas[:cantidades[j], j], valor, side="right")
+            resultado[nombre] = round(100 * int(debajo) / int(cantidades[j]))
+        return resultado
+
+    #--------CAMBIOS------------
+
+    def poner(self, id, nombre, apellido, posicion, version, valores):
+        """Alta o reemplazo de la fila de un jugador."""
+        fila = self.fila_de.get(id)
+        valores = np.array(valores, dtype=np.float64)
+        z = self._normalizar(valores[:len(STATS)])
+
+        if fila is None:
+            fila = len(self.ids)
+            self.ids = np.append(self.ids, id)
+            self.datos.append(None)
+            self.versiones = np.append(self.versiones, 0)
+            self.valores = np.vstack([self.valores, valores])
+            self.z = np.vstack([self.z, z])
+            self.normas = np.append(self.normas, 0)
+            self.fila_de[id] = fila
+        else:
+            self._ordenados.pop(self.datos[fila][2], None)
+
+        self.datos[fila] = (nombre, apellido, posicion)
+        self.versiones[fila] = version or 1
+        self.valores[fila] = valores
+        self.z[fila] = z
+        self.normas[fila] = np.linalg.norm(z)
+        self._ordenados.pop(posicion, None)
+        self._ordenados.pop(None, None)
+        self._firma = None
+
+    def quitar(self, id):
+        fila = self.fila_de.pop(id, None)
+        if fila is None:
+            return
+        self._ordenados.pop(self.datos[fila][2], None)
+        self._ordenados.pop(None, None)
+        self._firma = None
+
+        # la última fila pasa al hueco: no hay que correr el resto
+        ultima = len(self.ids) - 1
+        if fila != ultima:
+            for arreglo in (self.ids, self.versiones, self.valores, self.z, self.normas):
+                arreglo[fila] = arreglo[ultima]
+            self.datos[fila] = self.datos[ultima]
+            self.fila_de[int(self.ids[fila])] = fila
+
+        self.ids, self.versiones, self.valores, self.z, self.normas = (
+            a[:ultima] for a in (self.ids, self.versiones, self.valores, self.z, self.normas)
+        )
+        self.datos.pop()
+
+
+#--------MATRIZ DEL PROCESO------------
+
+_matriz = None
+_expira = 0.0
+_lock = threading.Lock()
+
+
+def _columnas():
+    return (Jugador.id, Jugador.nombre, Jugador.apellido, Jugador.posicion_principal, Jugador.version,
+            *(getattr(Jugador, c) for c in CON_MEDIA))
+
+
+def _cargar():
+    # sesión aparte: no depende de lo que tenga abierto la sesión del request
+    with Session(db.engine) as sesion:
+        return Matriz(sesion.execute(select(*_columnas()).where(Jugador.aficionado_id.is_(None))))
+
+
+def matriz():
+    """La matriz del proceso; la (re)construye si no existe o venció el TTL."""
+    global _matriz, _expira
+    ttl = current_app.config.get("SIMILARES_TTL", TTL_DEFAULT)
+    with _lock:
+        if _matriz is None or _expira < time.monotonic():
+            _matriz = _cargar()
+            _expira = time.monotonic() + ttl
+        return _matriz
+
+
+def marcar_desactualizada():
+    """Para escrituras que no pasan por el flush: se reconstruye en el próximo uso."""
+    global _expira
+    _expira = 0.0
+
+
+def _valores(jugador):
+    return [getattr(jugador, c) for c in CON_MEDIA]
+
+
+def similares(jugador, cantidad=CANTIDAD, metrica=None):
+    """Los jugadores de la liga más parecidos a `jugador` (dicts listos para el template)."""
+    metrica = metrica or current_app.config.get("SIMILARES_METRICA", "coseno")
+    m = matriz()
+    with _lock:
+        vecinos = m.similares(_valores(jugador), cantidad, metrica, excluir=jugador.id)
+        return [
+            {"id": int(m.ids[i]), "nombre": m.datos[i][0], "apellido": m.datos[i][1],
+             "posicion": m.datos[i][2], "media": _entero(m.valores[i, -1]), "distancia": distancia}
+            for i, distancia in vecinos
+        ]
+
+
+def percentiles(jugador):
+    """Percentil de cada atributo de `jugador` entre los de su posición principal."""
+    m = matriz()
+    with _lock:
+        return m.percentiles(_valores(jugador), jugador.posicion_principal)
+
+
+def firma():
+    m = matriz()
+    with _lock:
+        return m.firma()
+
+
+def _entero(valor):
+    return None if np.isnan(valor) else int(valor)
+
+
+#--------ACTUALIZACION------------
+
+@event.listens_for(Session, "after_flush")
+def _juntar_cambios(session, flush_context):
+    cambios = session.info.setdefault("similares", {})
+    modificados = list(session.new) + [o for o in session.dirty if session.is_modified(o)]
+    for obj in modificados:
+        if isinstance(obj, Jugador):
+            # un jugador que pasa a ser de un aficionado sale de la matriz
+            cambios[obj.id] = None if obj.aficionado_id is not None else (
+                obj.nombre, obj.apellido, obj.posicion_principal, obj.version, _valores(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Jugador):
+            cambios[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_al_commit(session):
+    cambios = session.info.pop("similares", None)
+    if not cambios or _matriz is None:
+        return
+    with _lock:
+        for id, datos in cambios.items():
+            if datos is None:
+                _matriz.quitar(id)
+            else:
+                _matriz.poner(id, *datos[:4], [np.nan if v is None else v for v in datos[4]])
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session):
+    session.info.pop("similares", None)
+
+
+#--------BENCHMARK------------
+
+def _filas_sinteticas(cantidad, semilla=0):
+    azar = np.random.default_rng(semilla)
+    posiciones = ("Base", "Escolta", "Alero", "Ala-Pivot", "Pivot")
+    stats = np.clip(azar.normal(65, 12, size=(cantidad, len(STATS))), 1, 99).round()
+    medias = stats.mean(axis=1).round()
+    return [
+        (i + 1, f"Nombre{i}", f"Apellido{i}", posiciones[i % len(posiciones)], 1, *map(int, stats[i]), int(medias[i]))
+        for i in range(cantidad)
+    ]
+
+
+def _medir(funcion, veces):
+    inicio = time.perf_counter()
+    for i in range(veces):
+        funcion(i)
+    return (time.perf_counter() - inicio) / veces * 1000
+
+
+def benchmark(jugadores=10000, consultas=500, cantidad=CANTIDAD):
+    """Tiempos (ms) de la matriz contra el equivalente en SQL sobre `jugadores` sintéticos.
+
+    El SQL corre en un SQLite en memoria: ordena toda la tabla por distancia
+    a cada jugador consultado y cuenta cuántos de su posición tienen cada
+    atributo menor o igual.
+    """
+    filas = _filas_sinteticas(jugadores)
+
+    inicio = time.perf_counter()
+    m = Matriz(filas)
+    construir_ms = (time.perf_counter() - inicio) * 1000
+
+    elegidos = np.random.default_rng(1).integers(0, jugadores, size=consultas)
+    valores = [list(filas[i][5:]) for i in elegidos]
+
+    resultado = {"jugadores": jugadores, "consultas": consultas, "construir_ms": construir_ms}
+    for metrica in METRICAS:
+        resultado[f"{metrica}_ms"] = _medir(
+            lambda n: m.similares(valores[n], cantidad, metrica, excluir=int(elegidos[n]) + 1), consultas)
+    resultado["percentiles_ms"] = _medir(lambda n: m.percentiles(valores[n], filas[elegidos[n]][3]), consultas)
+    resultado["actualizar_ms"] = _medir(lambda n: m.poner(int(elegidos[n]) + 1, *filas[elegidos[n]][1:5], valores[n]), consultas)
+
+    # lo mismo con consultas SQL
+    base = sqlite3.connect(":memory:")
+    base.execute(f"CREATE TABLE jugadores (id INTEGER PRIMARY KEY, nombre, apellido, posicion_principal, version, "
+                 f"{', '.join(CON_MEDIA)})")
+    base.executemany(f"INSERT INTO jugadores VALUES ({', '.join('?' * (5 + len(CON_MEDIA)))})", filas)
+    distancia = " + ".join(f"({c} - ?) * ({c} - ?)" for c in STATS)
+    sql_similares = f"SELECT id FROM jugadores WHERE id != ? ORDER BY {distancia} LIMIT ?"
+    sql_percentiles = ("SELECT " + ", ".join(f"SUM({c} <= ?)" for c in CON_MEDIA)
+                       + ", COUNT(*) FROM jugadores WHERE posicion_principal = ?")
+
+    veces_sql = max(1, consultas // 10)
+    resultado["sql_similares_ms"] = _medir(
+        lambda n: base.execute(sql_similares, [int(elegidos[n]) + 1, *(v for v in valores[n][:len(STATS)] for _ in "ab"),
+                                               cantidad]).fetchall(), veces_sql)
+    resultado["sql_percentiles_ms"] = _medir(
+        lambda n: base.execute(sql_percentiles, [*valores[n], filas[elegidos[n]][3]]).fetchall(), veces_sql)
+    base.close()
+    return resultado
@@ -0,0 +1,215 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import and_, select
+
+from models import db, Equipo, Jugador
+from similares import STATS
+
+# Simulador de partidos (Monte Carlo).
+#
+# Cada equipo se resume en un perfil con el promedio de los atributos de
+# sus cinco jugadores: el quinteto de un aficionado o los cinco de mayor
+# media de un plantel. Un partido son N posesiones por lado (Poisson,
+# más con equipos rápidos); en cada una se anota con una probabilidad que
+# sale del ataque propio contra la defensa rival, los errores se pueden
+# recuperar en el rebote ofensivo (salto) y una parte de los dobles son
+# triples (tiro). Si empatan, se juegan alargues de a diez posesiones.
+#
+# Un lote de miles de partidos entre los mismos dos equipos es un puñado
+# de sorteos vectorizados de NumPy (un arreglo por partido, sin bucles en
+# Python). Para una liga completa todos contra todos, los cruces se
+# reparten entre procesos.
+
+PARTIDOS = 2000
+VALOR_VACIO = 50     # atributo sin cargar
+SUPLENTE = 40        # puesto vacío del quinteto: juega un suplente flojo
+LOCALIA = 0.015      # ventaja del local en la probabilidad de anotar
+
+POSESIONES = 72
+POSESIONES_ALARGUE = 10
+
+
+class Perfil:
+    """Promedios de los atributos de un equipo de cinco, y lo que sale de ellos."""
+
+    def __init__(self, nombre, atributos, id=None):
+        atributos = np.array(atributos, dtype=np.float64).reshape(-1, len(STATS))
+        atributos = np.nan_to_num(atributos, nan=VALOR_VACIO)
+        faltan = max(0, 5 - len(atributos))
+        if faltan:
+            atributos = np.vstack([atributos, np.full((faltan, len(STATS)), SUPLENTE)])
+
+        self.id = id
+        self.nombre = nombre
+        self.completos = 5 - faltan
+        tiro, dribling, velocidad, pase, defensa, salto = atributos[:5].mean(axis=0)
+        self.ataque = 0.4 * tiro + 0.2 * dribling + 0.25 * pase + 0.15 * velocidad
+        self.defensa = 0.65 * defensa + 0.35 * salto
+        self.velocidad = velocidad
+        self.tiro = tiro
+        self.salto = salto
+
+
+def perfil_de(nombre, jugadores, id=None):
+    """Perfil a partir de objetos con los atributos (Jugador o filas de una consulta)."""
+    filas = [[np.nan if getattr(j, c) is None else getattr(j, c) for c in STATS] for j in jugadores]
+    return Perfil(nombre, filas, id=id)
+
+
+#--------PARTIDOS------------
+
+def _puntos(azar, posesiones, atacante, defensor, ventaja):
+    anotar = np.clip(0.45 + 0.006 * (atacante.ataque - defensor.defensa) + ventaja, 0.2, 0.75)
+    rebote = np.clip(0.25 + 0.004 * (atacante.salto - defensor.salto), 0.1, 0.45)
+    triple = np.clip(0.25 + 0.004 * (atacante.tiro - 65), 0.1, 0.5)
+
+    dobles = azar.binomial(posesiones, anotar)
+    segundas = azar.binomial(posesiones - dobles, rebote)
+    dobles += azar.binomial(segundas, anotar)
+    triples = azar.binomial(dobles, triple)
+    return 2 * dobles + triples
+
+
+def simular(local, visitante, partidos=PARTIDOS, azar=None, localia=0.0):
+    """Puntos del local y del visitante en `partidos` partidos (dos arreglos, sin empates)."""
+    azar = azar if azar is not None else np.random.default_rng()
+
+    ritmo = POSESIONES + 0.15 * ((local.velocidad + visitante.velocidad) / 2 - 65)
+    posesiones = azar.poisson(ritmo, size=partidos)
+    puntos_local = _puntos(azar, posesiones, local, visitante, localia)
+    puntos_visitante = _puntos(azar, posesiones, visitante, local, 0.0)
+
+    # alargues solo para los que siguen empatados
+    empatados = np.flatnonzero(puntos_local == puntos_visitante)
+    while len(empatados):
+        extra = np.full(len(empatados), POSESIONES_ALARGUE)
+        puntos_local[empatados] += _puntos(azar, extra, local, visitante, localia)
+        puntos_visitante[empatados] += _puntos(azar, extra, visitante, local, 0.0)
+        empatados = empatados[puntos_local[empatados] == puntos_visitante[empatados]]
+
+    return puntos_local, puntos_visitante
+
+
+def resumen(local, visitante, partidos=PARTIDOS, semilla=None, localia=0.0):
+    """Simula y resume lo que muestra la página de juegos."""
+    puntos_local, puntos_visitante = simular(local, visitante, partidos, np.random.default_rng(semilla), localia)
+    margen = puntos_local - puntos_visitante
+    return {
+        "local": local,
+        "visitante": visitante,
+        "partidos": partidos,
+        "victorias_local": int((margen > 0).sum()),
+        "prob_local": round(100 * float((margen > 0).mean()), 1),
+        "puntos_local": round(float(puntos_local.mean()), 1),
+        "puntos_visitante": round(float(puntos_visitante.mean()), 1),
+        "margen": round(float(margen.mean()), 1),
+        "margen_p10": int(np.percentile(margen, 10)),
+        "margen_p90": int(np.percentile(margen, 90)),
+        "muestra": (int(puntos_local[0]), int(puntos_visitante[0])),
+    }
+
+
+def puntos_ganados(resultado):
+    """Puntos del aficionado por el partido de muestra: más cuanto menos probable era ganarlo."""
+    local, visitante = resultado["muestra"]
+    if local <= visitante:
+        return 0
+    return 1 + round(9 * (1 - resultado["prob_local"] / 100))
+
+
+#--------LIGA------------
+
+def _jugar_cruces(cruces, perfiles, partidos, semilla):
+    """[(local, visitante, victorias del local, puntos local, puntos visitante)] de cada cruce."""
+    azar = np.random.default_rng(semilla)
+    resultados = []
+    for i, j in cruces:
+        puntos_local, puntos_visitante = simular(perfiles[i], perfiles[j], partidos, azar, LOCALIA)
+        resultados.append((i, j, int((puntos_local > puntos_visitante).sum()),
+                           int(puntos_local.sum()), int(puntos_visitante.sum())))
+    return resultados
+
+
+def liga(perfiles, partidos=1000, procesos=1, semilla=None):
+    """Todos contra todos, ida y vuelta, `partidos` simulaciones por cruce.
+
+    Los cruces van en tandas, una por equipo local, cada una con su propia
+    semilla (SeedSequence.spawn); con procesos > 1 las tandas se reparten
+    en un pool de procesos y el resultado es el mismo que en uno solo.
+    Devuelve la tabla ordenada por porcentaje de victorias.
+    """
+    n = len(perfiles)
+    tandas = [[(i, j) for j in range(n) if j != i] for i in range(n)]
+    semillas = np.random.SeedSequence(semilla).spawn(n)
+
+    if procesos > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as ex:
+            futuros = [ex.submit(_jugar_cruces, t, perfiles, partidos, s) for t, s in zip(tandas, semillas)]
+            resultados = [r for f in futuros for r in f.result()]
+    else:
+        resultados = [r for t, s in zip(tandas, semillas) for r in _jugar_cruces(t, perfiles, partidos, s)]
+
+    tabla = [{"perfil": p, "jugados": 0, "victorias": 0, "a_favor": 0, "en_contra": 0} for p in perfiles]
+    for i, j, victorias, puntos_i, puntos_j in resultados:
+        for fila, ganados, favor, contra in ((tabla[i], victorias, puntos_i, puntos_j),
+                                             (tabla[j], partidos - victorias, puntos_j, puntos_i)):
+            fila["jugados"] += partidos
+            fila["victorias"] += ganados
+            fila["a_favor"] += favor
+            fila["en_contra"] += contra
+
+    for fila in tabla:
+        jugados = fila["jugados"] or 1
+        fila["porcentaje"] = round(100 * fila["victorias"] / jugados, 1)
+        fila["diferencia"] = round((fila["a_favor"] - fila["en_contra"]) / jugados, 1)
+    return sorted(tabla, key=lambda f: f["porcentaje"], reverse=True)
+
+
+#--------DATOS------------
+
+def perfiles_equipos(ids=None):
+    """{equipo_id: Perfil} con los cinco jugadores de mayor media de cada plantel, en una consulta."""
+    consulta = (
+        select(Equipo.id, Equipo.nombre, Jugador.id, *(getattr(Jugador, c) for c in STATS))
+        .outerjoin(Jugador, and_(Jugador.equipo_id == Equipo.id, Jugador.aficionado_id.is_(None)))
+        .order_by(Equipo.id, Jugador.media.desc().nulls_last(), Jugador.id)
+    )
+    if ids is not None:
+        consulta = consulta.where(Equipo.id.in_(ids))
+
+    planteles = {}
+    for id, nombre, jugador_id, *atributos in db.session.execute(consulta):
+        filas = planteles.setdefault(id, (nombre, []))[1]
+        if jugador_id is not None and len(filas) < 5:
+            filas.append([np.nan if a is None else a for a in atributos])
+    return {id: Perfil(nombre, filas, id=id) for id, (nombre, filas) in planteles.items()}
+
+
+#--------BENCHMARK------------
+
+def _perfiles_sinteticos(cantidad, semilla=0):
+    azar = np.random.default_rng(semilla)
+    return [Perfil(f"Equipo {i + 1}", np.clip(azar.normal(65, 10, size=(5, len(STATS))), 1, 99), id=i + 1)
+            for i in range(cantidad)]
+
+
+def benchmark(partidos=100000, equipos=20, por_cruce=2000, procesos=None):
+    """Partidos simulados por segundo: un lote entre dos equipos y una liga en uno y en varios procesos."""
+    procesos = procesos or os.cpu_count() or 1
+    perfiles = _perfiles_sinteticos(equipos)
+
+    inicio = time.perf_counter()
+    simular(perfiles[0], perfiles[1], partidos, np.random.default_rng(0))
+    lote = time.perf_counter() - inicio
+
+    resultado = {"lote_partidos": partidos, "lote_por_segundo": partidos / lote}
+    total = equipos * (equipos - 1) * por_cruce
+    for nombre, n in (("liga_1", 1), ("liga_n", procesos)):
+        inicio = time.perf_counter()
+        liga(perfiles, por_cruce, procesos=n, semilla=0)
+        segundos = time.perf_counter() - inicio
+        resultado[nombre] = {"procesos": n, "partidos": total, "segundos": segundos, "por_segundo": total / segundos}
+    return resultado
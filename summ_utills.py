@@ -1,18 +1,339 @@
-from transformers import pipeline
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# transformers/torch se importan recién al cargar el modelo: los procesos
+# web que nunca resumen no pagan ese import al arrancar.
+
+MODELO = "philschmid/bart-large-cnn-samsum"
+# los mismos para un texto suelto y para un lote, y parte de la clave del
+# cache de resúmenes (cache_resumenes.clave_resumen): un resumen cacheado
+# no depende de por qué camino se generó
+PARAMS_GENERACION = {"max_length": 60, "min_length": 20, "truncation": True}
+LARGO_MINIMO = 50
+
+BACKEND = os.getenv("RESUMEN_BACKEND", "pytorch")
+
+# Política extractivo / abstractivo
+LARGO_EXTRACTIVO = int(os.getenv("RESUMEN_LARGO_EXTRACTIVO", 400))   # más corto que esto no vale la pena pasar por BART
+COLA_MAXIMA = int(os.getenv("RESUMEN_COLA_MAXIMA", 20))              # con más jobs pendientes se usa el extractivo
+PRESUPUESTO_S = float(os.getenv("RESUMEN_PRESUPUESTO_S", 30))        # espera máxima estimada para un resumen abstractivo
 
 _summarizer = None
+_lock = threading.Lock()
+_latencia_abstractiva = None   # promedio móvil de segundos por resumen abstractivo
 
-def resumir_texto(texto: str):
+
+# --------- BACKENDS ---------
+# Un backend es una función sin argumentos que devuelve algo con la misma
+# interfaz que el pipeline de summarization de HF: recibe un texto o una
+# lista de textos (+ kwargs de generación) y devuelve [{"summary_text": ...}].
+
+def _cargar_pytorch():
+    from transformers import pipeline
+    return pipeline("summarization", model=MODELO)
+
+
+def _cargar_int8():
+    """BART con las capas Linear cuantizadas a int8 (dinámico, solo CPU)."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    modelo = AutoModelForSeq2SeqLM.from_pretrained(MODELO)
+    modelo = torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+    tokenizer = AutoTokenizer.from_pretrained(MODELO)
+    return pipeline("summarization", model=modelo, tokenizer=tokenizer)
+
+
+def _cargar_onnx():
+    """BART exportado a ONNX y ejecutado con ONNX Runtime en CPU (requiere optimum[onnxruntime])."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+
+    modelo = ORTModelForSeq2SeqLM.from_pretrained(MODELO, export=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODELO)
+    return pipeline("summarization", model=modelo, tokenizer=tokenizer)
+
+
+BACKENDS = {
+    "pytorch": _cargar_pytorch,
+    "int8": _cargar_int8,
+    "onnx": _cargar_onnx,
+}
+
+
+def registrar_backend(nombre, cargador):
+    BACKENDS[nombre] = cargador
+
+
+def usar_backend(nombre):
+    """Cambia el backend activo. El modelo se vuelve a cargar en el próximo uso."""
+    global BACKEND, _summarizer
+
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de resumen desconocido: {nombre}")
+
+    with _lock:
+        BACKEND = nombre
+        _summarizer = None
+
+
+def firma_modelo():
+    """Identifica modelo + backend (la salida cuantizada no es idéntica a la original)."""
+    return f"{MODELO}@{BACKEND}"
+
+
+def _cargar_summarizer():
     global _summarizer
 
-    if not texto or len(texto) < 50:
+    if _summarizer is None:
+        with _lock:
+            if _summarizer is None:
+                _summarizer = BACKENDS[BACKEND]()
+
+    return _summarizer
+
+
+def precalentar():
+    """Carga el modelo y corre una generación de prueba.
+
+    Se llama al arrancar el worker, así ningún artículo paga la carga
+    inicial ni la primera inferencia (que es más lenta que las siguientes).
+    Devuelve los segundos que tardó.
+    """
+    inicio = time.perf_counter()
+    summarizer = _cargar_summarizer()
+    summarizer("La Liga Nacional de Básquet es la principal competencia del básquet argentino. " * 2,
+               **PARAMS_GENERACION)
+    return time.perf_counter() - inicio
+
+
+def resumir_texto(texto: str):
+    global _latencia_abstractiva
+
+    if not texto or len(texto) < LARGO_MINIMO:
         return texto
 
-    if _summarizer is None:
-        _summarizer = pipeline(
-            "summarization",
-            model="philschmid/bart-large-cnn-samsum"
-        )
+    summarizer = _cargar_summarizer()
+
+    inicio = time.perf_counter()
+    res = summarizer(texto, **PARAMS_GENERACION)
+    duracion = time.perf_counter() - inicio
+
+    if _latencia_abstractiva is None:
+        _latencia_abstractiva = duracion
+    else:
+        _latencia_abstractiva = 0.8 * _latencia_abstractiva + 0.2 * duracion
 
-    res = _summarizer(texto, max_length=60, min_length=20)
     return res[0]["summary_text"]
+
+
+# --------- EXTRACTIVO ---------
+
+_STOPWORDS = {
+    "de", "la", "que", "el", "en", "y", "a", "los", "del", "se", "las", "por", "un", "para",
+    "con", "no", "una", "su", "al", "lo", "como", "más", "pero", "sus", "le", "ya", "o",
+    "este", "sí", "porque", "esta", "entre", "cuando", "muy", "sin", "sobre", "también",
+    "me", "hasta", "hay", "donde", "quien", "desde", "todo", "nos", "durante", "todos",
+    "uno", "les", "ni", "contra", "otros", "ese", "eso", "ante", "ellos", "e", "esto",
+    "antes", "algunos", "qué", "unos", "yo", "otro", "otras", "otra", "él", "tanto", "esa",
+    "estos", "mucho", "quienes", "nada", "muchos", "cual", "poco", "ella", "estar", "estas",
+    "es", "son", "fue", "ha", "han", "era", "ser", "tiene", "tras",
+}
+
+
+def _oraciones(texto):
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return [o for o in re.split(r"(?<=[.!?])\s+", texto) if o]
+
+
+def _terminos(oracion):
+    return [
+        p for p in re.findall(r"\w+", oracion.lower())
+        if p not in _STOPWORDS and len(p) > 2 and not p.isdigit()
+    ]
+
+
+def resumir_extractivo(texto: str, max_oraciones=2, max_caracteres=500):
+    """Resumen extractivo: elige las oraciones más representativas del texto.
+
+    Cada oración es un vector TF-IDF (las oraciones hacen de documentos) y
+    se puntúa por similitud coseno con el vector del texto completo. La
+    primera oración tiene un bonus porque en las noticias suele ser el
+    copete. Las elegidas se devuelven en su orden original.
+    """
+    if not texto or len(texto) < LARGO_MINIMO:
+        return texto
+
+    oraciones = _oraciones(texto)
+    if len(oraciones) <= max_oraciones:
+        return " ".join(oraciones)[:max_caracteres]
+
+    terminos = [_terminos(o) for o in oraciones]
+    n = len(oraciones)
+
+    df = Counter()
+    for t in terminos:
+        df.update(set(t))
+    idf = {p: math.log(1 + n / c) for p, c in df.items()}
+
+    vectores = [{p: c * idf[p] for p, c in Counter(t).items()} for t in terminos]
+
+    centroide = Counter()
+    for v in vectores:
+        centroide.update(v)
+    norma_centroide = math.sqrt(sum(x * x for x in centroide.values())) or 1.0
+
+    puntajes = []
+    for i, v in enumerate(vectores):
+        norma = math.sqrt(sum(x * x for x in v.values()))
+        puntaje = 0.0
+        if norma:
+            puntaje = sum(x * centroide[p] for p, x in v.items()) / (norma * norma_centroide)
+        if i == 0:
+            puntaje *= 1.2
+        puntajes.append(puntaje)
+
+    elegidas = sorted(sorted(range(n), key=lambda i: -puntajes[i])[:max_oraciones])
+    return " ".join(oraciones[i] for i in elegidas)[:max_caracteres]
+
+
+# --------- POLITICA ---------
+
+def elegir_estrategia(texto, pendientes=0):
+    """Decide entre 'extractivo' y 'abstractivo' para un texto.
+
+    - Textos cortos: extractivo (BART no aporta mucho y cuesta lo mismo).
+    - Cola con más de COLA_MAXIMA jobs: extractivo, para vaciarla rápido.
+    - Si la latencia medida de BART por la cola pendiente supera el
+      presupuesto, extractivo. La latencia solo se conoce en el proceso
+      que ya resumió algo (el worker); en el proceso web no aplica.
+    """
+    if not texto or len(texto) < LARGO_EXTRACTIVO:
+        return "extractivo"
+
+    if pendientes > COLA_MAXIMA:
+        return "extractivo"
+
+    if _latencia_abstractiva is not None and _latencia_abstractiva * (pendientes + 1) > PRESUPUESTO_S:
+        return "extractivo"
+
+    return "abstractivo"
+
+
+def configurar_hilos(hilos):
+    """Cantidad de hilos que usa torch para las operaciones en CPU."""
+    import torch
+    torch.set_num_threads(hilos)
+
+
+def resumir_lote(textos, tam_lote=8):
+    """Resume varios textos devolviendo los resúmenes en el mismo orden.
+
+    Los textos se ordenan por largo antes de armar los lotes, así cada
+    lote se rellena (padding) hasta un largo parecido y no se desperdicia
+    cómputo en tokens de relleno.
+    """
+    resultados = list(textos)
+
+    indices = [i for i, t in enumerate(textos) if t and len(t) >= LARGO_MINIMO]
+    if not indices:
+        return resultados
+
+    indices.sort(key=lambda i: len(textos[i]))
+    summarizer = _cargar_summarizer()
+
+    for ini in range(0, len(indices), tam_lote):
+        grupo = indices[ini:ini + tam_lote]
+        res = summarizer(
+            [textos[i] for i in grupo],
+            batch_size=len(grupo),
+            **PARAMS_GENERACION
+        )
+        for i, r in zip(grupo, res):
+            resultados[i] = r["summary_text"]
+
+    return resultados
+
+
+def _iniciar_proceso(hilos, backend):
+    configurar_hilos(hilos)
+    usar_backend(backend)
+
+
+def _resumir_parte(args):
+    textos, tam_lote = args
+    return resumir_lote(textos, tam_lote)
+
+
+def crear_pool(procesos):
+    """Pool de procesos para resumir en paralelo.
+
+    Cada proceso carga su propio modelo una sola vez, así que conviene
+    crear el pool una vez y reutilizarlo. Los núcleos se reparten entre
+    procesos para que torch no sobre-suscriba la CPU.
+    """
+    hilos = max(1, (os.cpu_count() or 1) // procesos)
+    return ProcessPoolExecutor(
+        max_workers=procesos,
+        initializer=_iniciar_proceso,
+        initargs=(hilos, BACKEND)
+    )
+
+
+def resumir_en_procesos(pool, procesos, textos, tam_lote=8):
+    # reparto intercalado por largo para que todos los procesos reciban carga pareja
+    orden = sorted(range(len(textos)), key=lambda i: len(textos[i] or ""))
+    partes = [orden[k::procesos] for k in range(procesos)]
+    partes = [p for p in partes if p]
+
+    resultados = [None] * len(textos)
+    trabajos = [([textos[i] for i in parte], tam_lote) for parte in partes]
+
+    for parte, resumenes in zip(partes, pool.map(_resumir_parte, trabajos)):
+        for i, r in zip(parte, resumenes):
+            resultados[i] = r
+
+    return resultados
+
+
+# --------- BENCHMARK ---------
+
+def medir_backend(nombre, textos):
+    """Mide arranque en frío y latencia por resumen de un backend.
+
+    - carga: importar el stack + cargar el modelo
+    - primera: primera inferencia (incluye la inicialización perezosa de kernels)
+    - latencias: el resto de los textos, ya en caliente
+    """
+    usar_backend(nombre)
+
+    inicio = time.perf_counter()
+    summarizer = _cargar_summarizer()
+    carga = time.perf_counter() - inicio
+
+    textos = [t for t in textos if t and len(t) >= LARGO_MINIMO]
+    if not textos:
+        return {"backend": nombre, "carga_s": carga, "primera_s": None, "latencias_s": []}
+
+    inicio = time.perf_counter()
+    summarizer(textos[0], **PARAMS_GENERACION)
+    primera = time.perf_counter() - inicio
+
+    latencias = []
+    for texto in textos[1:]:
+        inicio = time.perf_counter()
+        summarizer(texto, **PARAMS_GENERACION)
+        latencias.append(time.perf_counter() - inicio)
+
+    return {"backend": nombre, "carga_s": carga, "primera_s": primera, "latencias_s": latencias}
+
+
+def medir_backend_en_frio(nombre, textos):
+    """medir_backend en un proceso nuevo: el import y la carga se miden realmente en frío."""
+    with ProcessPoolExecutor(max_workers=1) as ex:
+        return ex.submit(medir_backend, nombre, textos).result()
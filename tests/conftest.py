@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+import pytest
+
+# La app lee la configuración del entorno al importarse (ver config.py):
+# los tests usan un SQLite temporal y sin cache de páginas.
+_carpeta = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_carpeta.name, "lnb.db")
+os.environ["CACHE_PAGINAS"] = "off"
+os.environ["DB_LECTURA_URL"] = ""
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.schema import sort_tables  # noqa: E402
+
+import cache_usuarios  # noqa: E402
+import ranking  # noqa: E402
+from app import app as _app, crear_app  # noqa: E402
+from models import db, User, Equipo, Jugador  # noqa: E402
+from similares import marcar_desactualizada  # noqa: E402
+
+# orden de borrado, sin contar el lazo users.jugador_favorito_id
+_TABLAS = sort_tables(db.metadata.tables.values(),
+                      skip_fn=lambda fk: fk.parent is User.__table__.c.jugador_favorito_id)
+
+
+@pytest.fixture(scope="session")
+def app():
+    _app.testing = True   # controla los presupuestos de consultas
+    crear_app()
+    yield _app
+    _carpeta.cleanup()
+
+
+@pytest.fixture
+def base(app):
+    """App context con la base vacía al terminar el test."""
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        # users y jugadores se apuntan entre sí: primero se corta ese lazo
+        db.session.execute(User.__table__.update().values(jugador_favorito_id=None))
+        for tabla in reversed(_TABLAS):
+            db.session.execute(tabla.delete())
+        db.session.execute(text("DELETE FROM busqueda_fts"))
+        db.session.commit()
+
+    # copias en memoria del proceso
+    cache_usuarios.limpiar()
+    ranking._ranking = None
+    marcar_desactualizada()
+
+
+@pytest.fixture
+def cliente(app, base):
+    return app.test_client()
+
+
+def crear_usuario(username, **campos):
+    usuario = User(username=username, mail=f"{username}@test", password="-", **campos)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def crear_jugador(apellido, equipo=None, **campos):
+    jugador = Jugador(nombre=campos.pop("nombre", "J"), apellido=apellido,
+                      equipo_id=equipo.id if equipo else None, **campos)
+    db.session.add(jugador)
+    db.session.commit()
+    return jugador
+
+
+def crear_equipo(nombre):
+    equipo = Equipo(nombre=nombre)
+    db.session.add(equipo)
+    db.session.commit()
+    return equipo
+
+
+def loguear(cliente, usuario):
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario.id)
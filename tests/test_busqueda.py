@@ -0,0 +1,68 @@
+import pytest
+
+import busqueda
+from busqueda import buscar, resultados
+from conftest import crear_equipo, crear_jugador, crear_usuario
+from models import db, Equipo, Jugador
+
+
+@pytest.fixture(params=["fts5", "memoria"])
+def modo(request, base, monkeypatch):
+    """Los mismos tests con FTS5 y con el índice en memoria (el de los motores sin FTS)."""
+    if request.param == "memoria":
+        monkeypatch.setattr(busqueda, "_modo", "memoria")
+        monkeypatch.setattr(busqueda, "_memoria_cargada", False)
+        monkeypatch.setattr(busqueda, "_terminos", busqueda.defaultdict(dict))
+        monkeypatch.setattr(busqueda, "_docs", {})
+        monkeypatch.setattr(busqueda, "_vocabulario_sucio", True)
+    assert busqueda._modo == request.param
+    return request.param
+
+
+def ids(q, tipo):
+    return [id for _, id in buscar(q, [tipo])]
+
+
+def test_alta_cambio_y_baja(modo):
+    equipo = crear_equipo("Atenas")
+    buscar("calentar", ["equipo"])   # el índice en memoria se arma en la primera búsqueda
+    otro = crear_equipo("Peñarol")
+
+    assert ids("penarol", "equipo") == [otro.id]   # sin acentos y por prefijo
+    assert ids("aten", "equipo") == [equipo.id]
+
+    equipo.nombre = "Regatas"
+    db.session.commit()
+    assert ids("atenas", "equipo") == []
+    assert ids("regatas", "equipo") == [equipo.id]
+
+    db.session.delete(otro)
+    db.session.commit()
+    assert ids("penarol", "equipo") == []
+
+
+def test_rollback_no_indexa(modo):
+    buscar("calentar", ["equipo"])
+    db.session.add(Equipo(nombre="Fantasma"))
+    db.session.flush()
+    db.session.rollback()
+
+    assert ids("fantasma", "equipo") == []
+
+
+def test_titulo_pesa_mas_que_el_cuerpo(modo):
+    en_cuerpo = crear_jugador("Gomez", posicion="Base", ciudad="Campana")
+    en_titulo = crear_jugador("Campana", posicion="Pivot")
+
+    assert ids("campana", "jugador") == [en_titulo.id, en_cuerpo.id]
+
+
+def test_filtros_antes_del_limite(modo):
+    # el aficionado coincide mejor, pero el filtro lo descarta: igual se llena la página
+    aficionado = crear_usuario("hincha")
+    for i in range(6):
+        crear_jugador(f"Ginobili{i}", aficionado_id=None if i == 5 else aficionado.id)
+
+    consulta = Jugador.query.filter(Jugador.aficionado_id.is_(None))
+    pagina = resultados(consulta, "jugador", "ginobili", limite=1)
+    assert [j.apellido for j in pagina.items] == ["Ginobili5"]
@@ -0,0 +1,85 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from cache_paginas import CacheMemoria, _a_json, _de_json
+from conftest import crear_equipo, crear_jugador, crear_usuario, loguear
+from importacion import importar
+from models import db, Articulo, Evento
+
+
+@pytest.fixture
+def cache(app, monkeypatch):
+    # los tests corren con CACHE_PAGINAS=off; acá, el backend en memoria
+    backend = CacheMemoria()
+    monkeypatch.setitem(app.extensions, "cache_paginas", backend)
+    return backend
+
+
+def estado(cliente, url):
+    resp = cliente.get(url)
+    assert resp.status_code == 200
+    return resp.headers.get("X-Cache"), resp.get_data(as_text=True)
+
+
+def test_commit_invalida_solo_sus_etiquetas(cliente, cache):
+    assert estado(cliente, "/noticias")[0] == "MISS"
+    assert estado(cliente, "/eventos")[0] == "MISS"
+    assert estado(cliente, "/noticias")[0] == "HIT"
+
+    db.session.add(Articulo(titulo="Nota nueva", descripcion="-", fecha=date(2026, 1, 1), resumen_estado="listo"))
+    db.session.commit()
+
+    cache_noticias, html = estado(cliente, "/noticias")
+    assert cache_noticias == "MISS" and "Nota nueva" in html
+    assert estado(cliente, "/eventos")[0] == "HIT"
+
+
+def test_rollback_no_invalida(cliente, cache):
+    estado(cliente, "/eventos")
+    db.session.add(Evento(titulo="Nunca", descripcion="-", fecha_y_hora=datetime(2026, 1, 1), cap_max=1))
+    db.session.flush()
+    db.session.rollback()
+
+    assert estado(cliente, "/eventos")[0] == "HIT"
+
+
+def test_jugador_invalida_su_equipo(cliente, cache):
+    equipo, otro = crear_equipo("Quimsa"), crear_equipo("Boca")
+    jugador = crear_jugador("Pase", equipo)
+    for e in (equipo, otro):
+        estado(cliente, f"/equipo/{e.id}")
+
+    jugador.equipo_id = otro.id   # sale de un plantel y entra a otro
+    db.session.commit()
+
+    assert estado(cliente, f"/equipo/{equipo.id}")[0] == "MISS"
+    assert estado(cliente, f"/equipo/{otro.id}")[0] == "MISS"
+
+
+def test_importacion_invalida(cliente, cache):
+    estado(cliente, "/equipos")
+    importar("equipos", io.BytesIO(b"nombre\nImportado\n"), "csv")
+
+    cache_equipos, html = estado(cliente, "/equipos")
+    assert cache_equipos == "MISS" and "Importado" in html
+
+
+def test_no_cachea_usuarios_ni_flashes(app, cliente, cache):
+    loguear(cliente, crear_usuario("hincha"))
+    assert "X-Cache" not in cliente.get("/noticias").headers
+
+    anonimo = app.test_client()
+    with anonimo.session_transaction() as sesion:
+        sesion["_flashes"] = [("info", "Sesión cerrada.")]
+    assert "X-Cache" not in anonimo.get("/noticias").headers
+    assert len(cache._datos) == 0
+
+
+def test_redis_guarda_json():
+    valor = (b"<p>\xc3\xb1</p>", "text/html; charset=utf-8")
+    assert _de_json(_a_json(valor)) == valor
+    # lo que no escribió _a_json (un pickle, por ejemplo) cuenta como que no está
+    assert _de_json(b"\x80\x04\x95junk") is None
+    assert _de_json(b'{"cuerpo": 1}') is None
@@ -0,0 +1,54 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from consultas import PresupuestoExcedido, activar_contador, presupuesto_consultas
+
+
+@pytest.fixture
+def app_presupuesto():
+    # app aparte (a la app real ya no se le pueden agregar rutas); el
+    # contador escucha a todos los engines
+    prueba = Flask(__name__)
+    prueba.testing = True
+    activar_contador(prueba)
+    engine = create_engine("sqlite://")
+
+    def contar(n):
+        with engine.connect() as conexion:
+            for _ in range(n):
+                conexion.execute(text("SELECT 1"))
+        return "ok"
+
+    @prueba.route("/dentro/<int:n>")
+    @presupuesto_consultas(2)
+    def dentro(n):
+        return contar(n)
+
+    @prueba.route("/sin-presupuesto/<int:n>")
+    def sin_presupuesto(n):
+        return contar(n)
+
+    return prueba.test_client()
+
+
+def test_cuenta_las_consultas(app_presupuesto):
+    respuesta = app_presupuesto.get("/dentro/2")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["X-Consultas"] == "2"
+
+
+def test_pasarse_del_presupuesto_falla(app_presupuesto):
+    with pytest.raises(PresupuestoExcedido):
+        app_presupuesto.get("/dentro/3")
+
+
+def test_sin_presupuesto_no_se_controla(app_presupuesto):
+    respuesta = app_presupuesto.get("/sin-presupuesto/5")
+    assert respuesta.headers["X-Consultas"] == "5"
+
+
+@pytest.mark.parametrize("url", ["/", "/noticias", "/eventos", "/equipos", "/ranking"])
+def test_paginas_publicas_dentro_del_presupuesto(cliente, url):
+    # con app.testing, una vista que se pasa levanta PresupuestoExcedido
+    assert cliente.get(url).status_code == 200
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+
+from sqlalchemy.exc import DataError
+
+import importacion
+from busqueda import buscar
+from conftest import crear_equipo
+from importacion import ENTIDADES, exportar, importar
+from models import db, Equipo, Jugador
+
+
+def archivo(texto):
+    return io.BytesIO(texto.encode("utf-8"))
+
+
+def test_csv_valida_cada_fila(base):
+    crear_equipo("Quimsa")
+    datos = (
+        "nombre,apellido,posicion,media,equipo\n"
+        "Ana,Uno,Base,80,quimsa\n"
+        "Bea,,Alero,70,\n"              # falta el apellido
+        "Caro,Tres,Pivot,150,\n"        # media fuera de rango
+        "Dani,Cuatro,Escolta,60,Nadie\n"  # equipo que no existe
+        "Eva,Cinco,Ala pivot,65,\n"
+    )
+    r = importar("jugadores", archivo(datos), "csv", tam_lote=2)
+
+    assert r["insertados"] == 2
+    assert [numero for numero, _ in r["errores"]] == [2, 3, 4]
+    ana = Jugador.query.filter_by(apellido="Uno").one()
+    assert ana.equipo_rel.nombre == "Quimsa" and ana.posicion_principal == "Base"
+    # las inserciones masivas también entran al índice de búsqueda
+    assert buscar("cinco", ["jugador"]) == [("jugador", Jugador.query.filter_by(apellido="Cinco").one().id)]
+
+
+def test_json_con_listas_y_corchetes(base):
+    filas = [{"nombre": "[Corchete]", "ciudad": "A", "notas": [1, [2]]}, {"nombre": "Otro", "ciudad": "]"}]
+    for texto in (json.dumps(filas), "\n".join(json.dumps(f) for f in filas)):
+        r = importar("equipos", archivo(texto), "json", tam_lote=1)
+        assert r["insertados"] == 2, r
+        db.session.execute(Equipo.__table__.delete())
+        db.session.commit()
+
+
+def test_json_mal_formado_conserva_lo_anterior(base):
+    r = importar("equipos", archivo('[{"nombre": "Uno"}, {"nombre": "Dos"} {"nombre": "Tres"}]'), "json", tam_lote=1)
+
+    assert r["insertados"] == 2
+    assert r["errores"][-1][0] == "archivo"
+
+
+def test_lote_rechazado_se_reintenta_por_fila(base, monkeypatch):
+    crear_equipo("Existente")
+    # sin la validación de repetidos, el que choca lo frena el índice único
+    monkeypatch.setattr(ENTIDADES["equipos"], "unico", None)
+
+    r = importar("equipos", archivo("nombre\nNuevo1\nExistente\nNuevo2\n"), "csv")
+
+    assert r["insertados"] == 2
+    assert r["errores"] == [(2, "choca con un registro existente")]
+    assert Equipo.query.count() == 3
+
+
+def test_otros_errores_de_la_base_son_errores_de_fila(base, monkeypatch):
+    indexar = importacion.indexar_filas
+
+    def indexar_o_fallar(modelo, filas):
+        if any(f["nombre"] == "Malo" for f in filas):
+            raise DataError("INSERT ...", {}, ValueError("valor fuera de rango"))
+        indexar(modelo, filas)
+
+    monkeypatch.setattr(importacion, "indexar_filas", indexar_o_fallar)
+    r = importar("equipos", archivo("nombre\nA\nB\nMalo\nC\nD\n"), "csv", tam_lote=2)
+
+    assert r["insertados"] == 4
+    assert r["errores"] == [(3, "la base la rechazó (ValueError)")]
+    assert {e.nombre for e in Equipo.query} == {"A", "B", "C", "D"}
+
+
+def test_exportar_csv_escapa_formulas_e_importa_igual(base):
+    quimsa = crear_equipo("Quimsa")
+    for i, ciudad in enumerate(["=HYPERLINK(\"x\")", "+1", "-", "@SUMA", "Normal"]):
+        db.session.add(Jugador(nombre=f"J{i}", apellido=f"A{i}", ciudad=ciudad, equipo_id=quimsa.id))
+    db.session.commit()
+
+    texto = "".join(exportar("jugadores", "csv", tam_lote=2))
+    ciudades = [f["ciudad"] for f in csv.DictReader(io.StringIO(texto))]
+    assert ciudades == ["'=HYPERLINK(\"x\")", "'+1", "'-", "'@SUMA", "Normal"]
+
+    db.session.execute(Jugador.__table__.delete())
+    db.session.commit()
+    r = importar("jugadores", archivo(texto), "csv")
+    assert r["insertados"] == 5
+    assert [j.ciudad for j in Jugador.query.order_by(Jugador.id)] == ["=HYPERLINK(\"x\")", "+1", "-", "@SUMA", "Normal"]
+    assert {j.equipo_id for j in Jugador.query} == {quimsa.id}
+
+
+def test_exportar_json_es_un_array(base):
+    for nombre in ("Uno", "Dos", "Tres"):
+        crear_equipo(nombre)
+
+    trozos = list(exportar("equipos", "json"))
+    assert [f["nombre"] for f in json.loads("".join(trozos))] == ["Uno", "Dos", "Tres"]
+    assert len(trozos) > 3   # va saliendo de a una fila
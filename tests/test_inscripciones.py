@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+from conftest import crear_usuario
+from inscripciones import inscribir, prueba_de_carga, reconciliar
+from models import db, Evento, EventoAficionado
+
+
+def crear_evento(cupo):
+    evento = Evento(titulo="Firma de autógrafos", descripcion="-", fecha_y_hora=datetime(2026, 5, 1), cap_max=cupo)
+    db.session.add(evento)
+    db.session.commit()
+    return evento
+
+
+def test_inscribir(base):
+    evento = crear_evento(cupo=1)
+    primero, segundo = crear_usuario("uno"), crear_usuario("dos")
+
+    assert inscribir(evento.id, primero.id) == "inscripto"
+    assert inscribir(evento.id, primero.id) == "ya_inscripto"
+    assert inscribir(evento.id, segundo.id) == "sin_cupo"
+    assert db.session.get(Evento, evento.id, populate_existing=True).inscriptos_count == 1
+
+
+def test_cupo_con_hilos(app, base):
+    cupo, hilos = 5, 8
+    evento_id = crear_evento(cupo).id
+    ids = [crear_usuario(f"hincha{i}").id for i in range(24)]
+    resultados = Counter()
+    lock = threading.Lock()
+
+    def trabajar(parte):
+        with app.app_context():
+            for aficionado_id in parte:
+                r = inscribir(evento_id, aficionado_id)
+                with lock:
+                    resultados[r] += 1
+
+    threads = [threading.Thread(target=trabajar, args=(ids[k::hilos],)) for k in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert resultados == {"inscripto": cupo, "sin_cupo": len(ids) - cupo}
+    assert EventoAficionado.query.filter_by(evento_id=evento_id).count() == cupo
+    assert db.session.get(Evento, evento_id, populate_existing=True).inscriptos_count == cupo
+    assert reconciliar() == []
+
+
+def test_prueba_de_carga_no_toca_la_base(app, base):
+    r = prueba_de_carga(app, cupo=10, aficionados=40, hilos=8)
+
+    assert r["ok"]
+    assert r["inscriptos"] == r["contador"] == 10
+    assert r["resultados"]["error"] == 0
+    assert Evento.query.count() == 0   # corrió en su propio SQLite temporal
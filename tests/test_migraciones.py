@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import text
+
+import migraciones
+from migraciones import MigracionFallida, migrar, usa_indice, verificar
+from models import db
+
+
+def test_las_consultas_usan_sus_indices(base):
+    resultados = verificar()
+    assert resultados
+    assert [r[1:4] for r in resultados if not r[4]] == []
+
+
+def test_usa_indice_por_nombre_exacto():
+    detalle = "SEARCH jugadores USING INDEX ix_jugadores_aficionado_apellido (aficionado_id=?)"
+    assert usa_indice(detalle, "ix_jugadores_aficionado_apellido")
+    assert not usa_indice(detalle, "ix_jugadores_aficionado")
+    assert usa_indice("SCAN users USING COVERING INDEX ix_users_puntos", "ix_users_puntos")
+
+
+def test_migracion_sin_su_indice_no_se_registra(base, monkeypatch):
+    nueva = (99, "de prueba", lambda conn: None, [
+        ("SELECT * FROM jugadores WHERE apellido = :a", {"a": "x"}, "ix_que_no_existe"),
+    ])
+    monkeypatch.setattr(migraciones, "MIGRACIONES", migraciones.MIGRACIONES + [nueva])
+
+    with pytest.raises(MigracionFallida, match="ix_que_no_existe"):
+        migrar()
+    assert db.session.execute(text("SELECT MAX(version) FROM schema_version")).scalar() < 99
@@ -0,0 +1,70 @@
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from conftest import crear_jugador, crear_usuario, loguear
+from models import db, Articulo, Evento
+
+
+def recorrer(cliente, url, patron):
+    """Sigue los links "Ver más" y devuelve los textos que matchean, en orden, y cuántas páginas hubo."""
+    vistos, paginas = [], 0
+    while url:
+        html = cliente.get(url).get_data(as_text=True)
+        paginas += 1
+        vistos += re.findall(patron, html)
+        siguiente = re.search(r'href="([^"]+)"[^>]*rel="next"', html)
+        url = siguiente.group(1).replace("&amp;", "&") if siguiente else None
+    return vistos, paginas
+
+
+@pytest.fixture
+def noticias(base):
+    # fechas repetidas (desempata el id) y dos sin fecha, que van al final
+    for i in range(9):
+        fecha = None if i in (3, 6) else date(2026, 1, 1) + timedelta(days=i // 2)
+        db.session.add(Articulo(titulo=f"Nota {i}", descripcion="-", fecha=fecha, resumen_estado="listo"))
+    db.session.commit()
+    con_fecha = Articulo.query.filter(Articulo.fecha.is_not(None)).order_by(Articulo.fecha.desc(), Articulo.id.desc())
+    sin_fecha = Articulo.query.filter(Articulo.fecha.is_(None)).order_by(Articulo.id.desc())
+    return [a.titulo for a in con_fecha] + [a.titulo for a in sin_fecha]
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 9, 20])
+def test_noticias_todas_una_vez_en_orden(cliente, noticias, n):
+    vistos, paginas = recorrer(cliente, f"/noticias?n={n}", r"Nota \d+")
+    assert vistos == noticias
+    assert paginas == max(1, -(-len(noticias) // n))
+
+
+@pytest.mark.parametrize("n", [1, 2, 5])
+def test_eventos_sin_fecha_van_primero(cliente, n):
+    base = datetime(2026, 3, 1, 20, 0)
+    for i in range(6):
+        db.session.add(Evento(titulo=f"Evento {i}", descripcion="-", cap_max=5,
+                              fecha_y_hora=None if i in (1, 4) else base - timedelta(days=i)))
+    db.session.commit()
+
+    vistos, _ = recorrer(cliente, f"/eventos?n={n}", r"Evento \d+")
+    assert vistos == ["Evento 1", "Evento 4", "Evento 5", "Evento 3", "Evento 2", "Evento 0"]
+
+
+def test_cursor_invalido_es_400(cliente):
+    assert cliente.get("/noticias?cursor=no-es-un-cursor").status_code == 400
+
+
+def test_elegir_jugador_busca_en_todas_las_paginas(cliente):
+    usuario = crear_usuario("hincha")
+    for i in range(30):
+        crear_jugador(f"Apellido{i:02d}")
+    crear_jugador("Zurbriggen")
+    crear_jugador("Zurbriggen", nombre="Fan", aficionado_id=usuario.id)   # el jugador propio de un aficionado
+    loguear(cliente, usuario)
+
+    # sin búsqueda es paginado: el último apellido no está en la primera página
+    assert "Zurbriggen" not in cliente.get("/perfil/elegir-jugador?n=10").get_data(as_text=True)
+
+    html = cliente.get("/perfil/elegir-jugador?q=zurbrig&n=10").get_data(as_text=True)
+    assert html.count("Zurbriggen") == 1
+    assert "Apellido" not in html
@@ -0,0 +1,19 @@
+import os
+
+import paridad
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_dos_bases_dan_lo_mismo(tmp_path):
+    # el mismo motor dos veces: detecta chequeos que fallan o no son
+    # deterministas (con PostgreSQL, ver `flask db-paridad`)
+    urls = [f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"]
+    por_url, distintos = paridad.comparar(urls, RAIZ)
+
+    for resultados in por_url.values():
+        assert "error" not in resultados
+        assert set(resultados) == {f.__name__ for f in paridad.CHEQUEOS}
+        fallidos = {n: r for n, r in resultados.items() if isinstance(r, dict) and "excepcion" in r}
+        assert fallidos == {}
+    assert distintos == []
@@ -0,0 +1,44 @@
+from conftest import crear_jugador, crear_usuario
+from models import AficionadoJugador
+from quintetos import guardar_puesto
+
+
+def puestos(usuario):
+    return {(rel.slot, rel.jugador_id) for rel in AficionadoJugador.query.filter_by(aficionado_id=usuario.id)}
+
+
+def test_guardar_puesto_reemplaza(base):
+    usuario = crear_usuario("hincha")
+    primero = crear_jugador("Uno", posicion="Base")
+    segundo = crear_jugador("Dos", posicion="base / escolta")   # la principal es la primera
+    alero = crear_jugador("Tres", posicion="Alero")
+
+    assert guardar_puesto(usuario.id, "Base", primero.id)
+    assert guardar_puesto(usuario.id, "Alero", alero.id)
+    assert guardar_puesto(usuario.id, "Base", segundo.id)
+
+    assert puestos(usuario) == {("Base", segundo.id), ("Alero", alero.id)}
+
+
+def test_guardar_puesto_rechaza(base):
+    usuario = crear_usuario("hincha")
+    escolta = crear_jugador("Escolta", posicion="Escolta / Base")
+    propio = crear_jugador("Propio", posicion="Base", aficionado_id=usuario.id)
+    base_ok = crear_jugador("Base", posicion="Base")
+    guardar_puesto(usuario.id, "Base", base_ok.id)
+
+    assert not guardar_puesto(usuario.id, "Base", escolta.id)    # la secundaria no alcanza
+    assert not guardar_puesto(usuario.id, "Base", propio.id)     # el jugador de un aficionado
+    assert not guardar_puesto(usuario.id, "Base", 9999)          # no existe
+    assert puestos(usuario) == {("Base", base_ok.id)}
+
+
+def test_quintetos_separados(base):
+    uno, dos = crear_usuario("uno"), crear_usuario("dos")
+    pivot, otro = crear_jugador("Pivot", posicion="Pivot"), crear_jugador("Otro", posicion="Pivot")
+
+    guardar_puesto(uno.id, "Pivot", pivot.id)
+    guardar_puesto(dos.id, "Pivot", otro.id)
+
+    assert puestos(uno) == {("Pivot", pivot.id)}
+    assert puestos(dos) == {("Pivot", otro.id)}
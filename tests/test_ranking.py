@@ -0,0 +1,93 @@
+import pytest
+
+from conftest import crear_equipo, crear_usuario, loguear
+from models import db, User, PartidoOficial, PuntoPendiente
+from ranking import Ranking, pendientes, posicion, sumar_puntos, volcar
+
+
+@pytest.fixture
+def sin_volcado_automatico(app, monkeypatch):
+    # que el teardown de los requests no vuelque en medio del test
+    monkeypatch.setitem(app.config, "PUNTOS_LOTE", 10**6)
+    monkeypatch.setitem(app.config, "PUNTOS_INTERVALO", 10**6)
+
+
+def test_posicion_con_empates_y_por_equipo():
+    r = Ranking([(1, 1, 30), (2, 1, 10), (3, 2, 30), (4, None, None)])
+
+    assert r.posicion(30) == (1, 4)
+    assert r.posicion(10) == (3, 4)
+    assert r.posicion(0) == (4, 4)
+    assert r.posicion(10, equipo=1) == (2, 2)
+    assert r.posicion(99, equipo=3) == (1, 0)
+
+    r.poner(2, 2, 40)   # se cambia de equipo y pasa al frente
+    assert r.posicion(40) == (1, 4)
+    assert r.posicion(30, equipo=1) == (1, 1)
+    assert r.posicion(40, equipo=2) == (1, 2)
+
+    r.quitar(3)
+    assert r.posicion(30) == (2, 3)
+
+
+def test_volcar_suma_los_pendientes(base):
+    uno, dos = crear_usuario("uno", puntos=10), crear_usuario("dos", puntos=20)
+    assert posicion(10) == (2, 2)
+
+    sumar_puntos(uno.id, 5)
+    sumar_puntos(uno.id, 10)
+    sumar_puntos(dos.id, 1)
+    db.session.commit()
+    assert pendientes(uno.id) == 15
+    assert db.session.get(User, uno.id, populate_existing=True).puntos == 10
+
+    assert volcar() == 2
+    assert pendientes(uno.id) == 0
+    assert PuntoPendiente.query.count() == 0
+    assert db.session.get(User, uno.id, populate_existing=True).puntos == 25
+    assert db.session.get(User, dos.id, populate_existing=True).puntos == 21
+    # la copia en memoria ya tiene los puntos volcados
+    assert posicion(25) == (1, 2)
+    assert volcar() == 0
+
+
+def test_puntos_sin_commit_no_quedan(base):
+    uno = crear_usuario("uno")
+    sumar_puntos(uno.id, 7)
+    db.session.rollback()
+
+    assert pendientes(uno.id) == 0
+    assert volcar() == 0
+
+
+def test_partido_oficial_una_vez_por_dia(app, base, sin_volcado_automatico):
+    rival = crear_equipo("Rival")
+    usuario = crear_usuario("hincha")
+    usuario_id, rival_id = usuario.id, rival.id
+
+    # dos envíos, cada uno con su cliente (como dos pestañas)
+    for _ in range(2):
+        cliente = app.test_client()
+        loguear(cliente, usuario)
+        respuesta = cliente.post("/juegos", data={"rival": rival_id})
+        assert respuesta.status_code == 302
+        assert respuesta.headers["Location"].endswith("/juegos")
+
+    db.session.expire_all()
+    partidos = PartidoOficial.query.filter_by(aficionado_id=usuario_id).all()
+    assert len(partidos) == 1
+    assert pendientes(usuario_id) == partidos[0].puntos_ganados
+
+
+def test_ranking_muestra_los_pendientes(app, base, sin_volcado_automatico):
+    uno, dos = crear_usuario("uno", puntos=10), crear_usuario("dos", puntos=20)
+    sumar_puntos(uno.id, 15)
+    db.session.commit()
+
+    cliente = app.test_client()
+    loguear(cliente, uno)
+    html = cliente.get("/ranking").get_data(as_text=True)
+
+    assert "#1</span>" in html
+    assert "con 25 puntos" in html
+    assert pendientes(uno.id) == 15   # se mostraron sin volcarlos
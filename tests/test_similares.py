@@ -0,0 +1,63 @@
+from conftest import crear_jugador, crear_usuario
+from models import db
+from similares import CON_MEDIA, Matriz, matriz, percentiles, similares
+
+
+def fila(id, posicion, valores, version=1, nombre="J"):
+    return (id, nombre, f"A{id}", posicion, version, *valores)
+
+
+def test_similares_y_percentiles():
+    m = Matriz([
+        fila(1, "Base", [90, 90, 90, 40, 40, 40, 65]),
+        fila(2, "Base", [85, 88, 92, 45, 42, 38, 65]),
+        fila(3, "Pivot", [40, 40, 40, 90, 90, 90, 65]),
+        fila(4, "Pivot", [None, 50, 50, 80, 85, 95, 70]),
+    ])
+
+    vecinos = [int(m.ids[i]) for i, _ in m.similares([90, 90, 90, 40, 40, 40, 65], cantidad=10, excluir=1)]
+    assert vecinos[0] == 2 and sorted(vecinos) == [2, 3, 4]   # el excluido no vuelve
+
+    p = m.percentiles([88, 50, 50, 50, 50, 50, 66], "Base")
+    assert p["tiro"] == 50 and p["media"] == 100
+    assert m.percentiles([50] * 7, "Pivot")["tiro"] == 100   # el vacío no cuenta
+
+
+def test_firma_cambia_con_altas_bajas_y_ediciones():
+    m = Matriz([fila(1, "Base", [50] * 7), fila(2, "Base", [60] * 7, version=2)])
+    firma = m.firma()
+
+    assert Matriz([fila(2, "Base", [60] * 7, version=2), fila(1, "Base", [50] * 7)]).firma() == firma
+
+    m.quitar(2)
+    m.poner(3, "J", "A3", "Base", 2, [60] * 7)   # otro jugador, misma suma de versiones
+    assert m.firma() != firma
+
+    firma = m.firma()
+    m.quitar(3)
+    m.poner(3, "Otro", "A3", "Base", 2, [60] * 7)   # mismo id y versión, otro jugador
+    assert m.firma() != firma
+
+
+def test_la_matriz_sigue_los_commits(base):
+    m = matriz()
+    uno = crear_jugador("Uno", posicion="Base", tiro=80)
+    dos = crear_jugador("Dos", posicion="Base", tiro=60)
+    assert {int(i) for i in m.ids} == {uno.id, dos.id}
+
+    dos.tiro = 90
+    db.session.commit()
+    assert percentiles(uno)["tiro"] == 50
+    assert [s["id"] for s in similares(uno)] == [dos.id]
+
+    # un jugador de aficionado no es de la liga
+    crear_jugador("Propio", posicion="Base", aficionado_id=crear_usuario("hincha").id)
+    db.session.delete(dos)
+    db.session.commit()
+    assert [int(i) for i in m.ids] == [uno.id]
+
+    nuevo = crear_jugador("Cuatro", posicion="Base", tiro=70)
+    nuevo.tiro = 99
+    db.session.flush()
+    db.session.rollback()   # lo no commiteado no llega a la matriz
+    assert m.valores[m.fila_de[nuevo.id], CON_MEDIA.index("tiro")] == 70
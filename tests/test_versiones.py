@@ -0,0 +1,81 @@
+from flask import g
+
+from conftest import crear_equipo, crear_jugador, crear_usuario, loguear
+from models import db
+
+FUTURO = "Fri, 01 Jan 2100 00:00:00 GMT"
+
+
+def test_etag_y_304(cliente):
+    equipo = crear_equipo("Quimsa")
+    url = f"/equipo/{equipo.id}"
+
+    resp = cliente.get(url)
+    etag = resp.headers["ETag"]
+    assert resp.status_code == 200
+    assert "Last-Modified" not in resp.headers
+
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 304
+    # sin Last-Modified, If-Modified-Since no alcanza para un 304
+    assert cliente.get(url, headers={"If-Modified-Since": FUTURO}).status_code == 200
+
+    equipo.ciudad = "Santiago"
+    db.session.commit()
+    resp = cliente.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+
+
+def test_jugador_cambia_con_su_equipo(cliente):
+    equipo = crear_equipo("Quimsa")
+    jugador = crear_jugador("Uno", equipo)
+    url = f"/jugador/{jugador.id}"
+    etag = cliente.get(url).headers["ETag"]
+
+    equipo.nombre = "Quimsa SdE"
+    db.session.commit()
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etag_por_usuario(app, cliente):
+    equipo = crear_equipo("Quimsa")
+    url = f"/equipo/{equipo.id}"
+    anonimo = cliente.get(url).headers["ETag"]
+    # el test client reusa el app context del test, y Flask-Login guarda el usuario en su g
+    g.pop("_login_user", None)
+
+    logueado = app.test_client()
+    loguear(logueado, crear_usuario("hincha"))
+    assert logueado.get(url, headers={"If-None-Match": anonimo}).status_code == 200
+
+
+def test_con_flashes_no_hay_304(cliente):
+    equipo = crear_equipo("Quimsa")
+    url = f"/equipo/{equipo.id}"
+    etag = cliente.get(url).headers["ETag"]
+
+    with cliente.session_transaction() as sesion:
+        sesion["_flashes"] = [("success", "Equipo actualizado.")]
+    resp = cliente.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+
+
+def test_ficha_cambia_con_la_liga(cliente):
+    # similares y percentiles dependen de toda la liga
+    jugador = crear_jugador("Uno", tiro=70)
+    otro = crear_jugador("Dos", tiro=50)
+    url = f"/jugador/{jugador.id}"
+    etag = cliente.get(url).headers["ETag"]
+
+    otro.tiro = 90
+    db.session.commit()
+    nuevo = cliente.get(url, headers={"If-None-Match": etag})
+    assert nuevo.status_code == 200
+
+    # se va uno y entra otro con la misma versión: la liga cambió igual
+    etag = nuevo.headers["ETag"]
+    version = otro.version
+    db.session.delete(otro)
+    db.session.commit()
+    crear_jugador("Tres", tiro=90, version=version)
+    assert cliente.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,134 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session
+from werkzeug.http import is_resource_modified
+
+from models import db, Equipo, Jugador, Articulo, Evento, DT
+from similares import firma as firma_similares
+
+# Versión de las filas que tienen página de detalle.
+#
+# Cada escritura por el ORM sube `version` y `actualizado`. La página de un
+# equipo muestra su plantel, así que cambiar un jugador o un DT también
+# sube la versión de su equipo (el anterior y el nuevo si cambió).
+# Las sentencias SQL directas tienen que subirla ellas mismas (ver
+# inscripciones._RESERVAR_CUPO).
+#
+# Con eso las rutas de detalle responden 304 sin renderizar cuando el
+# ETag del cliente sigue vigente.
+
+VERSIONADOS = (Equipo, Jugador, Articulo, Evento)
+
+
+def _equipos_de(obj):
+    historia = inspect(obj).attrs["equipo_id"].history
+    ids = set(historia.added) | set(historia.unchanged) | set(historia.deleted)
+    if not ids:
+        ids = {obj.equipo_id}
+    return {i for i in ids if i is not None}
+
+
+@event.listens_for(Session, "before_flush")
+def _subir_version(session, flush_context, instances):
+    ahora = datetime.utcnow()
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONADOS) and session.is_modified(obj):
+            obj.version = (obj.version or 0) + 1
+            obj.actualizado = ahora
+
+
+@event.listens_for(Session, "after_flush")
+def _subir_version_equipos(session, flush_context):
+    cambios = list(session.new) + [o for o in session.dirty if session.is_modified(o)]
+
+    equipos = set()
+    for obj in cambios + list(session.deleted):
+        if isinstance(obj, (Jugador, DT)):
+            equipos |= _equipos_de(obj)
+
+    if equipos:
+        subir_version_equipos(session.connection(), equipos)
+
+
+def subir_version_equipos(conexion, ids):
+    """También para escrituras que no pasan por el flush (ver importacion.py)."""
+    conexion.execute(
+        update(Equipo.__table__)
+        .where(Equipo.__table__.c.id.in_(ids))
+        .values(version=Equipo.__table__.c.version + 1, actualizado=datetime.utcnow())
+    )
+
+
+#--------VERSIONES POR PAGINA------------
+# Cada función devuelve la versión de la página o None si la fila no existe.
+
+def version_equipo(id):
+    return db.session.query(Equipo.version).filter(Equipo.id == id).scalar()
+
+
+def version_jugador(id):
+    # la ficha muestra el nombre del equipo y, comparado con la liga, similares y percentiles
+    fila = (
+        db.session.query(Jugador.version, Equipo.version)
+        .outerjoin(Equipo, Jugador.equipo_id == Equipo.id)
+        .filter(Jugador.id == id)
+        .first()
+    )
+    if fila is None:
+        return None
+    return f"{fila[0]}.{fila[1]}.{firma_similares()}"
+
+
+def version_articulo(id):
+    return db.session.query(Articulo.version).filter(Articulo.id == id).scalar()
+
+
+def version_evento(id):
+    return db.session.query(Evento.version).filter(Evento.id == id).scalar()
+
+
+#--------DECORADOR------------
+
+def respuesta_condicional(obtener_version):
+    """ETag fuerte para una página de detalle.
+
+    Si la copia del cliente está al día responde 304 sin llamar a la
+    vista. El ETag incluye al usuario porque la barra de navegación (y el
+    botón de inscripción en eventos) cambian con la sesión. No se manda
+    Last-Modified: una fecha no ve ni el cambio de sesión ni los cambios
+    de la liga que mueven similares y percentiles, y con solo
+    If-Modified-Since el cliente recibiría un 304 viejo.
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            # con mensajes flash pendientes la página es distinta y se
+            # muestra una sola vez: ni 304 ni ETag
+            if session.get("_flashes"):
+                return f(*args, **kwargs)
+
+            version = obtener_version(**kwargs)
+            if version is None:
+                return f(*args, **kwargs)
+
+            crudo = f"{request.endpoint}:{kwargs}:{version}:{current_user.get_id() or '-'}"
+            etag = hashlib.sha1(crudo.encode("utf-8")).hexdigest()
+
+            if not is_resource_modified(request.environ, etag=etag):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = make_response(f(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+
+            resp.set_etag(etag)
+            resp.cache_control.no_cache = True
+            resp.vary.add("Cookie")
+            return resp
+        return envoltura
+    return decorador
@@ -0,0 +1,7 @@
+# Punto de entrada para servidores WSGI, por ejemplo:
+#   CACHE_PAGINAS=redis://localhost:6379/0 gunicorn -w 4 --preload wsgi:app
+# (con varios workers el cache tiene que ser compartido, ver gunicorn.conf.py)
+# La configuración sale del entorno (ver config.py).
+from app import crear_app
+
+app = crear_app()